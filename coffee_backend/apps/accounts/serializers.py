@@ -31,4 +31,11 @@ class VendorProfileSerializer(serializers.ModelSerializer):
     class Meta:
         model = VendorProfile
         fields = '__all__'
-        read_only_fields = ('user', 'is_verified', 'rating')
\ No newline at end of file
+        read_only_fields = ('user', 'is_verified', 'rating')
+
+class VendorStorefrontSerializer(serializers.ModelSerializer):
+    """Public part of a vendor profile, shown on its storefront."""
+    class Meta:
+        model = VendorProfile
+        fields = ('id', 'business_name', 'business_description', 'business_logo', 'is_verified', 'created_at')
+        read_only_fields = fields
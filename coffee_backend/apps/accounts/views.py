@@ -3,6 +3,7 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework_simplejwt.tokens import RefreshToken
 from django.contrib.auth import authenticate
+from ..cart.guest import merge_guest_cart
 from .models import VendorProfile
 from .serializers import UserSerializer, VendorProfileSerializer
 
@@ -20,11 +21,13 @@ class SignupView(APIView):
                 )
             
             refresh = RefreshToken.for_user(user)
-            return Response({
+            response = Response({
                 'refresh': str(refresh),
                 'access': str(refresh.access_token),
                 'user': serializer.data
             }, status=status.HTTP_201_CREATED)
+            merge_guest_cart(request, user, response)
+            return response
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 class LoginView(APIView):
@@ -36,11 +39,13 @@ class LoginView(APIView):
         if user:
             refresh = RefreshToken.for_user(user)
             serializer = UserSerializer(user)
-            return Response({
+            response = Response({
                 'refresh': str(refresh),
                 'access': str(refresh.access_token),
                 'user': serializer.data
             })
+            merge_guest_cart(request, user, response)
+            return response
         return Response({'error': 'Invalid credentials'}, status=status.HTTP_401_UNAUTHORIZED)
 
 class ProfileView(APIView):
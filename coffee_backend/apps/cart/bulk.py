@@ -0,0 +1,86 @@
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from .models import MAX_ITEM_QUANTITY, Cart, CartItem
+
+
+def get_final_quantities(operations, quantities):
+    # Play the operations in order over the stored quantities; 0 removes.
+    # Adds stop at MAX_ITEM_QUANTITY like CartItemQuerySet.add_quantity
+    quantities = dict(quantities)
+    for operation in operations:
+        product_id = operation['product_id']
+        if operation['op'] == 'add':
+            quantities[product_id] = min(quantities.get(product_id, 0) + operation['quantity'], MAX_ITEM_QUANTITY)
+        elif operation['op'] == 'set':
+            quantities[product_id] = operation['quantity']
+        else:
+            quantities[product_id] = 0
+    return quantities
+
+
+@transaction.atomic
+def apply_cart_operations(user, operations, products):
+    """
+    Apply add/set/remove ``operations`` to ``user``'s active carts across
+    vendors, as if sent one by one. ``products`` maps every product id in
+    them to its catalog record. The items are read once and written with
+    one bulk_create, one bulk_update and one DELETE ... IN; carts left
+    empty are deleted like CartItemView.delete does.
+    """
+    try:
+        with transaction.atomic():
+            write_cart_operations(user, operations, products)
+    except IntegrityError:
+        # A concurrent request created one of the carts or items; it is
+        # committed now, so a second pass reads and locks it
+        write_cart_operations(user, operations, products)
+
+
+def write_cart_operations(user, operations, products):
+    # Locked until commit, like CartView.get_cart, so concurrent batches
+    # and adds read the carts' items in turn
+    vendor_ids = {products[operation['product_id']].vendor_id for operation in operations}
+    carts = {
+        cart.vendor_id: cart
+        for cart in Cart.objects.select_for_update().filter(user=user, is_active=True, vendor_id__in=vendor_ids)
+    }
+    items = {
+        item.product_id: item
+        for item in CartItem.objects.filter(cart__in=list(carts.values()), product_id__in=products)
+    }
+    quantities = get_final_quantities(operations, {product_id: item.quantity for product_id, item in items.items()})
+
+    new_vendors = {
+        products[product_id].vendor_id
+        for product_id, quantity in quantities.items() if quantity and product_id not in items
+    } - set(carts)
+    if new_vendors:
+        created = Cart.objects.bulk_create([Cart(user=user, vendor_id=vendor_id) for vendor_id in new_vendors])
+        carts.update((cart.vendor_id, cart) for cart in created)
+
+    now = timezone.now()
+    created, changed, removed = [], [], []
+    for product_id, quantity in quantities.items():
+        item = items.get(product_id)
+        if item is None:
+            if quantity:
+                cart = carts[products[product_id].vendor_id]
+                created.append(CartItem(cart=cart, product_id=product_id, quantity=quantity))
+        elif not quantity:
+            removed.append(item.pk)
+        elif quantity != item.quantity:
+            # bulk_update leaves auto_now alone
+            item.quantity, item.updated_at = quantity, now
+            changed.append(item)
+    if created:
+        CartItem.objects.bulk_create(created)
+    if changed:
+        CartItem.objects.bulk_update(changed, ['quantity', 'updated_at'])
+    if removed:
+        CartItem.objects.filter(pk__in=removed).delete()
+
+    if created or changed or removed:
+        touched = [cart.pk for cart in carts.values()]
+        Cart.objects.filter(pk__in=touched).refresh_totals()
+        Cart.objects.filter(pk__in=touched, item_count=0).delete()
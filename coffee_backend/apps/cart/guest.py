@@ -0,0 +1,101 @@
+import secrets
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.cache import caches
+
+from ..products.models import Product
+from ..products.snapshot import get_product_record
+from .bulk import apply_cart_operations
+from .models import CART_PRODUCT_FIELDS
+
+GUEST_CART_KEY = 'cart:guest:{}'
+COOKIE_SALT = 'cart.guest'
+
+
+def get_guest_cart_store():
+    return caches['carts']
+
+
+def new_guest_cart_id():
+    return secrets.token_urlsafe(16)
+
+
+def get_guest_cart_id(request):
+    # None for a missing, tampered or expired cookie
+    return request.get_signed_cookie(
+        settings.GUEST_CART_COOKIE, default=None, salt=COOKIE_SALT, max_age=settings.GUEST_CART_TIMEOUT
+    )
+
+
+def set_guest_cart_cookie(response, cart_id):
+    response.set_signed_cookie(
+        settings.GUEST_CART_COOKIE, cart_id, salt=COOKIE_SALT,
+        max_age=settings.GUEST_CART_TIMEOUT, httponly=True, samesite='Lax',
+    )
+
+
+def load_guest_cart(cart_id):
+    """``{product_id: quantity}`` of a guest cart, empty if there is none."""
+    if cart_id is None:
+        return {}
+    return get_guest_cart_store().get(GUEST_CART_KEY.format(cart_id)) or {}
+
+
+def save_guest_cart(cart_id, quantities):
+    # Every write restarts the expiry; an emptied cart is dropped
+    key = GUEST_CART_KEY.format(cart_id)
+    if quantities:
+        get_guest_cart_store().set(key, quantities)
+    else:
+        get_guest_cart_store().delete(key)
+
+
+def get_guest_carts(quantities):
+    """
+    The guest cart grouped by vendor into the shape user carts are served
+    in, from one read of the products. Products deleted since they were
+    added are left out.
+    """
+    products = (
+        Product.objects.filter(pk__in=quantities)
+        .select_related('vendor')
+        .only(*CART_PRODUCT_FIELDS, 'vendor', 'vendor__business_name')
+        .order_by('id')
+    )
+    carts = {}
+    for product in products:
+        quantity = quantities[product.pk]
+        cart = carts.setdefault(product.vendor_id, {
+            'vendor': product.vendor_id,
+            'vendor_name': product.vendor.business_name,
+            'items': [],
+            'item_count': 0,
+            'total': Decimal('0'),
+        })
+        subtotal = product.price * quantity
+        cart['items'].append({'product': product, 'quantity': quantity, 'subtotal': subtotal})
+        cart['item_count'] += quantity
+        cart['total'] += subtotal
+    return list(carts.values())
+
+
+def merge_guest_cart(request, user, response):
+    """
+    Add the request's guest cart to ``user``'s carts in one bulk
+    apply_cart_operations call, then drop it and its cookie. Products that
+    no longer exist are skipped.
+    """
+    cart_id = get_guest_cart_id(request)
+    if cart_id is None:
+        return
+    operations, products = [], {}
+    for product_id, quantity in load_guest_cart(cart_id).items():
+        product = get_product_record(product_id)
+        if product is not None:
+            products[product_id] = product
+            operations.append({'op': 'add', 'product_id': product_id, 'quantity': quantity})
+    if operations:
+        apply_cart_operations(user, operations, products)
+    save_guest_cart(cart_id, {})
+    response.delete_cookie(settings.GUEST_CART_COOKIE, samesite='Lax')
@@ -1,5 +1,65 @@
-from django.db import models
+from django.db import IntegrityError, models, transaction
+from django.db.models.functions import Coalesce, Least
 from django.conf import settings
+from django.utils import timezone
+
+from ..products.snapshot import get_product_record
+
+# Product columns loaded for cart items, all the cart representation needs
+CART_PRODUCT_FIELDS = (
+    'id', 'name', 'description', 'price', 'image', 'image_variants', 'roast_type', 'origin', 'stock', 'is_available'
+)
+ZERO = models.Value(0, output_field=models.DecimalField(max_digits=10, decimal_places=2))
+# Units of one product a cart holds; keeps the totals within their columns
+MAX_ITEM_QUANTITY = 999
+
+
+class CartQuerySet(models.QuerySet):
+    def for_read(self):
+        # Carts with vendor name, SQL totals and slim items in two queries
+        items = (
+            CartItem.objects.select_related('product')
+            .only('id', 'cart_id', 'quantity', 'created_at', *(f'product__{field}' for field in CART_PRODUCT_FIELDS))
+            .annotate(subtotal=models.F('quantity') * models.F('product__price'))
+            .order_by('id')
+        )
+        return (
+            self.select_related('vendor')
+            .prefetch_related(models.Prefetch('items', queryset=items))
+            .order_by('id')
+        )
+
+    def refresh_totals(self):
+        # One UPDATE recomputing item_count and total of every cart matched
+        items = CartItem.objects.filter(cart=models.OuterRef('pk')).order_by().values('cart')
+        units = items.annotate(units=models.Sum('quantity')).values('units')
+        total = items.annotate(total=models.Sum(models.F('quantity') * models.F('product__price'))).values('total')
+        return self.update(
+            item_count=Coalesce(models.Subquery(units), 0),
+            total=Coalesce(models.Subquery(total), ZERO),
+        )
+
+    def refresh_totals_for_products(self, product_ids):
+        # After price changes; ordered carts keep the totals they were bought at
+        carts = CartItem.objects.filter(product_id__in=product_ids).values('cart_id')
+        return self.filter(pk__in=carts, is_active=True).refresh_totals()
+
+
+class CartItemQuerySet(models.QuerySet):
+    def add_quantity(self, cart, product_id, quantity):
+        # Increment in the UPDATE itself so concurrent adds cannot lose units
+        lookup = {'cart': cart, 'product_id': product_id}
+        increment = {
+            'quantity': Least(models.F('quantity') + quantity, MAX_ITEM_QUANTITY), 'updated_at': timezone.now()
+        }
+        if self.filter(**lookup).update(**increment):
+            return
+        try:
+            with transaction.atomic():
+                self.create(quantity=quantity, **lookup)
+        except IntegrityError:
+            # Created concurrently; the row exists now
+            self.filter(**lookup).update(**increment)
 
 
 class Cart(models.Model):
@@ -16,6 +76,11 @@ class Cart(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     is_active = models.BooleanField(default=True)
+    # Units and price total of the items, kept by refresh_totals() on writes
+    item_count = models.PositiveIntegerField(default=0, editable=False)
+    total = models.DecimalField(max_digits=10, decimal_places=2, default=0, editable=False)
+
+    objects = CartQuerySet.as_manager()
 
     def get_total(self):
         return sum(item.get_subtotal() for item in self.items.all())
@@ -41,8 +106,12 @@ class CartItem(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = CartItemQuerySet.as_manager()
+
     def get_subtotal(self):
-        return self.product.price * self.quantity
+        # Price from the catalog snapshot, so totals do not load each product
+        product = get_product_record(self.product_id)
+        return product.price * self.quantity
 
     class Meta:
         unique_together = ('cart', 'product')
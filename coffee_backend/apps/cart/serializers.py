@@ -1,17 +1,32 @@
+from django.conf import settings
 from rest_framework import serializers
-from .models import Cart, CartItem
-from ..products.serializers import ProductSerializer
+from .models import MAX_ITEM_QUANTITY, Cart, CartItem
+from ..products.serializers import ProductImageMixin
 from ..products.models import Product
 
+MAX_CART_OPERATIONS = 200
+
+class CartProductSerializer(ProductImageMixin, serializers.ModelSerializer):
+    image_url = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Product
+        # Stays within CART_PRODUCT_FIELDS, the columns the cart read loads
+        fields = ['id', 'name', 'description', 'price', 'image_url', 'roast_type', 'origin', 'stock', 'is_available']
+        read_only_fields = fields
+
+    def get_image_variant(self):
+        return settings.PRODUCT_IMAGE_LISTING_VARIANT
+
 class CartItemSerializer(serializers.ModelSerializer):
-    product = ProductSerializer(read_only=True)
+    product = CartProductSerializer(read_only=True)
     product_id = serializers.PrimaryKeyRelatedField(
         queryset=Product.objects.all(),
         write_only=True,
         source='product'
     )
+    # Annotated by Cart.objects.for_read()
     subtotal = serializers.DecimalField(
-        source='get_subtotal',
         max_digits=10,
         decimal_places=2,
         read_only=True
@@ -23,16 +38,46 @@ class CartItemSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'created_at']
 
 class CartSerializer(serializers.ModelSerializer):
+    """Serializes carts read through ``Cart.objects.for_read()``."""
     items = CartItemSerializer(many=True, read_only=True)
     vendor_name = serializers.CharField(source='vendor.business_name', read_only=True)
-    total = serializers.DecimalField(
-        source='get_total',
-        max_digits=10,
-        decimal_places=2,
-        read_only=True
-    )
 
     class Meta:
         model = Cart
-        fields = ['id', 'vendor', 'vendor_name', 'items', 'total', 'created_at', 'updated_at']
-        read_only_fields = ['id', 'created_at', 'updated_at']
\ No newline at end of file
+        fields = ['id', 'vendor', 'vendor_name', 'items', 'item_count', 'total', 'created_at', 'updated_at']
+        read_only_fields = ['id', 'item_count', 'total', 'created_at', 'updated_at']
+
+class CartSummarySerializer(serializers.Serializer):
+    carts = serializers.IntegerField()
+    item_count = serializers.IntegerField()
+    total = serializers.DecimalField(max_digits=10, decimal_places=2)
+
+class CartOperationSerializer(serializers.Serializer):
+    op = serializers.ChoiceField(choices=['add', 'set', 'remove'])
+    product_id = serializers.IntegerField()
+    quantity = serializers.IntegerField(min_value=0, max_value=MAX_ITEM_QUANTITY, required=False)
+
+    def validate(self, data):
+        if data['op'] == 'add':
+            data.setdefault('quantity', 1)
+            if data['quantity'] < 1:
+                raise serializers.ValidationError({'quantity': ['Quantity must be positive']})
+        elif data['op'] == 'set' and 'quantity' not in data:
+            raise serializers.ValidationError({'quantity': ['This field is required.']})
+        return data
+
+class CartBatchSerializer(serializers.Serializer):
+    operations = CartOperationSerializer(many=True, allow_empty=False, max_length=MAX_CART_OPERATIONS)
+
+class GuestCartItemSerializer(serializers.Serializer):
+    product = CartProductSerializer()
+    quantity = serializers.IntegerField()
+    subtotal = serializers.DecimalField(max_digits=10, decimal_places=2)
+
+class GuestCartSerializer(serializers.Serializer):
+    """Serializes the per-vendor dicts built by ``get_guest_carts()``."""
+    vendor = serializers.IntegerField()
+    vendor_name = serializers.CharField()
+    items = GuestCartItemSerializer(many=True)
+    item_count = serializers.IntegerField()
+    total = serializers.DecimalField(max_digits=10, decimal_places=2)
@@ -0,0 +1,29 @@
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from ..products.models import Product
+from .models import Cart, CartItem
+
+
+@receiver(post_save, sender=Product)
+def product_price_changed(sender, instance, raw=False, created=False, update_fields=None, **kwargs):
+    # The price as stored, read by products' remember_stored_product, so
+    # only actual price changes touch the carts
+    stored = getattr(instance, '_stored_row', None)
+    if raw or created or stored is None or (update_fields and 'price' not in update_fields):
+        return
+    if stored['price'] != instance.price:
+        Cart.objects.refresh_totals_for_products([instance.pk])
+
+
+@receiver(pre_delete, sender=Product)
+def remember_product_carts(sender, instance, **kwargs):
+    # Its cart items go through CASCADE; their carts need new totals after
+    instance._cart_ids = list(CartItem.objects.filter(product=instance).values_list('cart_id', flat=True))
+
+
+@receiver(post_delete, sender=Product)
+def product_deleted(sender, instance, **kwargs):
+    cart_ids = getattr(instance, '_cart_ids', None)
+    if cart_ids:
+        Cart.objects.filter(pk__in=cart_ids, is_active=True).refresh_totals()
@@ -1,2 +1,4 @@
 from .test_models import CartItemModelTests, CartModelTests
-from .test_views import CartViewTests, CartItemViewTests
\ No newline at end of file
+from .test_views import (
+    CartBatchViewTests, CartConcurrencyTests, CartItemViewTests, CartViewTests, GuestCartViewTests
+)
\ No newline at end of file
@@ -1,3 +1,4 @@
+from django.core.cache import caches
 from django.test import TestCase
 from django.contrib.auth import get_user_model
 from django.db.utils import IntegrityError
@@ -10,6 +11,8 @@ User = get_user_model()
 
 class CartModelTests(TestCase):
     def setUp(self):
+        # Rolled back ids are reused, so drop snapshots built by earlier tests
+        caches['shared'].clear()
         # Create test user
         self.user = User.objects.create_user(
             username='testuser',
@@ -92,6 +95,7 @@ class CartModelTests(TestCase):
 
 class CartItemModelTests(TestCase):
     def setUp(self):
+        caches['shared'].clear()
         # Create test user
         self.user = User.objects.create_user(
             username='testuser',
@@ -146,6 +150,12 @@ class CartItemModelTests(TestCase):
                 quantity=2
             )
 
+    def test_add_quantity_creates_then_increments(self):
+        CartItem.objects.add_quantity(self.cart, self.product.id, 2)
+        CartItem.objects.add_quantity(self.cart, self.product.id, 3)
+        cart_item = CartItem.objects.get(cart=self.cart, product=self.product)
+        self.assertEqual(cart_item.quantity, 5)
+
     def test_cart_item_subtotal_calculation(self):
         cart_item = CartItem.objects.create(
             cart=self.cart,
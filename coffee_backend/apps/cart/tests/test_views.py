@@ -1,17 +1,28 @@
-from django.test import TestCase
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connection
+from django.test import TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from django.contrib.auth import get_user_model
 from rest_framework.test import APIClient
 from rest_framework import status
 from decimal import Decimal
 from ...accounts.models import VendorProfile
+from ...products.bulk import import_products
 from ...products.models import Product
-from ..models import Cart, CartItem
+from ...products.snapshot import get_catalog_snapshot
+from ..models import MAX_ITEM_QUANTITY, Cart, CartItem
 
 User = get_user_model()
 
 class CartViewTests(TestCase):
     def setUp(self):
+        # Rolled back ids are reused, so drop snapshots built by earlier tests
+        caches['shared'].clear()
         self.client = APIClient()
         self.user = User.objects.create_user(
             username='testuser',
@@ -47,6 +58,58 @@ class CartViewTests(TestCase):
         self.assertEqual(len(response.data), 1)
         self.assertEqual(len(response.data[0]['items']), 1)
 
+    def test_get_carts_constant_queries(self):
+        vendors = [self.vendor] + [
+            VendorProfile.objects.create(
+                user=User.objects.create_user(username=f'vendor{i}', password='vendorpass123'),
+                business_name=f'Shop {i}'
+            )
+            for i in range(2)
+        ]
+        for vendor in vendors:
+            cart = Cart.objects.create(user=self.user, vendor=vendor)
+            for i in range(10):
+                product = Product.objects.create(name=f'Product {i}', price=Decimal('2.50'), vendor=vendor)
+                CartItem.objects.create(cart=cart, product=product, quantity=i + 1)
+        Cart.objects.refresh_totals()
+
+        # Conditional GET validators, carts with totals, items with products
+        with self.assertNumQueries(3):
+            response = self.client.get(reverse('cart'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data), 3)
+        cart = response.data[0]
+        self.assertEqual(cart['vendor_name'], 'Test Shop')
+        self.assertEqual(cart['total'], '137.50')
+        self.assertEqual(cart['item_count'], 55)
+        self.assertEqual(len(cart['items']), 10)
+        self.assertEqual(cart['items'][1]['subtotal'], '5.00')
+        self.assertEqual(cart['items'][1]['product']['name'], 'Product 1')
+        self.assertNotIn('reviews', cart['items'][1]['product'])
+
+    def test_add_item_maintains_totals(self):
+        for quantity in (2, 1):
+            response = self.client.post(reverse('cart'), {
+                'vendor_id': self.vendor.id,
+                'product_id': self.product.id,
+                'quantity': quantity
+            })
+        self.assertEqual((response.data['item_count'], response.data['total']), (3, '30.00'))
+        cart = Cart.objects.get()
+        self.assertEqual((cart.item_count, cart.total), (3, Decimal('30.00')))
+
+    def test_summary(self):
+        other_vendor = VendorProfile.objects.create(
+            user=User.objects.create_user(username='othervendor', password='vendorpass123')
+        )
+        Cart.objects.create(user=self.user, vendor=self.vendor, item_count=3, total=Decimal('30.00'))
+        Cart.objects.create(user=self.user, vendor=other_vendor, item_count=1, total=Decimal('4.50'))
+        Cart.objects.create(user=self.user, vendor=self.vendor, is_active=False, item_count=9, total=Decimal('90.00'))
+
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('cart-summary'))
+        self.assertEqual(response.data, {'carts': 2, 'item_count': 4, 'total': '34.50'})
+
     def test_add_item_to_cart_new_cart(self):
         response = self.client.post(reverse('cart'), {
             'vendor_id': self.vendor.id,
@@ -102,8 +165,36 @@ class CartViewTests(TestCase):
         
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
 
+    def test_conditional_get(self):
+        cart = Cart.objects.create(user=self.user, vendor=self.vendor)
+        item = CartItem.objects.create(cart=cart, product=self.product, quantity=2)
+        response = self.client.get(reverse('cart'))
+        etag = response['ETag']
+        self.assertIn('Last-Modified', response)
+
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('cart'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        item.quantity = 3
+        item.save()
+        response = self.client.get(reverse('cart'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+
+        etag = response['ETag']
+        other = CartItem.objects.create(
+            cart=cart,
+            product=Product.objects.create(name='Other Product', price=Decimal('20.00'), vendor=self.vendor)
+        )
+        other.delete()
+        item.delete()
+        response = self.client.get(reverse('cart'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
 class CartItemViewTests(TestCase):
     def setUp(self):
+        caches['shared'].clear()
         self.client = APIClient()
         self.user = User.objects.create_user(
             username='testuser',
@@ -120,6 +211,7 @@ class CartItemViewTests(TestCase):
         )
         self.product = Product.objects.create(
             name='Test Product',
+            sku='TP-1',
             price=Decimal('10.00'),
             vendor=self.vendor
         )
@@ -140,6 +232,8 @@ class CartItemViewTests(TestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.cart_item.refresh_from_db()
         self.assertEqual(self.cart_item.quantity, 5)
+        self.cart.refresh_from_db()
+        self.assertEqual((self.cart.item_count, self.cart.total), (5, Decimal('50.00')))
 
     def test_update_cart_item_quantity_zero(self):
         response = self.client.put(
@@ -184,4 +278,276 @@ class CartItemViewTests(TestCase):
         
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(CartItem.objects.filter(id=self.cart_item.id).exists(), False)
-        self.assertEqual(Cart.objects.filter(id=self.cart.id).exists(), True)
\ No newline at end of file
+        self.assertEqual(Cart.objects.filter(id=self.cart.id).exists(), True)
+        self.cart.refresh_from_db()
+        self.assertEqual((self.cart.item_count, self.cart.total), (1, Decimal('20.00')))
+
+    def test_price_change_refreshes_totals(self):
+        ordered = Cart.objects.create(user=self.user, vendor=self.vendor, is_active=False)
+        CartItem.objects.create(cart=ordered, product=self.product, quantity=1)
+        Cart.objects.refresh_totals()
+
+        self.product.price = Decimal('12.50')
+        with CaptureQueriesContext(connection) as queries:
+            self.product.save()
+        # The stored row is read once for the product and cart handlers
+        reads = [q['sql'] for q in queries if q['sql'].startswith('SELECT') and 'FROM "products_product"' in q['sql']]
+        self.assertEqual(len(reads), 1)
+        self.cart.refresh_from_db()
+        ordered.refresh_from_db()
+        self.assertEqual(self.cart.total, Decimal('25.00'))
+        self.assertEqual(ordered.total, Decimal('10.00'))
+
+        import_products(self.vendor, [{'sku': 'TP-1', 'price': '7.00'}])
+        self.cart.refresh_from_db()
+        self.assertEqual(self.cart.total, Decimal('14.00'))
+
+        self.product.delete()
+        self.cart.refresh_from_db()
+        self.assertEqual((self.cart.item_count, self.cart.total), (0, Decimal('0.00')))
+class CartBatchViewTests(TestCase):
+    def setUp(self):
+        caches['shared'].clear()
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.vendors = [
+            VendorProfile.objects.create(
+                user=User.objects.create_user(username=f'vendor{i}', password='vendorpass123'),
+                business_name=f'Shop {i}'
+            )
+            for i in range(2)
+        ]
+        self.products = [
+            Product.objects.create(name=f'Product {i}', price=Decimal('2.00'), vendor=self.vendors[i % 2])
+            for i in range(30)
+        ]
+        self.url = reverse('cart-batch')
+        self.client.force_authenticate(user=self.user)
+
+    def test_sync_many_items_in_one_request(self):
+        cart = Cart.objects.create(user=self.user, vendor=self.vendors[0])
+        stale = Product.objects.create(name='Sold out', price=Decimal('1.00'), vendor=self.vendors[0])
+        CartItem.objects.create(cart=cart, product=stale, quantity=1)
+        for product in self.products[:10:2]:
+            CartItem.objects.create(cart=cart, product=product, quantity=1)
+        operations = [
+            {'op': 'set', 'product_id': product.id, 'quantity': 2} for product in self.products
+        ] + [{'op': 'remove', 'product_id': stale.id}]
+        get_catalog_snapshot()
+        # Carts, items, the new cart, the item INSERT, UPDATE and DELETE,
+        # totals, emptied carts, the final carts and their items, plus the
+        # savepoint pairs of the transaction and the conflict retry
+        with self.assertNumQueries(14):
+            response = self.client.post(self.url, {'operations': operations}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data), 2)
+        self.assertEqual(response.data[0]['id'], cart.id)
+        self.assertEqual([len(cart['items']) for cart in response.data], [15, 15])
+        self.assertEqual([cart['total'] for cart in response.data], ['60.00', '60.00'])
+
+    def test_operations_apply_in_order(self):
+        first, second, third = self.products[0], self.products[2], self.products[1]
+        cart = Cart.objects.create(user=self.user, vendor=self.vendors[0])
+        CartItem.objects.create(cart=cart, product=first, quantity=1)
+        CartItem.objects.create(cart=cart, product=second, quantity=4)
+
+        response = self.client.post(self.url, {'operations': [
+            {'op': 'add', 'product_id': first.id, 'quantity': 2},
+            {'op': 'add', 'product_id': first.id},
+            {'op': 'remove', 'product_id': second.id},
+            {'op': 'add', 'product_id': third.id, 'quantity': 1},
+            {'op': 'set', 'product_id': third.id, 'quantity': 5},
+        ]}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            dict(CartItem.objects.values_list('product_id', 'quantity')), {first.id: 4, third.id: 5}
+        )
+        cart.refresh_from_db()
+        self.assertEqual((cart.item_count, cart.total), (4, Decimal('8.00')))
+
+    def test_emptied_carts_are_deleted(self):
+        cart = Cart.objects.create(user=self.user, vendor=self.vendors[0])
+        CartItem.objects.create(cart=cart, product=self.products[0], quantity=1)
+
+        response = self.client.post(self.url, {'operations': [
+            {'op': 'set', 'product_id': self.products[0].id, 'quantity': 0},
+        ]}, format='json')
+        self.assertEqual(response.data, [])
+        self.assertFalse(Cart.objects.exists())
+
+    def test_invalid_operations_change_nothing(self):
+        response = self.client.post(self.url, {'operations': [
+            {'op': 'add', 'product_id': self.products[0].id},
+            {'op': 'add', 'product_id': self.products[-1].id + 1},
+        ]}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('product_id', response.data)
+
+        response = self.client.post(self.url, {'operations': [
+            {'op': 'set', 'product_id': self.products[0].id},
+        ]}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Cart.objects.exists())
+
+    def test_quantities_are_capped(self):
+        product = self.products[0]
+        for operation in ({'op': 'set', 'quantity': 10 ** 12}, {'op': 'add', 'quantity': 2 ** 31}):
+            response = self.client.post(self.url, {'operations': [
+                dict(operation, product_id=product.id)
+            ]}, format='json')
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Cart.objects.exists())
+
+        # Adds that pile up stop at the cap instead of overflowing the totals
+        response = self.client.post(self.url, {'operations': [
+            {'op': 'add', 'product_id': product.id, 'quantity': MAX_ITEM_QUANTITY} for _ in range(3)
+        ]}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(CartItem.objects.get().quantity, MAX_ITEM_QUANTITY)
+        response = self.client.post(reverse('cart'), {
+            'vendor_id': product.vendor_id, 'product_id': product.id, 'quantity': 1
+        })
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(CartItem.objects.get().quantity, MAX_ITEM_QUANTITY)
+        self.assertEqual(self.client.get(reverse('cart')).status_code, status.HTTP_200_OK)
+
+class CartConcurrencyTests(TransactionTestCase):
+    def setUp(self):
+        caches['shared'].clear()
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.vendor = VendorProfile.objects.create(
+            user=User.objects.create_user(username='vendoruser', password='vendorpass123'),
+            business_name='Test Shop'
+        )
+        self.product = Product.objects.create(name='Test Product', price=Decimal('10.00'), vendor=self.vendor)
+
+    def add_item(self, barrier):
+        client = APIClient()
+        client.force_authenticate(user=self.user)
+        barrier.wait()
+        try:
+            return client.post(reverse('cart'), {
+                'vendor_id': self.vendor.id,
+                'product_id': self.product.id,
+                'quantity': 2
+            }).status_code
+        finally:
+            connection.close()
+
+    def test_parallel_adds_keep_every_unit(self):
+        workers = 8
+        barrier = threading.Barrier(workers)
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            statuses = list(executor.map(self.add_item, [barrier] * workers))
+
+        self.assertEqual(statuses, [status.HTTP_200_OK] * workers)
+        item = CartItem.objects.get()
+        self.assertEqual(item.quantity, 2 * workers)
+        cart = Cart.objects.get()
+        self.assertEqual((cart.item_count, cart.total), (2 * workers, Decimal('160.00')))
+
+    def add_batch(self, barrier):
+        client = APIClient()
+        client.force_authenticate(user=self.user)
+        barrier.wait()
+        try:
+            return client.post(reverse('cart-batch'), {'operations': [
+                {'op': 'add', 'product_id': self.product.id, 'quantity': 3},
+            ]}, format='json').status_code
+        finally:
+            connection.close()
+
+    def test_parallel_batches_and_adds_create_the_cart_once(self):
+        workers = 8
+        barrier = threading.Barrier(workers)
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = [
+                executor.submit(self.add_batch if i % 2 else self.add_item, barrier) for i in range(workers)
+            ]
+            statuses = [future.result() for future in futures]
+
+        self.assertEqual(statuses, [status.HTTP_200_OK] * workers)
+        item = CartItem.objects.get()
+        self.assertEqual(item.quantity, 5 * workers // 2)
+        cart = Cart.objects.get()
+        self.assertEqual((cart.item_count, cart.total), (5 * workers // 2, Decimal('200.00')))
+
+class GuestCartViewTests(TestCase):
+    def setUp(self):
+        caches['shared'].clear()
+        caches['carts'].clear()
+        self.client = APIClient()
+        self.vendor = VendorProfile.objects.create(
+            user=User.objects.create_user(username='vendoruser', password='vendorpass123'),
+            business_name='Test Shop'
+        )
+        self.product = Product.objects.create(name='Test Product', price=Decimal('10.00'), vendor=self.vendor)
+        self.other = Product.objects.create(name='Other Product', price=Decimal('4.00'), vendor=self.vendor)
+        self.url = reverse('cart-guest')
+
+    def add(self, product, quantity):
+        return self.client.post(self.url, {'operations': [
+            {'op': 'add', 'product_id': product.id, 'quantity': quantity}
+        ]}, format='json')
+
+    def test_guest_cart_skips_the_database_writes(self):
+        get_catalog_snapshot()
+        # Only the products are read back for the response
+        with self.assertNumQueries(1):
+            response = self.add(self.product, 2)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn(settings.GUEST_CART_COOKIE, response.cookies)
+        self.add(self.other, 1)
+        self.add(self.product, 1)
+
+        response = self.client.get(self.url)
+        self.assertEqual(len(response.data), 1)
+        self.assertEqual(response.data[0]['vendor_name'], 'Test Shop')
+        self.assertEqual((response.data[0]['item_count'], response.data[0]['total']), (4, '34.00'))
+        self.assertEqual(
+            [(item['product']['id'], item['quantity']) for item in response.data[0]['items']],
+            [(self.product.id, 3), (self.other.id, 1)]
+        )
+        self.assertFalse(Cart.objects.exists())
+
+    def test_tampered_cookie_starts_over(self):
+        self.add(self.product, 2)
+        self.client.cookies[settings.GUEST_CART_COOKIE] = 'forged'
+        self.assertEqual(self.client.get(self.url).data, [])
+
+    def test_invalid_product(self):
+        response = self.add(Product(pk=self.other.pk + 1), 1)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertNotIn(settings.GUEST_CART_COOKIE, response.cookies)
+
+    def test_login_merges_guest_cart(self):
+        user = User.objects.create_user(username='testuser', password='testpass123')
+        cart = Cart.objects.create(user=user, vendor=self.vendor)
+        CartItem.objects.create(cart=cart, product=self.product, quantity=1)
+        self.add(self.product, 2)
+        self.add(self.other, 1)
+        guest_cookie = self.client.cookies[settings.GUEST_CART_COOKIE].value
+
+        response = self.client.post(reverse('login'), {'username': 'testuser', 'password': 'testpass123'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.cookies[settings.GUEST_CART_COOKIE].value, '')
+        self.assertEqual(
+            dict(CartItem.objects.values_list('product_id', 'quantity')), {self.product.id: 3, self.other.id: 1}
+        )
+        cart.refresh_from_db()
+        self.assertEqual((cart.item_count, cart.total), (4, Decimal('34.00')))
+        # The guest cart is gone, not merged twice
+        self.client.cookies[settings.GUEST_CART_COOKIE] = guest_cookie
+        self.assertEqual(self.client.get(self.url).data, [])
+
+    def test_signup_merges_guest_cart(self):
+        self.add(self.product, 2)
+        response = self.client.post(reverse('signup'), {
+            'username': 'newuser',
+            'email': 'new@example.com',
+            'password': 'testpass123',
+            'user_type': 'CUSTOMER'
+        })
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        cart = Cart.objects.get(user__username='newuser')
+        self.assertEqual((cart.item_count, cart.total), (2, Decimal('20.00')))
@@ -1,8 +1,11 @@
 from django.urls import path
-from .views import CartView, CartItemView
+from .views import CartBatchView, CartView, CartItemView, CartSummaryView, GuestCartView
 
 
 urlpatterns = [
     path('cart/', CartView.as_view(), name='cart'),
+    path('batch/', CartBatchView.as_view(), name='cart-batch'),
+    path('guest/', GuestCartView.as_view(), name='cart-guest'),
+    path('summary/', CartSummaryView.as_view(), name='cart-summary'),
     path('items/<int:item_id>/', CartItemView.as_view(), name='cart-item'),
 ]
\ No newline at end of file
@@ -1,32 +1,63 @@
 # cart/views.py
+from django.conf import settings
 from rest_framework import status, permissions
 from rest_framework.views import APIView
 from rest_framework.response import Response
+from django.http import Http404
 from django.shortcuts import get_object_or_404
 from django.db import transaction
-from .models import Cart, CartItem
-from ..products.models import Product
+from django.db.models import Count, Max, Sum
+from django.db.models.functions import Coalesce
+from .models import MAX_ITEM_QUANTITY, ZERO, Cart, CartItem
+from ..products.snapshot import get_product_record
+from ..products.conditional import conditional_get
 from ..accounts.models import VendorProfile
-from .serializers import CartSerializer, CartItemSerializer
+from .bulk import apply_cart_operations, get_final_quantities
+from .guest import (
+    get_guest_cart_id, get_guest_carts, load_guest_cart, new_guest_cart_id, save_guest_cart, set_guest_cart_cookie
+)
+from .serializers import CartBatchSerializer, CartSerializer, CartSummarySerializer, GuestCartSerializer
+
+def get_cart_validators(request):
+    # Counts and the item id sum catch removals that leave no newer timestamp
+    stats = Cart.objects.filter(user=request.user, is_active=True).aggregate(
+        carts=Count('id', distinct=True),
+        item_count=Count('items'),
+        item_ids=Sum('items__id'),
+        cart_updated=Max('updated_at'),
+        item_updated=Max('items__updated_at'),
+        product_updated=Max('items__product__updated_at'),
+    )
+    timestamps = [
+        stats[name] for name in ('cart_updated', 'item_updated', 'product_updated')
+        if stats[name] is not None
+    ]
+    return repr(sorted(stats.items())), max(timestamps, default=None)
+
+def serialize_cart(cart):
+    # Re-read through the cart read path so writes answer like GET does
+    return CartSerializer(Cart.objects.for_read().get(pk=cart.pk)).data
 
 class CartView(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def get_cart(self, user, vendor_id):
         vendor = get_object_or_404(VendorProfile, id=vendor_id)
-        cart, created = Cart.objects.get_or_create(
+        # Locked until commit, so concurrent adds refresh the totals in turn
+        cart, created = Cart.objects.select_for_update().get_or_create(
             user=user,
             vendor=vendor,
             is_active=True
         )
         return cart
 
+    @conditional_get(get_cart_validators, private=True)
     def get(self, request):
         # Get all active carts for the user
         carts = Cart.objects.filter(
             user=request.user,
             is_active=True
-        )
+        ).for_read()
         serializer = CartSerializer(carts, many=True)
         return Response(serializer.data)
 
@@ -36,9 +67,11 @@ class CartView(APIView):
         product_id = request.data.get('product_id')
         quantity = int(request.data.get('quantity', 1))
 
-        # Validate vendor and product
-        product = get_object_or_404(Product, id=product_id)
-        if str(product.vendor.id) != str(vendor_id):
+        # Validate vendor and product against the in-process catalog snapshot
+        product = get_product_record(product_id)
+        if product is None:
+            raise Http404('No Product matches the given query.')
+        if str(product.vendor_id) != str(vendor_id):
             return Response(
                 {'error': 'Product does not belong to this vendor'},
                 status=status.HTTP_400_BAD_REQUEST
@@ -49,21 +82,18 @@ class CartView(APIView):
                 {'error': 'Quantity must be positive'},
                 status=status.HTTP_400_BAD_REQUEST
             )
+        if quantity > MAX_ITEM_QUANTITY:
+            return Response(
+                {'error': f'Quantity must be at most {MAX_ITEM_QUANTITY}'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
 
         try:
             cart = self.get_cart(request.user, vendor_id)
-            cart_item, created = CartItem.objects.get_or_create(
-                cart=cart,
-                product=product,
-                defaults={'quantity': quantity}
-            )
-
-            if not created:
-                cart_item.quantity += quantity
-                cart_item.save()
+            CartItem.objects.add_quantity(cart, product.id, quantity)
+            Cart.objects.filter(pk=cart.pk).refresh_totals()
 
-            serializer = CartSerializer(cart)
-            return Response(serializer.data)
+            return Response(serialize_cart(cart))
 
         except Exception as e:
             return Response(
@@ -71,9 +101,81 @@ class CartView(APIView):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
+class GuestCartView(APIView):
+    # Carts of visitors who are not logged in, kept in the 'carts' cache
+    # under a signed cookie; nothing is written to the database until login
+    permission_classes = [permissions.AllowAny]
+
+    def get(self, request):
+        quantities = load_guest_cart(get_guest_cart_id(request))
+        return Response(GuestCartSerializer(get_guest_carts(quantities), many=True).data)
+
+    def post(self, request):
+        # The batch endpoint's add/set/remove operations
+        serializer = CartBatchSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        operations = serializer.validated_data['operations']
+        missing = sorted({
+            operation['product_id'] for operation in operations
+            if get_product_record(operation['product_id']) is None
+        })
+        if missing:
+            return Response(
+                {'product_id': [f'Invalid pk "{product_id}" - object does not exist.' for product_id in missing]},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        cart_id = get_guest_cart_id(request) or new_guest_cart_id()
+        quantities = get_final_quantities(operations, load_guest_cart(cart_id))
+        quantities = {product_id: quantity for product_id, quantity in quantities.items() if quantity}
+        if len(quantities) > settings.GUEST_CART_MAX_ITEMS:
+            return Response(
+                {'operations': [f'A guest cart holds at most {settings.GUEST_CART_MAX_ITEMS} products.']},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        save_guest_cart(cart_id, quantities)
+        response = Response(GuestCartSerializer(get_guest_carts(quantities), many=True).data)
+        set_guest_cart_cookie(response, cart_id)
+        return response
+
+class CartSummaryView(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request):
+        # Badge numbers from the stored cart totals; no items are read
+        summary = Cart.objects.filter(user=request.user, is_active=True).aggregate(
+            carts=Count('id'),
+            item_count=Coalesce(Sum('item_count'), 0),
+            total=Coalesce(Sum('total'), ZERO),
+        )
+        return Response(CartSummarySerializer(summary).data)
+
+class CartBatchView(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request):
+        # Many add/set/remove operations in one transaction, answered with
+        # the final carts as GET returns them
+        serializer = CartBatchSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        operations = serializer.validated_data['operations']
+        products = {operation['product_id']: get_product_record(operation['product_id']) for operation in operations}
+        missing = sorted(product_id for product_id, product in products.items() if product is None)
+        if missing:
+            return Response(
+                {'product_id': [f'Invalid pk "{product_id}" - object does not exist.' for product_id in missing]},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        apply_cart_operations(request.user, operations, products)
+        carts = Cart.objects.filter(user=request.user, is_active=True).for_read()
+        return Response(CartSerializer(carts, many=True).data)
+
 class CartItemView(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
+    @transaction.atomic
     def put(self, request, item_id):
         cart_item = get_object_or_404(
             CartItem,
@@ -83,22 +185,29 @@ class CartItemView(APIView):
         )
         
         quantity = int(request.data.get('quantity', 0))
+        if quantity > MAX_ITEM_QUANTITY:
+            return Response(
+                {'error': f'Quantity must be at most {MAX_ITEM_QUANTITY}'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
         
         if quantity > 0:
             cart_item.quantity = quantity
             cart_item.save()
-            serializer = CartSerializer(cart_item.cart)
-            return Response(serializer.data)
+            Cart.objects.filter(pk=cart_item.cart_id).refresh_totals()
+            return Response(serialize_cart(cart_item.cart))
         elif quantity == 0:
             cart_item.delete()
-            serializer = CartSerializer(cart_item.cart)
-            return Response(serializer.data)
+            cart_item.cart.save(update_fields=['updated_at'])
+            Cart.objects.filter(pk=cart_item.cart_id).refresh_totals()
+            return Response(serialize_cart(cart_item.cart))
         else:
             return Response(
                 {'error': 'Quantity must be non-negative'},
                 status=status.HTTP_400_BAD_REQUEST
             )
 
+    @transaction.atomic
     def delete(self, request, item_id):
         cart_item = get_object_or_404(
             CartItem,
@@ -113,6 +222,7 @@ class CartItemView(APIView):
         if cart.items.count() == 0:
             cart.delete()
             return Response(status=status.HTTP_204_NO_CONTENT)
-            
-        serializer = CartSerializer(cart)
-        return Response(serializer.data)
\ No newline at end of file
+
+        cart.save(update_fields=['updated_at'])
+        Cart.objects.filter(pk=cart.pk).refresh_totals()
+        return Response(serialize_cart(cart))
\ No newline at end of file
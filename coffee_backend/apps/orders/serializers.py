@@ -1,3 +1,4 @@
+from django.db import transaction
 from rest_framework import serializers
 from .models import Order, OrderItem
 
@@ -15,6 +16,7 @@ class OrderSerializer(serializers.ModelSerializer):
         fields = ['id', 'customer', 'status', 'total_amount', 'shipping_address', 'phone_number', 'tracking_number', 'items', 'created_at', 'updated_at']
         read_only_fields = ['created_at', 'updated_at']
 
+    @transaction.atomic
     def create(self, validated_data):
         items_data = validated_data.pop('items')
         order = Order.objects.create(**validated_data)
@@ -23,6 +25,7 @@ class OrderSerializer(serializers.ModelSerializer):
             OrderItem.objects.create(order=order, **item_data)
         return order
     
+    @transaction.atomic
     def update(self, instance, validated_data):
         items_data = validated_data.pop('items', None)
 
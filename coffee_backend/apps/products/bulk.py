@@ -0,0 +1,186 @@
+import codecs
+import csv
+import json
+import time
+from collections import Counter
+
+from django.db import transaction
+from rest_framework.exceptions import UnsupportedMediaType
+
+from ..cart.models import Cart
+from .cache import bump_catalog_version, bump_snapshot_version
+from .facets import adjust_facet_count, get_facet_key
+from .models import Category, Product
+from .search import SEARCHABLE_FIELDS, index_products
+from .serializers import ProductImportSerializer
+
+CHUNK_SIZE = 500
+MAX_REPORTED_ERRORS = 1000
+
+
+def iter_csv_rows(lines):
+    return csv.DictReader(codecs.iterdecode(lines, 'utf-8-sig'))
+
+
+def iter_ndjson_rows(lines):
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError:
+            row = None
+        # None marks a line that is not a JSON object; it is reported per row
+        yield row if isinstance(row, dict) else None
+
+
+ROW_PARSERS = {
+    'text/csv': iter_csv_rows,
+    'application/x-ndjson': iter_ndjson_rows,
+    'application/jsonl': iter_ndjson_rows,
+}
+
+
+def get_row_parser(content_type):
+    media_type = (content_type or '').split(';')[0].strip().lower()
+    try:
+        return ROW_PARSERS[media_type]
+    except KeyError:
+        raise UnsupportedMediaType(media_type)
+
+
+class ImportReport:
+    def __init__(self):
+        self.rows = 0
+        self.created = 0
+        self.updated = 0
+        self.error_count = 0
+        self.errors = []
+        self.started = time.perf_counter()
+
+    def add_error(self, row, sku, errors):
+        # Only the first errors are kept so a broken file cannot grow the report
+        self.error_count += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({'row': row, 'sku': sku, 'errors': errors})
+
+    def as_dict(self):
+        elapsed = time.perf_counter() - self.started
+        return {
+            'rows': self.rows,
+            'created': self.created,
+            'updated': self.updated,
+            'error_count': self.error_count,
+            'errors': self.errors,
+            'elapsed': round(elapsed, 3),
+            'rows_per_second': round(self.rows / elapsed) if elapsed else None,
+        }
+
+
+def import_products(vendor, rows, chunk_size=CHUNK_SIZE):
+    """
+    Upsert ``rows`` (dicts, or None for unparsable lines) into ``vendor``'s
+    products keyed on SKU. Rows are consumed lazily and written one chunk
+    per transaction, so memory does not grow with the file. Rows are
+    numbered from 1, not counting a CSV header.
+    """
+    report = ImportReport()
+    chunk = []
+    try:
+        for number, row in enumerate(rows, start=1):
+            chunk.append((number, row))
+            if len(chunk) >= chunk_size:
+                import_chunk(vendor, chunk, report)
+                chunk = []
+    except (csv.Error, UnicodeDecodeError) as exc:
+        report.add_error(report.rows + len(chunk) + 1, None, {'non_field_errors': [f'Unreadable row: {exc}']})
+    import_chunk(vendor, chunk, report)
+
+    if report.created or report.updated:
+        bump_catalog_version(vendor.pk)
+    if report.updated:
+        # Created products are found without a snapshot rebuild
+        bump_snapshot_version()
+    return report
+
+
+def validate_chunk(vendor, chunk, report):
+    skus = {str(row.get('sku', '')).strip() for _, row in chunk if row is not None}
+    existing = {product.sku: product for product in Product.objects.filter(vendor=vendor, sku__in=skus)}
+
+    valid = {}
+    for number, row in chunk:
+        if row is None:
+            report.add_error(number, None, {'non_field_errors': ['Expected a JSON object.']})
+            continue
+        sku = str(row.get('sku', '')).strip() or None
+        serializer = ProductImportSerializer(data=row, partial=sku in existing)
+        if not serializer.is_valid():
+            report.add_error(number, sku, serializer.errors)
+            continue
+        # A later row for the same SKU wins, as if the rows were applied in order
+        data = dict(valid.get(sku, (None, {}))[1], **serializer.validated_data)
+        valid[sku] = (number, data)
+
+    category_ids = {data['category'] for _, data in valid.values() if data.get('category')}
+    known = set(Category.objects.filter(pk__in=category_ids).values_list('pk', flat=True))
+    for sku, (number, data) in list(valid.items()):
+        if data.get('category') and data['category'] not in known:
+            report.add_error(number, sku, {'category': [f'Invalid pk "{data["category"]}" - object does not exist.']})
+            del valid[sku]
+    return valid, existing
+
+
+def import_chunk(vendor, chunk, report):
+    if not chunk:
+        return
+    report.rows += len(chunk)
+    valid, existing = validate_chunk(vendor, chunk, report)
+
+    created, updated, fields = [], [], {'updated_at'}
+    facet_deltas = Counter()
+    for sku, (number, data) in valid.items():
+        values = {('category_id' if name == 'category' else name): value for name, value in data.items()}
+        if 'image' in values:
+            # Imported images have no rendered variants; drop stale ones
+            values['image_variants'] = {}
+        product = existing.get(sku)
+        if product is None:
+            product = Product(vendor=vendor, **values)
+            created.append(product)
+        else:
+            facet_deltas[get_facet_key(product)] -= 1
+            for name, value in values.items():
+                setattr(product, name, value)
+            fields.update(values)
+            updated.append(product)
+        facet_deltas[get_facet_key(product)] += 1
+
+    # One INSERT ... ON CONFLICT (vendor, sku) DO UPDATE for the whole chunk;
+    # bulk_update builds a CASE per field and row and is several times slower.
+    # Existing rows go in without their pk so the SKU constraint decides.
+    for product in updated:
+        product.pk = None
+    with transaction.atomic():
+        Product.objects.bulk_create(
+            created + updated,
+            update_conflicts=True,
+            unique_fields=['vendor', 'sku'],
+            update_fields=sorted(fields),
+        )
+        # Bulk writes skip the product signals, so keep the facet counts, the
+        # search index and the totals of carts holding repriced products in
+        # step here
+        for key, delta in facet_deltas.items():
+            adjust_facet_count(key, delta)
+        reindex = created + (updated if SEARCHABLE_FIELDS & fields else [])
+        if reindex:
+            index_products(Product.objects.filter(vendor=vendor, sku__in=[product.sku for product in reindex]))
+        if updated and 'price' in fields:
+            Cart.objects.refresh_totals_for_products(
+                Product.objects.filter(vendor=vendor, sku__in=[product.sku for product in updated]).values('pk')
+            )
+
+    report.created += len(created)
+    report.updated += len(updated)
@@ -0,0 +1,147 @@
+import hashlib
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.db import transaction
+from rest_framework.response import Response
+
+VERSION_KEY = 'products:catalog:version'
+VENDOR_VERSION_KEY = 'products:catalog:vendor:{}:version'
+SNAPSHOT_VERSION_KEY = 'products:snapshot:version'
+CATALOG_KEY = 'products:{}:{}:{}:{}'
+HITS_KEY = 'products:response:hits'
+MISSES_KEY = 'products:response:misses'
+RESPONSE_CACHE_TIMEOUT = getattr(settings, 'CATALOG_CACHE_TIMEOUT', 300)
+SHARED_CACHE_ALIAS = 'shared'
+
+
+def get_catalog_version(vendor_id=None):
+    return _get_version(VENDOR_VERSION_KEY.format(vendor_id) if vendor_id else VERSION_KEY)
+
+
+# The version counters live in the shared alias so a write in one process
+# invalidates what every process cached; the cached data itself stays local
+def _get_version(key):
+    versions = caches[SHARED_CACHE_ALIAS]
+    version = versions.get(key)
+    if version is None:
+        # Seed from the clock so a counter evicted by the backend comes back
+        # larger than any version it handed out before
+        versions.add(key, time.time_ns(), timeout=None)
+        version = versions.get(key)
+    return version
+
+
+def _bump(key):
+    versions = caches[SHARED_CACHE_ALIAS]
+    try:
+        versions.incr(key)
+    except ValueError:
+        versions.add(key, time.time_ns(), timeout=None)
+
+
+def _bump_now_and_on_commit(keys):
+    for key in keys:
+        _bump(key)
+
+    # Data cached by concurrent readers from the pre-commit state would
+    # otherwise live under the new version
+    def bump_again():
+        for key in keys:
+            _bump(key)
+    transaction.on_commit(bump_again)
+
+
+def bump_catalog_version(vendor_id=None):
+    """
+    Invalidate every cached catalog response, or only those scoped to
+    ``vendor_id`` plus the global ones. Entries under older versions are
+    never read again and simply expire.
+    """
+    keys = [VERSION_KEY]
+    if vendor_id:
+        keys.append(VENDOR_VERSION_KEY.format(vendor_id))
+    _bump_now_and_on_commit(keys)
+
+
+def get_snapshot_version():
+    # Every process compares its snapshot against this
+    return _get_version(SNAPSHOT_VERSION_KEY)
+
+
+def bump_snapshot_version():
+    """Make every process rebuild its catalog snapshot on its next lookup."""
+    _bump_now_and_on_commit([SNAPSHOT_VERSION_KEY])
+
+
+def _count(key):
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, 1, timeout=None)
+
+
+def get_response_cache_stats():
+    return {
+        'hits': cache.get(HITS_KEY, 0),
+        'misses': cache.get(MISSES_KEY, 0),
+    }
+
+
+def get_catalog_cache_key(namespace, parts, vendor_id=None):
+    """Key for data derived from the catalog, valid until the next version bump."""
+    digest = hashlib.md5('\n'.join(parts).encode('utf-8')).hexdigest()
+    scope = f'vendor:{vendor_id}' if vendor_id else 'all'
+    return CATALOG_KEY.format(namespace, scope, get_catalog_version(vendor_id), digest)
+
+
+def get_normalized_params(request):
+    # Same parameters in any order, or repeated, normalize to one list
+    return sorted(
+        f'{name}={value}'
+        for name, values in request.query_params.lists()
+        for value in values
+    )
+
+
+def get_response_cache_key(request, vendor_id=None):
+    # The host is part of the key because pagination links are absolute
+    parts = [request.get_host(), request.path] + get_normalized_params(request)
+    return get_catalog_cache_key('response', parts, vendor_id)
+
+
+def cache_catalog_response(method):
+    """
+    Cache successful anonymous responses of a catalog ``get`` handler under
+    the current catalog version. A ``?vendor=`` filter, or the URL keyword
+    named by the view's ``cache_vendor_kwarg``, scopes the entry to that
+    vendor's version so other vendors' writes leave it alone.
+    """
+    @wraps(method)
+    def wrapper(view, request, *args, **kwargs):
+        if request.user.is_authenticated:
+            return method(view, request, *args, **kwargs)
+
+        vendor_kwarg = getattr(view, 'cache_vendor_kwarg', None)
+        if vendor_kwarg:
+            vendor_id = str(kwargs[vendor_kwarg])
+        else:
+            vendor_id = request.query_params.get('vendor', '') if 'pk' not in kwargs else ''
+        vendor_id = vendor_id if vendor_id.isdigit() else None
+        key = get_response_cache_key(request, vendor_id)
+        data = cache.get(key)
+        if data is not None:
+            _count(HITS_KEY)
+            response = Response(data)
+            response['X-Cache'] = 'HIT'
+            return response
+
+        _count(MISSES_KEY)
+        response = method(view, request, *args, **kwargs)
+        if response.status_code == 200:
+            cache.set(key, response.data, RESPONSE_CACHE_TIMEOUT)
+        response['X-Cache'] = 'MISS'
+        return response
+    return wrapper
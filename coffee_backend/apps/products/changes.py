@@ -0,0 +1,77 @@
+import base64
+import json
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+from rest_framework.exceptions import NotFound
+
+from .models import Product, ProductTombstone
+
+# Kinds order changes sharing a timestamp: saves before deletes
+UPSERT, DELETE = 0, 1
+INVALID_CURSOR_MESSAGE = 'Invalid cursor'
+
+
+def encode_change_cursor(position):
+    changed_at, kind, pk = position
+    payload = json.dumps([changed_at.isoformat(), kind, pk], separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii')
+
+
+def decode_change_cursor(token):
+    try:
+        changed_at, kind, pk = json.loads(base64.urlsafe_b64decode(token.encode('ascii')))
+        changed_at = datetime.fromisoformat(changed_at)
+        kind, pk = int(kind), int(pk)
+    except (TypeError, ValueError, UnicodeError):
+        raise NotFound(INVALID_CURSOR_MESSAGE)
+    if timezone.is_naive(changed_at):
+        raise NotFound(INVALID_CURSOR_MESSAGE)
+    return changed_at, kind, pk
+
+
+def get_seek_filter(field, pk_field, kind, position):
+    # Rows of this kind strictly after position in (changed_at, kind, id) order
+    if position is None:
+        return Q()
+    changed_at, position_kind, pk = position
+    seek = Q(**{f'{field}__gt': changed_at})
+    if kind > position_kind:
+        seek |= Q(**{field: changed_at})
+    elif kind == position_kind:
+        seek |= Q(**{field: changed_at, f'{pk_field}__gt': pk})
+    return seek
+
+
+def get_cursor_horizon():
+    # Tombstones older than this are pruned, so older cursors cannot resume
+    return timezone.now() - timedelta(days=settings.CHANGE_FEED_RETENTION_DAYS)
+
+
+def get_changes(position, limit, queryset=None):
+    """
+    Up to ``limit`` product changes after ``position`` (a decoded cursor,
+    or None for everything) in (changed_at, kind, id) order, as
+    ``(kind, position, product_or_id)`` tuples plus a has-more flag.
+    Products come from the (updated_at, id) index, deletes from the
+    tombstones. Changes newer than CHANGE_FEED_LAG seconds are held back
+    so a transaction that commits late is not skipped by a cursor.
+    """
+    queryset = Product.objects.all() if queryset is None else queryset
+    until = timezone.now() - timedelta(seconds=settings.CHANGE_FEED_LAG)
+    products = (
+        queryset.filter(get_seek_filter('updated_at', 'id', UPSERT, position), updated_at__lte=until)
+        .order_by('updated_at', 'id')[:limit + 1]
+    )
+    tombstones = (
+        ProductTombstone.objects
+        .filter(get_seek_filter('deleted_at', 'product_id', DELETE, position), deleted_at__lte=until)
+        .order_by('deleted_at', 'product_id')
+        .values_list('deleted_at', 'product_id')[:limit + 1]
+    )
+    changes = [(UPSERT, (product.updated_at, UPSERT, product.pk), product) for product in products]
+    changes += [(DELETE, (deleted_at, DELETE, pk), pk) for deleted_at, pk in tombstones]
+    changes.sort(key=lambda change: change[1])
+    return changes[:limit], len(changes) > limit
@@ -0,0 +1,35 @@
+from django.conf import settings
+from django.core.checks import Error, Tags, Warning, register
+
+from .cache import SHARED_CACHE_ALIAS
+
+PROCESS_LOCAL_BACKENDS = {
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+}
+
+
+@register(Tags.caches)
+def check_shared_cache(app_configs, **kwargs):
+    # The catalog versions must be seen by every worker, or a write in one
+    # leaves the others serving stale responses, prices and stock
+    if SHARED_CACHE_ALIAS not in settings.CACHES:
+        return [Error(
+            f"CACHES has no '{SHARED_CACHE_ALIAS}' alias.",
+            hint='Configure a cache every process reaches, e.g. Redis; it holds the catalog versions.',
+            id='products.E001',
+        )]
+    return []
+
+
+@register(Tags.caches, deploy=True)
+def check_shared_cache_is_shared(app_configs, **kwargs):
+    backend = settings.CACHES.get(SHARED_CACHE_ALIAS, {}).get('BACKEND')
+    if backend in PROCESS_LOCAL_BACKENDS:
+        return [Warning(
+            f"The '{SHARED_CACHE_ALIAS}' cache is local to each process.",
+            hint='With more than one worker, point it at a shared store such as Redis so catalog '
+                 'invalidations reach every process.',
+            id='products.W001',
+        )]
+    return []
@@ -0,0 +1,40 @@
+import hashlib
+from functools import wraps
+
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+
+
+def conditional_get(get_validators, private=False):
+    """
+    Answer ``If-None-Match``/``If-Modified-Since`` with ``304 Not Modified``
+    before the wrapped ``get`` handler runs. ``get_validators(request, *args,
+    **kwargs)`` returns ``(fingerprint, last_modified)`` from a cheap query,
+    or ``None`` to skip validation. The ETag also covers the query string
+    since it selects the representation.
+    """
+    def decorator(method):
+        @wraps(method)
+        def wrapper(view, request, *args, **kwargs):
+            validators = get_validators(request, *args, **kwargs)
+            if validators is None:
+                return method(view, request, *args, **kwargs)
+
+            fingerprint, last_modified = validators
+            raw = f'{fingerprint}|{request.META.get("QUERY_STRING", "")}'
+            etag = quote_etag(hashlib.md5(raw.encode('utf-8')).hexdigest())
+            timestamp = int(last_modified.timestamp()) if last_modified else None
+
+            response = get_conditional_response(request, etag=etag, last_modified=timestamp)
+            if response is None:
+                response = method(view, request, *args, **kwargs)
+                if response.status_code != 200:
+                    return response
+            response['ETag'] = etag
+            if timestamp is not None:
+                response['Last-Modified'] = http_date(timestamp)
+            # Let browsers keep the body but revalidate it on every use
+            patch_cache_control(response, no_cache=True, private=private)
+            return response
+        return wrapper
+    return decorator
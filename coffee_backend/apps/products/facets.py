@@ -0,0 +1,134 @@
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Sum
+
+from ..accounts.models import VendorProfile
+from .cache import RESPONSE_CACHE_TIMEOUT, get_catalog_cache_key
+from .models import Category, Product, ProductFacetCount
+from .search import search_products
+
+# Facet name -> (filter parameter, grouped column)
+FACETS = {
+    'category': ('category', 'category_id'),
+    'roast_type': ('roast', 'roast_type'),
+    'origin': ('origin', 'origin'),
+    'vendor': ('vendor', 'vendor_id'),
+}
+KEY_FIELDS = ('category_id', 'vendor_id', 'roast_type', 'origin')
+
+
+def get_facet_key(product):
+    # Facets describe what can be bought right now
+    if not product.is_available or product.stock <= 0:
+        return None
+    return tuple(getattr(product, field) for field in KEY_FIELDS)
+
+
+def get_row_facet_key(row):
+    # get_facet_key() for a values() row with KEY_FIELDS, is_available and stock
+    if row is None or not row['is_available'] or row['stock'] <= 0:
+        return None
+    return tuple(row[field] for field in KEY_FIELDS)
+
+
+def adjust_facet_count(key, delta):
+    if key is None or not delta:
+        return
+    lookup = dict(zip(KEY_FIELDS, key))
+    if ProductFacetCount.objects.filter(**lookup).update(count=F('count') + delta):
+        return
+    try:
+        with transaction.atomic():
+            ProductFacetCount.objects.create(count=delta, **lookup)
+    except IntegrityError:
+        # Created concurrently; the row exists now
+        ProductFacetCount.objects.filter(**lookup).update(count=F('count') + delta)
+
+
+def move_facet_count(old_key, new_key):
+    if old_key != new_key:
+        adjust_facet_count(old_key, -1)
+        adjust_facet_count(new_key, 1)
+
+
+@transaction.atomic
+def rebuild_facet_counts():
+    """Recompute every ProductFacetCount row with one GROUP BY over products."""
+    ProductFacetCount.objects.all().delete()
+    rows = (
+        Product.objects.filter(is_available=True, stock__gt=0)
+        .values(*KEY_FIELDS)
+        .annotate(count=Count('pk'))
+        .order_by()
+    )
+    counts = ProductFacetCount.objects.bulk_create(
+        [ProductFacetCount(**row) for row in rows.iterator()], batch_size=1000
+    )
+    return len(counts)
+
+
+def get_facet_base_queryset(params):
+    query = params.get('q', '').strip()
+    if not query:
+        return ProductFacetCount.objects.filter(count__gt=0), Sum('count')
+    # Search matches only exist per product, so count those directly
+    matches = search_products(Product.objects.all(), query).values('pk')
+    return Product.objects.filter(is_available=True, stock__gt=0, pk__in=matches), Count('pk')
+
+
+def count_facet(base, aggregate, params, name):
+    """
+    Counts for one facet under every active filter except its own, so the
+    selected value does not hide its alternatives. One GROUP BY query.
+    """
+    param, column = FACETS[name]
+    rows = (
+        base.filter_catalog(params, exclude=(param,))
+        .exclude(**{f'{column}__isnull': True})
+        .values_list(column)
+        .annotate(count=aggregate)
+        .filter(count__gt=0)
+        .order_by('-count', column)
+    )
+    return [{'value': value, 'count': count} for value, count in rows]
+
+
+def label_facets(facets):
+    # Grouping on the foreign keys avoids joins; names come from one small
+    # lookup per related table
+    categories = Category.objects.in_bulk([row['value'] for row in facets['category']])
+    vendors = VendorProfile.objects.in_bulk([row['value'] for row in facets['vendor']])
+    roast_labels = dict(Product.ROAST_CHOICES)
+    facets['category'] = [
+        dict(row, label=categories[row['value']].name)
+        for row in facets['category'] if row['value'] in categories
+    ]
+    facets['vendor'] = [
+        dict(row, label=vendors[row['value']].business_name)
+        for row in facets['vendor'] if row['value'] in vendors
+    ]
+    for row in facets['roast_type']:
+        row['label'] = roast_labels.get(row['value'], row['value'])
+    for row in facets['origin']:
+        row['label'] = row['value']
+    return facets
+
+
+def compute_facets(params):
+    base, aggregate = get_facet_base_queryset(params)
+    return label_facets({name: count_facet(base, aggregate, params, name) for name in FACETS})
+
+
+def get_facets(params):
+    """Facet counts for the catalog filters in ``params``, cached per catalog version."""
+    parts = [
+        f'{key}={params.get(key, "")}'
+        for key in sorted({'q', *(param for param, _ in FACETS.values())})
+    ]
+    # Global version only: the vendor facet counts every vendor's products
+    key = get_catalog_cache_key('facets', parts)
+    facets = cache.get(key)
+    if facets is None:
+        facets = compute_facets(params)
+        cache.set(key, facets, RESPONSE_CACHE_TIMEOUT)
+    return facets
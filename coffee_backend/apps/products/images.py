@@ -0,0 +1,207 @@
+import logging
+import os
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from pathlib import Path
+
+from cloudinary import uploader
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+from django.utils.module_loading import import_string
+from PIL import Image, ImageOps
+
+from .cache import bump_catalog_version
+from .models import Product
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+
+
+def get_image_name(value):
+    # CloudinaryField loads stored names as CloudinaryResource objects
+    if not value or isinstance(value, str):
+        return value or ''
+    public_id = value.public_id
+    if not public_id:
+        return ''
+    return f'{public_id}.{value.format}' if value.format else str(public_id)
+
+
+class CloudinaryImageStorage:
+    """Default backend: Cloudinary, as CloudinaryField would upload it."""
+
+    def save(self, name, content):
+        resource = uploader.upload_resource(BytesIO(content), public_id=os.path.splitext(name)[0])
+        return resource.get_prep_value()
+
+    def url(self, value):
+        if isinstance(value, str):
+            # A name as returned by save()
+            value = Product._meta.get_field('image').to_python(value)
+        return value.url
+
+
+class LocalImageStorage:
+    """Filesystem stand-in under MEDIA_ROOT for offline development and tests."""
+    location = 'product_images'
+
+    def save(self, name, content):
+        path = Path(settings.MEDIA_ROOT) / self.location / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(content)
+        return f'{self.location}/{name}'
+
+    def url(self, value):
+        return settings.MEDIA_URL + get_image_name(value)
+
+
+def get_image_storage():
+    return import_string(settings.PRODUCT_IMAGE_STORAGE)()
+
+
+def get_staging_root():
+    return Path(settings.PRODUCT_IMAGE_STAGING_ROOT)
+
+
+def is_valid_image(upload):
+    try:
+        with Image.open(upload) as image:
+            image.verify()
+    except Exception:
+        return False
+    finally:
+        upload.seek(0)
+    return True
+
+
+def stage_upload(upload):
+    """Copy an uploaded file to local disk and return its staged name."""
+    root = get_staging_root()
+    root.mkdir(parents=True, exist_ok=True)
+    name = uuid.uuid4().hex + Path(upload.name).suffix.lower()
+    with open(root / name, 'wb') as staged:
+        for chunk in upload.chunks():
+            staged.write(chunk)
+    return name
+
+
+def flatten(image):
+    if image.mode in ('RGBA', 'LA', 'P'):
+        # JPEG has no alpha; flatten transparent areas onto white
+        image = image.convert('RGBA')
+        background = Image.new('RGB', image.size, 'white')
+        background.paste(image, mask=image.getchannel('A'))
+        return background
+    if image.mode != 'RGB':
+        return image.convert('RGB')
+    return image
+
+
+def encode_jpeg(image):
+    buffer = BytesIO()
+    image.save(buffer, 'JPEG', quality=settings.PRODUCT_IMAGE_QUALITY, optimize=True, progressive=True)
+    return buffer.getvalue()
+
+
+def render_variants(path):
+    """
+    Yield ``(variant, (width, height), jpeg_bytes)`` for the full image
+    ('original') and every PRODUCT_IMAGE_VARIANTS size, largest first. The
+    source is decoded once and each size is scaled down from the previous.
+    """
+    sizes = dict(settings.PRODUCT_IMAGE_VARIANTS, original=settings.PRODUCT_IMAGE_MAX_SIZE)
+    with Image.open(path) as source:
+        image = flatten(ImageOps.exif_transpose(source))
+        for variant, size in sorted(sizes.items(), key=lambda item: -item[1]):
+            image.thumbnail((size, size), Image.LANCZOS)
+            yield variant, image.size, encode_jpeg(image)
+
+
+def save_variants(path):
+    """Render and store every variant; returns the stored full image name and the variant map."""
+    storage = get_image_storage()
+    base = uuid.uuid4().hex
+    image_name, variants = None, {}
+    for variant, (width, height), content in render_variants(path):
+        name = storage.save(f'{base}.jpg' if variant == 'original' else f'{base}_{variant}.jpg', content)
+        if variant == 'original':
+            image_name = name
+        variants[variant] = {'url': storage.url(name), 'width': width, 'height': height}
+    return image_name, variants
+
+
+def get_srcset(variants):
+    """``srcset`` attribute value listing the resized variants by width."""
+    candidates = sorted(
+        (data['width'], data['url']) for variant, data in variants.items() if variant != 'original'
+    )
+    return ', '.join(f'{url} {width}w' for width, url in candidates)
+
+
+def process_image(product_id, vendor_id, staged_name):
+    """
+    Resize and compress a staged upload into its variants, push them to the
+    storage backend and publish them on the product. Only the product's
+    latest upload is published, so an older job finishing late cannot
+    overwrite a newer one.
+    """
+    path = get_staging_root() / staged_name
+    pending = Product.objects.filter(pk=product_id, pending_image=staged_name)
+    if not pending.exists():
+        # Superseded by a newer upload, or the product is gone
+        path.unlink(missing_ok=True)
+        return
+    try:
+        name, variants = save_variants(path)
+    except Exception:
+        logger.exception('Processing image %s for product %s failed', staged_name, product_id)
+        updated = pending.update(image_status=Product.IMAGE_FAILED, pending_image='')
+    else:
+        updated = pending.update(
+            image=name,
+            image_variants=variants,
+            image_status=Product.IMAGE_READY,
+            pending_image='',
+            updated_at=timezone.now(),
+        )
+    finally:
+        path.unlink(missing_ok=True)
+    if updated:
+        bump_catalog_version(vendor_id)
+
+
+def _run_in_worker(*args):
+    try:
+        process_image(*args)
+    except Exception:
+        logger.exception('Product image worker failed')
+    finally:
+        # Worker threads hold their own connection; do not leak it
+        connection.close()
+
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.PRODUCT_IMAGE_WORKERS, thread_name_prefix='product-images'
+        )
+    return _executor
+
+
+def enqueue_image(product, staged_name):
+    """
+    Hand a staged upload to the worker pool once the product row is
+    committed. With PRODUCT_IMAGE_WORKERS = 0 the job runs inline.
+    """
+    args = (product.pk, product.vendor_id, staged_name)
+
+    def submit():
+        if settings.PRODUCT_IMAGE_WORKERS:
+            get_executor().submit(_run_in_worker, *args)
+        else:
+            process_image(*args)
+    transaction.on_commit(submit)
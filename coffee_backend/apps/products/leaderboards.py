@@ -0,0 +1,147 @@
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, OuterRef, Prefetch, Q, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+from ..accounts.models import VendorProfile
+from ..orders.models import OrderItem
+from .models import Category, LeaderboardEntry, Product, ProductReview
+
+# Board -> (ranking, score column)
+BOARDS = {
+    'bestsellers': (('-units_sold', '-id'), 'units_sold'),
+    'top_rated': (('-average_rating', '-review_count', '-id'), 'average_rating'),
+}
+# Scope -> product column holding the scope id
+SCOPES = {'all': None, 'category': 'category_id', 'vendor': 'vendor_id'}
+RANK_FIELDS = ('pk', 'category_id', 'vendor_id', 'is_available', 'units_sold', 'average_rating', 'review_count')
+
+
+def get_board_filter(board):
+    if board == 'bestsellers':
+        return Q(is_available=True, units_sold__gt=0)
+    # A single five star review should not top the board
+    return Q(is_available=True, review_count__gte=settings.LEADERBOARD_MIN_REVIEWS)
+
+
+def qualifies(board, row):
+    # get_board_filter() for a row of RANK_FIELDS
+    if not row['is_available']:
+        return False
+    if board == 'bestsellers':
+        return row['units_sold'] > 0
+    return row['review_count'] >= settings.LEADERBOARD_MIN_REVIEWS
+
+
+def compute_board(board, scope, scope_id):
+    """Rank the board from the product table and replace its stored rows."""
+    ordering, score_field = BOARDS[board]
+    products = Product.objects.filter(get_board_filter(board))
+    if SCOPES[scope]:
+        products = products.filter(**{SCOPES[scope]: scope_id})
+    top = products.order_by(*ordering).values_list('pk', score_field)[:settings.LEADERBOARD_SIZE]
+    entries = [
+        LeaderboardEntry(board=board, scope=scope, scope_id=scope_id, rank=rank, product_id=pk, score=score)
+        for rank, (pk, score) in enumerate(top, start=1)
+    ]
+    with transaction.atomic():
+        LeaderboardEntry.objects.filter(board=board, scope=scope, scope_id=scope_id).delete()
+        LeaderboardEntry.objects.bulk_create(entries)
+
+
+def refresh_all_leaderboards():
+    """Recompute every board for the whole catalog, each category and each vendor."""
+    scopes = [('all', 0)]
+    scopes += [('category', pk) for pk in Category.objects.values_list('pk', flat=True)]
+    scopes += [('vendor', pk) for pk in VendorProfile.objects.values_list('pk', flat=True)]
+    for board in BOARDS:
+        with transaction.atomic():
+            # Boards of deleted categories and vendors go away with the rebuild
+            LeaderboardEntry.objects.filter(board=board).delete()
+            for scope, scope_id in scopes:
+                compute_board(board, scope, scope_id)
+    return len(scopes) * len(BOARDS)
+
+
+def needs_refresh(board, scope, scope_id, entries, rows):
+    """
+    Whether the changed products in ``rows`` can move the board: one of
+    them is on it, or would now rank at least as high as its last entry.
+    """
+    if any(entry.product_id in rows for entry in entries):
+        return True
+    score_field = BOARDS[board][1]
+    candidates = [
+        row for row in rows.values()
+        if qualifies(board, row) and (scope == 'all' or row[SCOPES[scope]] == scope_id)
+    ]
+    if not candidates:
+        return False
+    if len(entries) < settings.LEADERBOARD_SIZE:
+        return True
+    return any(row[score_field] >= entries[-1].score for row in candidates)
+
+
+def refresh_product_leaderboards(product_ids, boards=tuple(BOARDS)):
+    """
+    Bring the boards up to date after the ranking inputs of ``product_ids``
+    changed, e.g. on an order or a review. A board is only recomputed when
+    it can actually change, so most events cost two small indexed reads.
+    """
+    rows = {row['pk']: row for row in Product.objects.filter(pk__in=product_ids).values(*RANK_FIELDS)}
+    if not rows:
+        return
+    scopes = {('all', 0)}
+    for row in rows.values():
+        scopes.update((scope, row[column]) for scope, column in SCOPES.items() if column and row[column])
+    lookup = Q(product_id__in=rows)  # also finds boards the products have moved away from
+    for scope, scope_id in scopes:
+        lookup |= Q(scope=scope, scope_id=scope_id)
+
+    for board in boards:
+        entries = {}
+        for entry in LeaderboardEntry.objects.filter(lookup, board=board).order_by('rank'):
+            entries.setdefault((entry.scope, entry.scope_id), []).append(entry)
+        for scope, scope_id in scopes | set(entries):
+            if needs_refresh(board, scope, scope_id, entries.get((scope, scope_id), []), rows):
+                compute_board(board, scope, scope_id)
+
+
+def get_leaderboard(board, scope='all', scope_id=0, include_reviews=False):
+    """Products of one board in rank order, read through its unique index."""
+    entries = (
+        LeaderboardEntry.objects.filter(board=board, scope=scope, scope_id=scope_id)
+        .select_related('product__vendor__user')
+        .order_by('rank')
+    )
+    if include_reviews:
+        entries = entries.prefetch_related(
+            Prefetch('product__reviews', queryset=ProductReview.objects.select_related('user'))
+        )
+    return [entry.product for entry in entries]
+
+
+def rebuild_units_sold():
+    """Recompute every product's units_sold from the order items."""
+    units = (
+        OrderItem.objects.filter(product=OuterRef('pk'))
+        .exclude(order__status='CANCELLED')
+        .values('product')
+        .annotate(units=Sum('quantity'))
+        .values('units')
+    )
+    return Product.objects.update(units_sold=Coalesce(Subquery(units), 0))
+
+
+def adjust_units_sold(deltas):
+    """Apply ``{product_id: units}`` to the sales counters, one UPDATE per product."""
+    for product_id, delta in deltas.items():
+        if delta:
+            Product.objects.filter(pk=product_id).update(units_sold=F('units_sold') + delta)
+
+
+def schedule_leaderboard_refresh(product_ids, boards=tuple(BOARDS)):
+    # After commit, so the refresh reads the counters the event wrote
+    product_ids = list(product_ids)
+    if product_ids:
+        transaction.on_commit(lambda: refresh_product_leaderboards(product_ids, boards))
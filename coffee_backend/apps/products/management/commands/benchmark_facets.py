@@ -0,0 +1,55 @@
+import random
+import time
+
+from django.contrib.auth import get_user_model
+
+from ....accounts.models import VendorProfile
+from ...facets import compute_facets, rebuild_facet_counts
+from ...models import Category, Product
+from .benchmark_search import Command as BenchmarkSearchCommand
+
+FILTERS = [{}, {'roast': 'DARK'}, {'origin': 'Kenya', 'roast': 'LIGHT'}, {'category': None, 'roast': 'MEDIUM'}]
+
+
+class Command(BenchmarkSearchCommand):
+    help = 'Time catalog facet counts over synthetic products (rolled back afterwards)'
+
+    def add_arguments(self, parser):
+        super().add_arguments(parser)
+        parser.set_defaults(products=1000000)
+
+    def run(self, options):
+        rng = random.Random(options['seed'])
+        vendor_user = get_user_model().objects.create_user(username='benchmark-facets-vendor')
+        vendor = VendorProfile.objects.create(user=vendor_user, business_name='Benchmark')
+        categories = [Category.objects.create(name=f'Benchmark {i}') for i in range(20)]
+
+        started = time.perf_counter()
+        remaining = options['products']
+        while remaining > 0:
+            size = min(remaining, options['batch_size'])
+            products = [self.fake_product(rng, vendor) for _ in range(size)]
+            for product in products:
+                product.category = rng.choice(categories)
+            Product.objects.bulk_create(products)
+            remaining -= size
+        self.stdout.write(f"Created {options['products']} products in {time.perf_counter() - started:.1f}s")
+
+        started = time.perf_counter()
+        rows = rebuild_facet_counts()
+        self.stdout.write(f'Built {rows} facet count rows in {time.perf_counter() - started:.1f}s')
+
+        for params in FILTERS:
+            params = {
+                key: str(categories[0].pk) if key == 'category' else value
+                for key, value in params.items()
+            }
+            timings = []
+            for _ in range(options['repeat']):
+                started = time.perf_counter()
+                compute_facets(params)
+                timings.append((time.perf_counter() - started) * 1000)
+            timings.sort()
+            self.stdout.write(
+                f'{params}: uncached median {timings[len(timings) // 2]:.1f}ms, best {timings[0]:.1f}ms'
+            )
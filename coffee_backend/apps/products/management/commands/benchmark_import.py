@@ -0,0 +1,48 @@
+import random
+import time
+import tracemalloc
+
+from django.contrib.auth import get_user_model
+
+from ....accounts.models import VendorProfile
+from ...bulk import import_products, iter_csv_rows
+from .benchmark_search import Command as BenchmarkSearchCommand
+
+
+class Command(BenchmarkSearchCommand):
+    help = 'Time a streamed CSV product import twice, as inserts then updates (rolled back afterwards)'
+
+    def add_arguments(self, parser):
+        super().add_arguments(parser)
+        parser.set_defaults(products=100000)
+        parser.add_argument('--trace-memory', action='store_true', help='Report peak Python memory (slower)')
+
+    def run(self, options):
+        rng = random.Random(options['seed'])
+        vendor_user = get_user_model().objects.create_user(username='benchmark-import-vendor')
+        vendor = VendorProfile.objects.create(user=vendor_user, business_name='Benchmark')
+
+        for label in ('insert', 'update'):
+            if options['trace_memory']:
+                tracemalloc.start()
+            started = time.perf_counter()
+            report = import_products(vendor, iter_csv_rows(self.csv_lines(rng, vendor, options['products'])))
+            elapsed = time.perf_counter() - started
+            line = (
+                f'{label}: {report.rows} rows in {elapsed:.1f}s ({report.rows / elapsed:.0f} rows/s), '
+                f'{report.created} created, {report.updated} updated, {report.error_count} errors'
+            )
+            if options['trace_memory']:
+                line += f', peak {tracemalloc.get_traced_memory()[1] / 2 ** 20:.1f} MiB'
+                tracemalloc.stop()
+            self.stdout.write(line)
+
+    def csv_lines(self, rng, vendor, count):
+        # Generated lazily, like a request body read line by line
+        yield b'sku,name,description,price,stock,roast_type,origin,image\n'
+        for i in range(count):
+            product = self.fake_product(rng, vendor)
+            yield (
+                f'SKU-{i},{product.name},{product.description},{product.price},{product.stock},'
+                f'{product.roast_type},{product.origin},benchmark.jpg\n'
+            ).encode('utf-8')
@@ -0,0 +1,92 @@
+import random
+import time
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from ....accounts.models import VendorProfile
+from ...models import Product
+from ...search import index_products, search_products
+
+ORIGINS = ['Ethiopia', 'Kenya', 'Colombia', 'Brazil', 'Guatemala', 'Sumatra', 'Rwanda', 'Yemen']
+ADJECTIVES = ['bright', 'floral', 'chocolatey', 'nutty', 'fruity', 'smooth', 'bold', 'earthy', 'sweet', 'spicy']
+NOUNS = ['espresso', 'blend', 'single origin', 'peaberry', 'decaf', 'cold brew', 'filter roast', 'reserve']
+NOTES = ['jasmine', 'blueberry', 'caramel', 'citrus', 'cocoa', 'honey', 'stone fruit', 'molasses', 'bergamot']
+QUERIES = ['kenya', 'floral espresso', 'chocolatey blends', 'blueberry peaberry', 'smooth caramel decaf']
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = 'Time ranked product search over synthetic products (rolled back afterwards)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--products', type=int, default=500000)
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                self.run(options)
+                raise Rollback
+        except Rollback:
+            pass
+
+    def run(self, options):
+        rng = random.Random(options['seed'])
+        vendor_user = get_user_model().objects.create_user(username='benchmark-search-vendor')
+        vendor = VendorProfile.objects.create(user=vendor_user, business_name='Benchmark')
+
+        started = time.perf_counter()
+        remaining = options['products']
+        while remaining > 0:
+            size = min(remaining, options['batch_size'])
+            Product.objects.bulk_create([self.fake_product(rng, vendor) for _ in range(size)])
+            remaining -= size
+        created = time.perf_counter() - started
+        self.stdout.write(f"Created {options['products']} products in {created:.1f}s")
+
+        started = time.perf_counter()
+        index_products(Product.objects.filter(vendor=vendor), batch_size=options['batch_size'])
+        elapsed = time.perf_counter() - started
+        self.stdout.write(f"Indexed in {elapsed:.1f}s ({options['products'] / elapsed:.0f} products/s)")
+
+        for query in QUERIES:
+            timings = []
+            for _ in range(options['repeat']):
+                started = time.perf_counter()
+                results = list(
+                    search_products(Product.objects.all(), query)
+                    .order_by('-search_score', '-id')
+                    .values_list('id', flat=True)[:20]
+                )
+                timings.append((time.perf_counter() - started) * 1000)
+            timings.sort()
+            self.stdout.write(
+                f'{query!r}: {len(results)} results, '
+                f'median {timings[len(timings) // 2]:.1f}ms, best {timings[0]:.1f}ms'
+            )
+
+    def fake_product(self, rng, vendor):
+        origin = rng.choice(ORIGINS)
+        name = f'{origin} {rng.choice(ADJECTIVES).title()} {rng.choice(NOUNS).title()}'
+        description = ' '.join([
+            'A', rng.choice(ADJECTIVES), 'coffee with notes of',
+            rng.choice(NOTES), 'and', rng.choice(NOTES) + '.',
+        ])
+        return Product(
+            vendor=vendor,
+            name=name,
+            description=description,
+            price=Decimal(rng.randint(500, 5000)) / 100,
+            stock=rng.randint(0, 200),
+            roast_type=rng.choice(['LIGHT', 'MEDIUM', 'DARK']),
+            origin=origin,
+            image='benchmark.jpg',
+        )
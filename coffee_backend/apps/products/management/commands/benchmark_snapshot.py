@@ -0,0 +1,73 @@
+import random
+import sys
+import time
+import tracemalloc
+
+from django.contrib.auth import get_user_model
+
+from ....accounts.models import VendorProfile
+from ...models import Product
+from ...snapshot import CatalogSnapshot, get_catalog_snapshot, get_product_record
+from .benchmark_search import Command as BenchmarkSearchCommand
+
+
+class Command(BenchmarkSearchCommand):
+    help = 'Measure the in-process catalog snapshot over synthetic products (rolled back afterwards)'
+
+    def add_arguments(self, parser):
+        super().add_arguments(parser)
+        parser.set_defaults(products=1000000)
+        parser.add_argument('--lookups', type=int, default=100000)
+
+    def run(self, options):
+        rng = random.Random(options['seed'])
+        vendor_user = get_user_model().objects.create_user(username='benchmark-snapshot-vendor')
+        vendor = VendorProfile.objects.create(user=vendor_user, business_name='Benchmark')
+
+        started = time.perf_counter()
+        remaining = options['products']
+        while remaining > 0:
+            size = min(remaining, options['batch_size'])
+            Product.objects.bulk_create([self.fake_product(rng, vendor) for _ in range(size)])
+            remaining -= size
+        self.stdout.write(f"Created {options['products']} products in {time.perf_counter() - started:.1f}s")
+
+        tracemalloc.start()
+        started = time.perf_counter()
+        snapshot = CatalogSnapshot.build(version=None)
+        elapsed = time.perf_counter() - started
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        per_product = snapshot.nbytes / len(snapshot)
+        self.stdout.write(
+            f'Built snapshot of {len(snapshot)} products in {elapsed:.1f}s: arrays {snapshot.nbytes / 2 ** 20:.1f} MiB '
+            f'({per_product:.1f} bytes/product), retained {current / 2 ** 20:.1f} MiB, peak while building '
+            f'{peak / 2 ** 20:.1f} MiB'
+        )
+
+        # What the same data costs as model instances and as plain tuples
+        sample = list(Product.objects.order_by('pk')[:10000])
+        instance_bytes = sum(sys.getsizeof(product) + sys.getsizeof(product.__dict__) for product in sample)
+        rows = list(
+            Product.objects.order_by('pk').values_list('pk', 'price', 'stock', 'vendor_id', 'is_available')[:10000]
+        )
+        tuple_bytes = sum(sys.getsizeof(row) + sys.getsizeof(row[1]) for row in rows)
+        self.stdout.write(
+            f'For comparison, per product: model instance ~{instance_bytes / len(sample):.0f} bytes (shallow), '
+            f'values_list tuple ~{tuple_bytes / len(rows):.0f} bytes'
+        )
+
+        ids = [rng.choice(snapshot.ids) for _ in range(options['lookups'])]
+        get_catalog_snapshot()
+        started = time.perf_counter()
+        for product_id in ids:
+            get_product_record(product_id)
+        snapshot_us = (time.perf_counter() - started) / len(ids) * 1e6
+
+        started = time.perf_counter()
+        for product_id in ids[:1000]:
+            Product.objects.filter(pk=product_id).values_list('price', 'stock', 'vendor_id', 'is_available').first()
+        query_us = (time.perf_counter() - started) / 1000 * 1e6
+        self.stdout.write(
+            f'Lookup: snapshot {snapshot_us:.1f}us (including the version check), single-row query {query_us:.1f}us'
+        )
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from ...recommendations import ORDER_BATCH_SIZE, build_related_products
+
+
+class Command(BaseCommand):
+    help = 'Fold orders placed since the last run into the "frequently bought together" products'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=ORDER_BATCH_SIZE, help='Orders per transaction')
+        parser.add_argument('--limit', type=int, help='Related products kept per product')
+        parser.add_argument('--full', action='store_true', help='Discard the stored counts and start over')
+
+    def handle(self, *args, **options):
+        run = build_related_products(batch_size=options['batch_size'], limit=options['limit'], full=options['full'])
+        if run is None:
+            self.stdout.write('No new or cancelled orders since the last run')
+            return
+        self.stdout.write(self.style.SUCCESS(
+            f'Processed {run.orders} orders up to order {run.last_order_id} and {run.cancelled_orders} '
+            f'cancellations, {run.pairs} pair counts updated'
+        ))
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from ...cache import get_catalog_version, get_response_cache_stats
+
+
+class Command(BaseCommand):
+    help = 'Show hit/miss counters of the anonymous catalog response cache'
+
+    def handle(self, *args, **options):
+        stats = get_response_cache_stats()
+        lookups = stats['hits'] + stats['misses']
+        ratio = stats['hits'] / lookups if lookups else 0
+        self.stdout.write(
+            f"hits={stats['hits']} misses={stats['misses']} hit_ratio={ratio:.2%} "
+            f'version={get_catalog_version()}'
+        )
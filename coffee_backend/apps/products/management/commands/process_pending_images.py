@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from ...images import process_image
+from ...models import Product
+
+
+class Command(BaseCommand):
+    help = 'Process product image uploads left pending, e.g. after a worker restart'
+
+    def handle(self, *args, **options):
+        pending = (
+            Product.objects.filter(image_status=Product.IMAGE_PROCESSING)
+            .exclude(pending_image='')
+            .values_list('pk', 'vendor_id', 'pending_image')
+        )
+        count = 0
+        for product_id, vendor_id, staged_name in pending.iterator():
+            # A staged file that no longer exists marks the product as failed
+            process_image(product_id, vendor_id, staged_name)
+            count += 1
+        self.stdout.write(self.style.SUCCESS(f'Processed {count} pending product images'))
@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from ...changes import get_cursor_horizon
+from ...models import ProductTombstone
+
+
+class Command(BaseCommand):
+    help = 'Delete change feed tombstones older than CHANGE_FEED_RETENTION_DAYS'
+
+    def handle(self, *args, **options):
+        deleted, _ = ProductTombstone.objects.filter(deleted_at__lt=get_cursor_horizon()).delete()
+        self.stdout.write(self.style.SUCCESS(f'Pruned {deleted} tombstones'))
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from ...cache import bump_catalog_version
+from ...facets import rebuild_facet_counts
+
+
+class Command(BaseCommand):
+    help = 'Recompute the ProductFacetCount table behind the catalog facets'
+
+    def handle(self, *args, **options):
+        rows = rebuild_facet_counts()
+        bump_catalog_version()
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {rows} facet count rows'))
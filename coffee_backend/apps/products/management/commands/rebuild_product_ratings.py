@@ -0,0 +1,56 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, Q, Sum
+
+from ...cache import bump_catalog_version
+from ...models import RATING_COUNT_FIELDS, Product, ProductReview
+
+
+class Command(BaseCommand):
+    help = 'Recompute the denormalized review counters and star histogram on Product'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        updated = 0
+
+        with transaction.atomic():
+            Product.objects.update(
+                review_count=0, rating_sum=0, average_rating=0,
+                **{field: 0 for field in RATING_COUNT_FIELDS.values()},
+            )
+
+            totals = (
+                ProductReview.objects.order_by()
+                .values('product_id')
+                .annotate(count=Count('id'), total=Sum('rating'), **{
+                    field: Count('id', filter=Q(rating=rating)) for rating, field in RATING_COUNT_FIELDS.items()
+                })
+                .iterator(chunk_size=batch_size)
+            )
+            batch = []
+            for row in totals:
+                batch.append(Product(
+                    pk=row['product_id'],
+                    review_count=row['count'],
+                    rating_sum=row['total'],
+                    average_rating=row['total'] / row['count'],
+                    **{field: row[field] for field in RATING_COUNT_FIELDS.values()},
+                ))
+                if len(batch) >= batch_size:
+                    updated += self._flush(batch)
+                    batch = []
+            updated += self._flush(batch)
+            bump_catalog_version()
+
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt ratings for {updated} reviewed products'))
+
+    def _flush(self, batch):
+        if not batch:
+            return 0
+        Product.objects.bulk_update(
+            batch, ['review_count', 'rating_sum', 'average_rating', *RATING_COUNT_FIELDS.values()]
+        )
+        return len(batch)
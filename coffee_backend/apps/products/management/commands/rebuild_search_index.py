@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from ...cache import bump_catalog_version
+from ...models import Product
+from ...search import index_products
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the product full-text search index'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        indexed = index_products(Product.objects.all(), batch_size=options['batch_size'])
+        bump_catalog_version()
+        self.stdout.write(self.style.SUCCESS(f'Indexed {indexed} products'))
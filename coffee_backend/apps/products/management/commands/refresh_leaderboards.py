@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from ...leaderboards import rebuild_units_sold, refresh_all_leaderboards
+
+
+class Command(BaseCommand):
+    help = 'Recompute every best seller and top rated leaderboard'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--counters', action='store_true', help='Recount units sold from the orders first')
+
+    def handle(self, *args, **options):
+        if options['counters']:
+            rows = rebuild_units_sold()
+            self.stdout.write(f'Recounted units sold for {rows} products')
+        boards = refresh_all_leaderboards()
+        self.stdout.write(self.style.SUCCESS(f'Refreshed {boards} leaderboards'))
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 16:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0001_initial'),
+        ('products', '0002_alter_product_image'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['-created_at', '-id'], name='product_recency_idx'),
+        ),
+    ]
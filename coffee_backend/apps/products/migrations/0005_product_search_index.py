@@ -0,0 +1,96 @@
+# Generated by Django 5.2.18 on 2026-10-17 16:22
+
+import re
+import unicodedata
+from collections import Counter
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+# A frozen copy of the analyzer in apps/products/search.py as of this
+# migration, so later changes to it do not alter what migrating builds
+NAME_WEIGHT = 2
+TOKEN_RE = re.compile(r'[a-z0-9]+')
+STOP_WORDS = frozenset(
+    'a an and are as at be by for from has in is it its of on or that the to was with'.split()
+)
+SUFFIXES = (
+    ('ational', 'ate'), ('fulness', 'ful'), ('iveness', 'ive'), ('ization', 'ize'),
+    ('ousness', 'ous'), ('ement', ''), ('ness', ''), ('ment', ''), ('ings', ''),
+    ('ing', ''), ('edly', ''), ('ies', 'y'), ('ied', 'y'), ('ed', ''), ('ly', ''),
+    ('es', ''), ('s', ''),
+)
+
+
+def stem(token):
+    if len(token) <= 3 or token.isdigit():
+        return token
+    for suffix, replacement in SUFFIXES:
+        if token.endswith(suffix) and len(token) - len(suffix) >= 3:
+            if suffix == 's' and token.endswith('ss'):
+                return token
+            return token[:-len(suffix)] + replacement
+    return token
+
+
+def tokenize(text):
+    text = unicodedata.normalize('NFKD', text or '').encode('ascii', 'ignore').decode('ascii')
+    return [
+        stem(token)[:64]
+        for token in TOKEN_RE.findall(text.lower())
+        if token not in STOP_WORDS
+    ]
+
+
+def analyze_product(product):
+    terms = Counter()
+    for token in tokenize(product.name):
+        terms[token] += NAME_WEIGHT
+    terms.update(tokenize(product.description))
+    terms.update(tokenize(product.origin))
+    return terms
+
+
+def backfill_search_index(apps, schema_editor):
+    Product = apps.get_model('products', 'Product')
+    ProductSearchDocument = apps.get_model('products', 'ProductSearchDocument')
+    ProductSearchPosting = apps.get_model('products', 'ProductSearchPosting')
+    for product in Product.objects.only('id', 'name', 'description', 'origin').iterator():
+        terms = analyze_product(product)
+        length = sum(terms.values())
+        ProductSearchDocument.objects.create(product_id=product.pk, length=length)
+        ProductSearchPosting.objects.bulk_create([
+            ProductSearchPosting(term=term, product_id=product.pk, frequency=frequency, document_length=length)
+            for term, frequency in terms.items()
+        ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0004_product_rating_counters'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductSearchDocument',
+            fields=[
+                ('product', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='search_document', serialize=False, to='products.product')),
+                ('length', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ProductSearchPosting',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(max_length=64)),
+                ('frequency', models.PositiveIntegerField()),
+                ('document_length', models.PositiveIntegerField()),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_postings', to='products.product')),
+            ],
+            options={
+                'unique_together': {('term', 'product')},
+            },
+        ),
+        migrations.RunPython(backfill_search_index, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.2.18 on 2026-10-17 17:20
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def backfill_facet_counts(apps, schema_editor):
+    Product = apps.get_model('products', 'Product')
+    ProductFacetCount = apps.get_model('products', 'ProductFacetCount')
+    rows = (
+        Product.objects.filter(is_available=True, stock__gt=0)
+        .values('category_id', 'vendor_id', 'roast_type', 'origin')
+        .annotate(count=Count('pk'))
+        .order_by()
+    )
+    ProductFacetCount.objects.bulk_create([ProductFacetCount(**row) for row in rows], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0001_initial'),
+        ('products', '0005_product_search_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductFacetCount',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('roast_type', models.CharField(max_length=10)),
+                ('origin', models.CharField(max_length=100)),
+                ('count', models.IntegerField(default=0)),
+                ('category', models.ForeignKey(db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='products.category')),
+                ('vendor', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='accounts.vendorprofile')),
+            ],
+            options={
+                'unique_together': {('category', 'vendor', 'roast_type', 'origin')},
+            },
+        ),
+        migrations.RunPython(backfill_facet_counts, migrations.RunPython.noop),
+    ]
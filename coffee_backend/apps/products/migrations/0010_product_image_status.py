@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-17 17:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0009_review_pagination_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='image_status',
+            field=models.CharField(choices=[('READY', 'Ready'), ('PROCESSING', 'Processing'), ('FAILED', 'Failed')], default='READY', editable=False, max_length=10),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='pending_image',
+            field=models.CharField(blank=True, editable=False, max_length=64),
+        ),
+    ]
@@ -0,0 +1,61 @@
+# Generated by Django 5.2.18 on 2026-10-17 17:54
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+
+def backfill_units_sold(apps, schema_editor):
+    Product = apps.get_model('products', 'Product')
+    OrderItem = apps.get_model('orders', 'OrderItem')
+    units = (
+        OrderItem.objects.filter(product=OuterRef('pk'))
+        .exclude(order__status='CANCELLED')
+        .values('product')
+        .annotate(units=Sum('quantity'))
+        .values('units')
+    )
+    Product.objects.update(units_sold=Coalesce(Subquery(units), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0001_initial'),
+        ('orders', '0001_initial'),
+        ('products', '0012_related_products'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LeaderboardEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('board', models.CharField(choices=[('bestsellers', 'Best sellers'), ('top_rated', 'Top rated')], max_length=20)),
+                ('scope', models.CharField(choices=[('all', 'All products'), ('category', 'Category'), ('vendor', 'Vendor')], max_length=10)),
+                ('scope_id', models.BigIntegerField(default=0)),
+                ('rank', models.PositiveSmallIntegerField()),
+                ('score', models.FloatField()),
+            ],
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='units_sold',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(condition=models.Q(('is_available', True)), fields=['-units_sold', '-id'], name='product_avail_sales_idx'),
+        ),
+        migrations.AddField(
+            model_name='leaderboardentry',
+            name='product',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='products.product'),
+        ),
+        migrations.AddConstraint(
+            model_name='leaderboardentry',
+            constraint=models.UniqueConstraint(fields=('board', 'scope', 'scope_id', 'rank'), name='leaderboard_rank_uniq'),
+        ),
+        migrations.RunPython(backfill_units_sold, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,70 @@
+# Generated by Django 5.2.18 on 2026-10-17 18:40
+
+import django.core.validators
+from django.db import migrations, models
+from django.db.models import Count, Q, Sum
+
+
+def clamp_ratings(apps, schema_editor):
+    # Reviews predating the 1-5 validators may hold other values, which have
+    # no histogram column; pull them into range before counting
+    ProductReview = apps.get_model('products', 'ProductReview')
+    ProductReview.objects.filter(rating__lt=1).update(rating=1)
+    ProductReview.objects.filter(rating__gt=5).update(rating=5)
+
+
+def backfill_histogram(apps, schema_editor):
+    # The counters from 0004 are recomputed as well, since clamping moves
+    # rating_sum and average_rating
+    Product = apps.get_model('products', 'Product')
+    ProductReview = apps.get_model('products', 'ProductReview')
+    counts = ProductReview.objects.order_by().values('product_id').annotate(
+        review_count=Count('id'),
+        rating_sum=Sum('rating'),
+        **{f'rating_{rating}_count': Count('id', filter=Q(rating=rating)) for rating in range(1, 6)},
+    )
+    for row in counts:
+        row['average_rating'] = row['rating_sum'] / row['review_count']
+        Product.objects.filter(pk=row.pop('product_id')).update(**row)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0014_product_change_feed'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='rating_1_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='rating_2_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='rating_3_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='rating_4_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='rating_5_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(clamp_ratings, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='productreview',
+            name='rating',
+            field=models.PositiveSmallIntegerField(validators=[django.core.validators.MinValueValidator(1), django.core.validators.MaxValueValidator(5)]),
+        ),
+        migrations.RunPython(backfill_histogram, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-17 19:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0015_product_rating_histogram'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='relatedproductsrun',
+            name='cancelled_orders',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='relatedproductsrun',
+            name='counted_until',
+            field=models.DateTimeField(null=True),
+        ),
+    ]
@@ -1,5 +1,9 @@
+from django.core.validators import MaxValueValidator, MinValueValidator
 from django.db import models
+from django.db.models.functions import Cast, Coalesce, NullIf
+from django.utils import timezone
 from cloudinary.models import CloudinaryField
+from rest_framework.exceptions import ValidationError
 
 class Category(models.Model):
     name = models.CharField(max_length=100)
@@ -13,12 +17,94 @@ class Category(models.Model):
     def __str__(self):
         return self.name
 
+# Star rating -> Product column counting reviews with it
+RATING_COUNT_FIELDS = {rating: f'rating_{rating}_count' for rating in range(1, 6)}
+# Ids outside the 64-bit column range overflow the database driver
+MAX_ID = 2 ** 63 - 1
+# The largest value a PositiveIntegerField holds on every supported database
+MAX_POSITIVE_INT = 2 ** 31 - 1
+
+
+def parse_id(value):
+    pk = int(value)
+    if not -MAX_ID - 1 <= pk <= MAX_ID:
+        raise ValueError(f'{value!r} is out of range')
+    return pk
+
+
+class CatalogQuerySet(models.QuerySet):
+    # Catalog query parameter -> lookup, shared by the listing and facets
+    catalog_filters = {
+        'category': 'category__id',
+        'vendor': 'vendor__id',
+        'roast': 'roast_type',
+        'origin': 'origin',
+    }
+    # Parameters holding ids; anything else is a 400 rather than a query error
+    id_filters = ('category', 'vendor')
+
+    def filter_catalog(self, params, exclude=()):
+        queryset = self
+        for param, lookup in self.catalog_filters.items():
+            value = params.get(param)
+            if value and param not in exclude:
+                if param in self.id_filters:
+                    try:
+                        value = parse_id(value)
+                    except ValueError:
+                        raise ValidationError({param: ['A whole number is required.']})
+                queryset = queryset.filter(**{lookup: value})
+        return queryset
+
+class ProductQuerySet(CatalogQuerySet):
+    def for_listing(self, include_reviews=True):
+        # Vendor username and reviews in a fixed number of queries
+        queryset = self.select_related('vendor__user')
+        if include_reviews:
+            queryset = queryset.prefetch_related(
+                models.Prefetch('reviews', queryset=ProductReview.objects.select_related('user'))
+            )
+        return queryset
+
+    def adjust_rating(self, added=None, removed=None):
+        # Account for a review with star rating ``added`` appearing and/or one
+        # with ``removed`` going away (both for an edit). Single UPDATE; the
+        # right-hand side sees the pre-update column values. updated_at moves
+        # too since reviews are part of the product body.
+        # Plain int deltas; bools in the expression would be sent as boolean
+        # parameters, which PostgreSQL cannot add to an integer column
+        count = models.F('review_count') + (int(added is not None) - int(removed is not None))
+        total = models.F('rating_sum') + ((added or 0) - (removed or 0))
+        deltas = {}
+        for rating, delta in ((added, 1), (removed, -1)):
+            if rating is not None:
+                field = RATING_COUNT_FIELDS[rating]
+                deltas[field] = deltas.get(field, 0) + delta
+        stars = {field: models.F(field) + delta for field, delta in deltas.items() if delta}
+        return self.update(
+            review_count=count,
+            rating_sum=total,
+            average_rating=Coalesce(
+                Cast(total, models.FloatField()) / NullIf(count, 0), 0.0
+            ),
+            updated_at=timezone.now(),
+            **stars,
+        )
+
 class Product(models.Model):
     ROAST_CHOICES = (
         ('LIGHT', 'Light'),
         ('MEDIUM', 'Medium'),
         ('DARK', 'Dark'),
     )
+    IMAGE_READY = 'READY'
+    IMAGE_PROCESSING = 'PROCESSING'
+    IMAGE_FAILED = 'FAILED'
+    IMAGE_STATUS_CHOICES = (
+        (IMAGE_READY, 'Ready'),
+        (IMAGE_PROCESSING, 'Processing'),
+        (IMAGE_FAILED, 'Failed'),
+    )
 
     vendor = models.ForeignKey('accounts.VendorProfile', on_delete=models.CASCADE, related_name='products')
     category = models.ForeignKey(Category, on_delete=models.SET_NULL, null=True, related_name='products')
@@ -28,10 +114,73 @@ class Product(models.Model):
     stock = models.PositiveIntegerField(default=0)
     roast_type = models.CharField(max_length=10, choices=ROAST_CHOICES)
     origin = models.CharField(max_length=100)
+    # Vendor's own stock keeping unit, the upsert key for bulk imports
+    sku = models.CharField(max_length=64, null=True, blank=True)
     image = CloudinaryField('image')
+    # Uploads are staged locally and published by the image workers
+    image_status = models.CharField(max_length=10, choices=IMAGE_STATUS_CHOICES, default=IMAGE_READY, editable=False)
+    pending_image = models.CharField(max_length=64, blank=True, editable=False)
+    # Variant name -> {'url', 'width', 'height'}, 'original' included, so
+    # reads need no URL building. Empty for images not from the workers.
+    image_variants = models.JSONField(default=dict, blank=True, editable=False)
     is_available = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    # Denormalized from ProductReview, maintained by the review views
+    review_count = models.PositiveIntegerField(default=0, editable=False)
+    rating_sum = models.PositiveIntegerField(default=0, editable=False)
+    average_rating = models.FloatField(default=0, editable=False)
+    # Star histogram, reviews per rating; also maintained by adjust_rating
+    rating_1_count = models.PositiveIntegerField(default=0, editable=False)
+    rating_2_count = models.PositiveIntegerField(default=0, editable=False)
+    rating_3_count = models.PositiveIntegerField(default=0, editable=False)
+    rating_4_count = models.PositiveIntegerField(default=0, editable=False)
+    rating_5_count = models.PositiveIntegerField(default=0, editable=False)
+    # Units on orders that are not cancelled, maintained by the order signals
+    units_sold = models.PositiveIntegerField(default=0, editable=False)
+
+    objects = ProductQuerySet.as_manager()
+
+    class Meta:
+        # Public reads filter on is_available and page by recency or rating,
+        # so the partial indexes cover exactly those rows in page order
+        indexes = [
+            models.Index(fields=['-created_at', '-id'], name='product_recency_idx'),
+            models.Index(fields=['-average_rating', '-id'], name='product_rating_idx'),
+            models.Index(
+                fields=['-created_at', '-id'], name='product_avail_recency_idx',
+                condition=models.Q(is_available=True),
+            ),
+            models.Index(
+                fields=['-average_rating', '-id'], name='product_avail_rating_idx',
+                condition=models.Q(is_available=True),
+            ),
+            models.Index(
+                fields=['category', '-created_at', '-id'], name='product_avail_category_idx',
+                condition=models.Q(is_available=True),
+            ),
+            models.Index(
+                fields=['vendor', '-created_at', '-id'], name='product_avail_vendor_idx',
+                condition=models.Q(is_available=True),
+            ),
+            models.Index(
+                fields=['roast_type', '-created_at', '-id'], name='product_avail_roast_idx',
+                condition=models.Q(is_available=True),
+            ),
+            models.Index(
+                fields=['origin', '-created_at', '-id'], name='product_avail_origin_idx',
+                condition=models.Q(is_available=True),
+            ),
+            models.Index(
+                fields=['-units_sold', '-id'], name='product_avail_sales_idx',
+                condition=models.Q(is_available=True),
+            ),
+            # The change feed seeks on (updated_at, id)
+            models.Index(fields=['updated_at', 'id'], name='product_updated_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['vendor', 'sku'], name='product_vendor_sku_uniq'),
+        ]
 
     def __str__(self):
         return self.name
@@ -39,10 +188,128 @@ class Product(models.Model):
 class ProductReview(models.Model):
     product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='reviews')
     user = models.ForeignKey('accounts.User', on_delete=models.CASCADE)
-    rating = models.PositiveSmallIntegerField()
+    rating = models.PositiveSmallIntegerField(validators=[MinValueValidator(1), MaxValueValidator(5)])
     comment = models.TextField()
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
-        unique_together = ('product', 'user')
\ No newline at end of file
+        unique_together = ('product', 'user')
+        # Review pages seek on (created_at, id) within a product, optionally
+        # narrowed to one star rating
+        indexes = [
+            models.Index(fields=['product', '-created_at', '-id'], name='review_product_recency_idx'),
+            models.Index(fields=['product', 'rating', '-created_at', '-id'], name='review_product_rating_idx'),
+        ]
+
+class ProductSearchDocument(models.Model):
+    product = models.OneToOneField(Product, on_delete=models.CASCADE, primary_key=True, related_name='search_document')
+    length = models.PositiveIntegerField(default=0)
+
+class ProductSearchPosting(models.Model):
+    # One row per (term, product) pair of the inverted index
+    term = models.CharField(max_length=64)
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='search_postings')
+    frequency = models.PositiveIntegerField()
+    document_length = models.PositiveIntegerField()
+
+    class Meta:
+        unique_together = ('term', 'product')
+
+
+class ProductFacetCount(models.Model):
+    """
+    Number of available, in-stock products per combination of the facet
+    columns. Much smaller than the product table, so facet counts are a
+    GROUP BY over a few thousand rows. Maintained by the product signals.
+    """
+    # No FK constraints: rows for deleted categories are dropped by a rebuild
+    category = models.ForeignKey(Category, on_delete=models.DO_NOTHING, null=True, db_constraint=False, related_name='+')
+    vendor = models.ForeignKey('accounts.VendorProfile', on_delete=models.DO_NOTHING, db_constraint=False, related_name='+')
+    roast_type = models.CharField(max_length=10)
+    origin = models.CharField(max_length=100)
+    count = models.IntegerField(default=0)
+
+    objects = CatalogQuerySet.as_manager()
+
+    class Meta:
+        unique_together = ('category', 'vendor', 'roast_type', 'origin')
+
+
+class ProductPairCount(models.Model):
+    """
+    Sparse product co-occurrence matrix: the number of orders containing
+    both products. Each pair is stored in both directions so a product's
+    neighbours are one index range. Built by build_related_products.
+    """
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='+')
+    related = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='+')
+    count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['product', 'related'], name='product_pair_uniq'),
+        ]
+        indexes = [
+            models.Index(fields=['product', '-count', 'related'], name='product_pair_top_idx'),
+        ]
+
+
+class RelatedProducts(models.Model):
+    # Top co-purchased products, best first, read with one primary key lookup
+    product = models.OneToOneField(Product, on_delete=models.CASCADE, primary_key=True, related_name='+')
+    related_ids = models.JSONField(default=list)
+    updated_at = models.DateTimeField(auto_now=True)
+
+
+class RelatedProductsRun(models.Model):
+    # One row per build; the latest last_order_id is where the next run resumes
+    last_order_id = models.BigIntegerField(default=0)
+    # Orders cancelled up to here were left out; later cancellations of
+    # counted orders are subtracted by the next run
+    counted_until = models.DateTimeField(null=True)
+    orders = models.PositiveIntegerField(default=0)
+    cancelled_orders = models.PositiveIntegerField(default=0)
+    # Pair counts written, both directions
+    pairs = models.PositiveIntegerField(default=0)
+    finished_at = models.DateTimeField(auto_now_add=True)
+
+
+class LeaderboardEntry(models.Model):
+    """
+    One ranked row of a materialized leaderboard. A board is read back in
+    rank order through its unique index; see leaderboards.py.
+    """
+    BOARD_CHOICES = (
+        ('bestsellers', 'Best sellers'),
+        ('top_rated', 'Top rated'),
+    )
+    SCOPE_CHOICES = (
+        ('all', 'All products'),
+        ('category', 'Category'),
+        ('vendor', 'Vendor'),
+    )
+
+    board = models.CharField(max_length=20, choices=BOARD_CHOICES)
+    scope = models.CharField(max_length=10, choices=SCOPE_CHOICES)
+    # Category or vendor id; 0 for the 'all' scope
+    scope_id = models.BigIntegerField(default=0)
+    rank = models.PositiveSmallIntegerField()
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='+')
+    score = models.FloatField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['board', 'scope', 'scope_id', 'rank'], name='leaderboard_rank_uniq'),
+        ]
+
+
+class ProductTombstone(models.Model):
+    # A deleted product, so the change feed can report it; see changes.py
+    product_id = models.BigIntegerField()
+    deleted_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['deleted_at', 'product_id'], name='tombstone_deleted_idx'),
+        ]
@@ -0,0 +1,158 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F, Max
+from django.utils import timezone
+from django.db.models.functions import RowNumber
+from django.db.models.expressions import Window
+
+from ..orders.models import Order, OrderItem
+from .cache import bump_catalog_version
+from .models import ProductPairCount, RelatedProducts, RelatedProductsRun
+
+ORDER_BATCH_SIZE = 10000
+# Keeps IN (...) lists under SQLite's parameter limit
+PRODUCT_CHUNK_SIZE = 500
+
+
+def chunked(values, size):
+    values = list(values)
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+
+def count_pairs(items):
+    """
+    ``{(product_id, related_id): orders}`` for the orders of the
+    ``OrderItem`` queryset ``items``, in both directions. One self-join
+    GROUP BY per batch, so the pairs of thousands of orders are counted by
+    the database rather than in Python.
+    """
+    rows = (
+        items
+        .annotate(related_id=F('order__items__product_id'))
+        .exclude(related_id=F('product_id'))
+        .values_list('product_id', 'related_id')
+        .annotate(count=Count('order_id', distinct=True))
+        .order_by()
+    )
+    return {(product_id, related_id): count for product_id, related_id, count in rows}
+
+
+def add_pair_counts(counts):
+    """
+    Add a batch of pair counts to the stored matrix with one upsert.
+    Negative counts take cancelled orders back out; pairs left at zero are
+    deleted.
+    """
+    products = {product_id for product_id, _ in counts}
+    stored = {}
+    for chunk in chunked(products, PRODUCT_CHUNK_SIZE):
+        rows = ProductPairCount.objects.filter(product_id__in=chunk, related_id__in=products)
+        stored.update(((p, r), count) for p, r, count in rows.values_list('product_id', 'related_id', 'count'))
+    ProductPairCount.objects.bulk_create(
+        [
+            ProductPairCount(product_id=pair[0], related_id=pair[1], count=stored.get(pair, 0) + count)
+            for pair, count in counts.items()
+        ],
+        batch_size=1000,
+        update_conflicts=True,
+        unique_fields=['product', 'related'],
+        update_fields=['count'],
+    )
+    if any(count < 0 for count in counts.values()):
+        for chunk in chunked(products, PRODUCT_CHUNK_SIZE):
+            ProductPairCount.objects.filter(product_id__in=chunk, count=0).delete()
+
+
+def refresh_related_products(product_ids, limit):
+    """Recompute the stored top ``limit`` neighbours of ``product_ids``."""
+    for chunk in chunked(product_ids, PRODUCT_CHUNK_SIZE):
+        top = (
+            ProductPairCount.objects.filter(product_id__in=chunk)
+            .annotate(rank=Window(
+                RowNumber(), partition_by=F('product_id'), order_by=[F('count').desc(), F('related_id').asc()]
+            ))
+            .filter(rank__lte=limit)
+            .order_by('product_id', 'rank')
+            .values_list('product_id', 'related_id')
+        )
+        related = {product_id: [] for product_id in chunk}
+        for product_id, related_id in top:
+            related[product_id].append(related_id)
+        RelatedProducts.objects.bulk_create(
+            [RelatedProducts(product_id=product_id, related_ids=ids) for product_id, ids in related.items()],
+            update_conflicts=True,
+            unique_fields=['product'],
+            update_fields=['related_ids', 'updated_at'],
+        )
+
+
+def build_related_products(batch_size=ORDER_BATCH_SIZE, limit=None, full=False):
+    """
+    Fold the orders placed since the last run into the co-occurrence
+    matrix, take back out the counted orders cancelled since, and refresh
+    the neighbours of every product they touch. Orders newer than
+    ``RELATED_PRODUCTS_LAG`` seconds are left for the next run, so one
+    still committing (or still getting its items) under a lower id is not
+    skipped. Each batch commits together with the run's progress, so an
+    interrupted run resumes without counting an order twice. ``full``
+    starts over. Returns the run, or None when there was nothing to do.
+    """
+    limit = limit or settings.RELATED_PRODUCTS_LIMIT
+    if full:
+        with transaction.atomic():
+            ProductPairCount.objects.all().delete()
+            RelatedProducts.objects.all().delete()
+            RelatedProductsRun.objects.all().delete()
+
+    # An order counts unless it was cancelled by ``until``; one cancelled
+    # later is counted now and subtracted by the run after
+    until = timezone.now() - timedelta(seconds=settings.RELATED_PRODUCTS_LAG)
+    last_run = RelatedProductsRun.objects.order_by('-pk').first()
+    start = last_run.last_order_id if last_run else 0
+    end = Order.objects.filter(created_at__lte=until).aggregate(last=Max('pk'))['last'] or start
+    cancelled_ids = []
+    if last_run and last_run.counted_until:
+        cancelled_ids = list(Order.objects.filter(
+            pk__lte=start, status='CANCELLED', updated_at__gt=last_run.counted_until, updated_at__lte=until
+        ).values_list('pk', flat=True))
+    if end <= start and not cancelled_ids:
+        return None
+
+    with transaction.atomic():
+        run = RelatedProductsRun.objects.create(last_order_id=start, counted_until=until)
+        if cancelled_ids:
+            counts = {
+                pair: -count
+                for pair, count in count_pairs(OrderItem.objects.filter(order_id__in=cancelled_ids)).items()
+            }
+            add_pair_counts(counts)
+            refresh_related_products({product_id for product_id, _ in counts}, limit)
+            run.cancelled_orders = len(cancelled_ids)
+            run.pairs = len(counts)
+            run.save(update_fields=['cancelled_orders', 'pairs'])
+
+    for first in range(start, end, batch_size):
+        last = min(first + batch_size, end)
+        with transaction.atomic():
+            counts = count_pairs(
+                OrderItem.objects
+                .filter(order_id__gt=first, order_id__lte=last)
+                .exclude(order__status='CANCELLED', order__updated_at__lte=until)
+            )
+            add_pair_counts(counts)
+            refresh_related_products({product_id for product_id, _ in counts}, limit)
+            run.orders += Order.objects.filter(pk__gt=first, pk__lte=last).count()
+            run.pairs += len(counts)
+            run.last_order_id = last
+            run.save(update_fields=['orders', 'pairs', 'last_order_id'])
+
+    if run.pairs:
+        bump_catalog_version()
+    return run
+
+
+def get_related_product_ids(product_id):
+    return RelatedProducts.objects.filter(pk=product_id).values_list('related_ids', flat=True).first() or []
@@ -0,0 +1,170 @@
+import math
+import re
+import unicodedata
+from collections import Counter
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Case, Count, F, FloatField, OuterRef, Subquery, Sum, Value, When
+from django.db.models.functions import Cast
+
+from .models import ProductSearchDocument, ProductSearchPosting
+
+# BM25 parameters
+K1 = 1.2
+B = 0.75
+# Name tokens are counted this many times so title matches rank higher
+NAME_WEIGHT = 2
+MAX_QUERY_TERMS = 10
+STATS_CACHE_KEY = 'products:search:stats'
+STATS_CACHE_TIMEOUT = 300
+SEARCHABLE_FIELDS = frozenset({'name', 'description', 'origin'})
+
+TOKEN_RE = re.compile(r'[a-z0-9]+')
+STOP_WORDS = frozenset(
+    'a an and are as at be by for from has in is it its of on or that the to was with'.split()
+)
+SUFFIXES = (
+    ('ational', 'ate'), ('fulness', 'ful'), ('iveness', 'ive'), ('ization', 'ize'),
+    ('ousness', 'ous'), ('ement', ''), ('ness', ''), ('ment', ''), ('ings', ''),
+    ('ing', ''), ('edly', ''), ('ies', 'y'), ('ied', 'y'), ('ed', ''), ('ly', ''),
+    ('es', ''), ('s', ''),
+)
+
+
+def stem(token):
+    # Light suffix stripping; good enough to conflate plurals and verb forms
+    if len(token) <= 3 or token.isdigit():
+        return token
+    for suffix, replacement in SUFFIXES:
+        if token.endswith(suffix) and len(token) - len(suffix) >= 3:
+            if suffix == 's' and token.endswith('ss'):
+                return token
+            return token[:-len(suffix)] + replacement
+    return token
+
+
+def tokenize(text):
+    text = unicodedata.normalize('NFKD', text or '').encode('ascii', 'ignore').decode('ascii')
+    return [
+        stem(token)[:64]
+        for token in TOKEN_RE.findall(text.lower())
+        if token not in STOP_WORDS
+    ]
+
+
+def analyze_product(product):
+    terms = Counter()
+    for token in tokenize(product.name):
+        terms[token] += NAME_WEIGHT
+    terms.update(tokenize(product.description))
+    terms.update(tokenize(product.origin))
+    return terms
+
+
+def build_postings(product):
+    terms = analyze_product(product)
+    length = sum(terms.values())
+    postings = [
+        ProductSearchPosting(term=term, product_id=product.pk, frequency=frequency, document_length=length)
+        for term, frequency in terms.items()
+    ]
+    return ProductSearchDocument(product_id=product.pk, length=length), postings
+
+
+@transaction.atomic
+def index_product(product):
+    document, postings = build_postings(product)
+    ProductSearchPosting.objects.filter(product_id=product.pk).delete()
+    ProductSearchPosting.objects.bulk_create(postings)
+    ProductSearchDocument.objects.update_or_create(
+        product_id=product.pk, defaults={'length': document.length}
+    )
+
+
+def index_products(queryset, batch_size=1000):
+    """Rebuild the index for every product in ``queryset`` in batches."""
+    indexed = 0
+    fields = ('id', 'name', 'description', 'origin')
+    batch = []
+    for product in queryset.only(*fields).order_by('pk').iterator(chunk_size=batch_size):
+        batch.append(product)
+        if len(batch) >= batch_size:
+            indexed += _index_batch(batch)
+            batch = []
+    indexed += _index_batch(batch)
+    cache.delete(STATS_CACHE_KEY)
+    return indexed
+
+
+@transaction.atomic
+def _index_batch(products):
+    if not products:
+        return 0
+    ids = [product.pk for product in products]
+    documents, postings = [], []
+    for product in products:
+        document, product_postings = build_postings(product)
+        documents.append(document)
+        postings.extend(product_postings)
+    ProductSearchPosting.objects.filter(product_id__in=ids).delete()
+    ProductSearchDocument.objects.filter(product_id__in=ids).delete()
+    ProductSearchDocument.objects.bulk_create(documents)
+    ProductSearchPosting.objects.bulk_create(postings, batch_size=5000)
+    return len(products)
+
+
+def get_index_stats():
+    stats = cache.get(STATS_CACHE_KEY)
+    if stats is None:
+        stats = ProductSearchDocument.objects.aggregate(count=Count('pk'), total=Sum('length'))
+        stats = (stats['count'], (stats['total'] or 0) / stats['count'] if stats['count'] else 0)
+        cache.set(STATS_CACHE_KEY, stats, STATS_CACHE_TIMEOUT)
+    return stats
+
+
+def search_products(queryset, query):
+    """
+    Restrict ``queryset`` to products matching ``query`` and annotate each
+    with its BM25 ``search_score``. Document frequencies are looked up once
+    per query; the scoring itself runs in the database over the postings.
+    """
+    # Empty results still carry the annotation so callers can order on it
+    no_results = queryset.annotate(search_score=Value(0.0, output_field=FloatField())).none()
+    terms = list(dict.fromkeys(tokenize(query)))[:MAX_QUERY_TERMS]
+    if not terms:
+        return no_results
+
+    document_count, average_length = get_index_stats()
+    frequencies = dict(
+        ProductSearchPosting.objects.filter(term__in=terms)
+        .values_list('term')
+        .annotate(df=Count('id'))
+        .order_by()
+    )
+    if not frequencies:
+        return no_results
+
+    idf = Case(
+        *[
+            When(term=term, then=Value(math.log(1 + (document_count - df + 0.5) / (df + 0.5))))
+            for term, df in frequencies.items()
+        ],
+        default=Value(0.0),
+        output_field=FloatField(),
+    )
+    frequency = Cast(F('frequency'), FloatField())
+    length_norm = K1 * (1 - B + B * Cast(F('document_length'), FloatField()) / max(average_length, 1))
+    postings = ProductSearchPosting.objects.filter(term__in=list(frequencies))
+    # Correlated per-product score so the outer query needs no GROUP BY and
+    # keyset pagination can seek on the score in a plain WHERE clause
+    scores = (
+        postings.filter(product=OuterRef('pk'))
+        .order_by()
+        .values('product')
+        .annotate(score=Sum(idf * frequency * (K1 + 1) / (frequency + length_norm)))
+        .values('score')
+    )
+    return queryset.filter(pk__in=postings.values('product')).annotate(
+        search_score=Subquery(scores, output_field=FloatField())
+    )
@@ -1,5 +1,25 @@
-from rest_framework import serializers
-from .models import Product, ProductReview
+from django.conf import settings
+from rest_framework import serializers, permissions
+from .models import MAX_ID, MAX_POSITIVE_INT, RATING_COUNT_FIELDS, Product, ProductReview
+from .images import get_image_name, get_image_storage, get_srcset
+
+def get_requested_fields(request):
+    # Parse the comma separated ?fields= sparse fieldset, None when absent
+    fields = request.query_params.get('fields') if request is not None else None
+    if not fields:
+        return None
+    return {field.strip() for field in fields.split(',') if field.strip()}
+
+class SparseFieldsetMixin:
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        request = self.context.get('request')
+        if request is None or request.method not in permissions.SAFE_METHODS:
+            return
+        fields = get_requested_fields(request)
+        if fields:
+            for name in set(self.fields) - fields:
+                self.fields.pop(name)
 
 class ProductReviewSerializer(serializers.ModelSerializer):
     user = serializers.ReadOnlyField(source='user.username')
@@ -9,30 +29,125 @@ class ProductReviewSerializer(serializers.ModelSerializer):
         fields = ['id', 'user', 'rating', 'comment', 'created_at', 'updated_at']
         read_only_fields = ['user', 'created_at', 'updated_at']
 
-class ProductSerializer(serializers.ModelSerializer):
+class ProductImageMixin:
+    """
+    ``image_url`` and ``image_srcset`` read from the URLs stored with the
+    image variants; only images without variants build a URL per row.
+    """
+    image_variant = 'original'
+
+    def get_image_variant(self):
+        return self.image_variant
+
+    def get_image_url(self, obj):
+        variants = obj.image_variants
+        variant = variants.get(self.get_image_variant()) or variants.get('original')
+        if variant:
+            return variant['url']
+        if obj.image:
+            return get_image_storage().url(obj.image)
+        return None
+
+    def get_image_srcset(self, obj):
+        return get_srcset(obj.image_variants) or None
+
+class ProductSerializer(ProductImageMixin, SparseFieldsetMixin, serializers.ModelSerializer):
     vendor = serializers.ReadOnlyField(source='vendor.user.username')
     reviews = ProductReviewSerializer(many=True, read_only=True)
     average_rating = serializers.SerializerMethodField()
+    rating_histogram = serializers.SerializerMethodField()
     image_url = serializers.SerializerMethodField()
+    image_srcset = serializers.SerializerMethodField()
     
     class Meta:
         model = Product
         fields = [
-            'id', 'vendor', 'category', 'name', 'description',
+            'id', 'vendor', 'category', 'sku', 'name', 'description',
             'price', 'stock', 'roast_type', 'origin', 'image',
-            'image_url', 'is_available', 'created_at', 'updated_at',
-            'reviews', 'average_rating'
+            'image_url', 'image_srcset', 'image_variants', 'image_status', 'is_available',
+            'created_at', 'updated_at', 'reviews', 'average_rating', 'review_count',
+            'rating_histogram'
         ]
-        read_only_fields = ['vendor', 'created_at', 'updated_at']
+        read_only_fields = ['vendor', 'created_at', 'updated_at', 'review_count', 'image_status', 'image_variants']
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # A staged upload stands in for the image until the workers publish it
+        if self.context.get('image_upload') and 'image' in self.fields:
+            self.fields['image'].required = False
     
     def get_average_rating(self, obj):
-        reviews = obj.reviews.all()
-        if reviews:
-            return sum(review.rating for review in reviews) / len(reviews)
+        # Read from the denormalized counters; no review rows are needed
+        if obj.review_count:
+            return obj.average_rating
         return None
-    
-    
-    def get_image_url(self, obj):
-        if obj.image:
-            return obj.image.url
-        return None
\ No newline at end of file
+
+    def get_rating_histogram(self, obj):
+        # Star -> review count, from the counters kept next to review_count
+        return {str(rating): getattr(obj, field) for rating, field in RATING_COUNT_FIELDS.items()}
+
+    def validate_sku(self, value):
+        if not value:
+            return None
+        request = self.context.get('request')
+        vendor = getattr(request.user, 'vendor_profile', None) if request else None
+        duplicates = Product.objects.filter(vendor=vendor, sku=value)
+        if self.instance is not None:
+            duplicates = duplicates.exclude(pk=self.instance.pk)
+        if vendor is not None and duplicates.exists():
+            raise serializers.ValidationError('You already have a product with this SKU.')
+        return value
+
+    def update(self, instance, validated_data):
+        image = validated_data.get('image')
+        if image is not None and get_image_name(image) != get_image_name(instance.image):
+            # The stored variants belong to the replaced image
+            validated_data['image_variants'] = {}
+        return super().update(instance, validated_data)
+
+class ProductSummarySerializer(ProductImageMixin, SparseFieldsetMixin, serializers.ModelSerializer):
+    average_rating = serializers.SerializerMethodField()
+    image_url = serializers.SerializerMethodField()
+    image_srcset = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Product
+        fields = [
+            'id', 'name', 'price', 'image_url', 'image_srcset', 'roast_type', 'origin',
+            'average_rating', 'review_count', 'stock', 'is_available'
+        ]
+        read_only_fields = fields
+
+    def get_image_variant(self):
+        # Listing cards are small; the full image is one click away
+        return settings.PRODUCT_IMAGE_LISTING_VARIANT
+
+    def get_average_rating(self, obj):
+        if obj.review_count:
+            return obj.average_rating
+        return None
+
+
+class ProductImportSerializer(serializers.Serializer):
+    """
+    Validates one bulk import row without touching the database; category
+    ids are checked per chunk by the importer. Existing SKUs are validated
+    partially so rows only need the columns they change.
+    """
+    sku = serializers.CharField(max_length=64)
+    name = serializers.CharField(max_length=200)
+    description = serializers.CharField(required=False, allow_blank=True, default='')
+    price = serializers.DecimalField(max_digits=10, decimal_places=2, min_value=0)
+    # Bounded by the columns, so an oversized value is a row error rather
+    # than an overflow while writing the chunk
+    stock = serializers.IntegerField(min_value=0, max_value=MAX_POSITIVE_INT, required=False, default=0)
+    roast_type = serializers.ChoiceField(choices=Product.ROAST_CHOICES)
+    origin = serializers.CharField(max_length=100)
+    category = serializers.IntegerField(min_value=1, max_value=MAX_ID, required=False, allow_null=True, default=None)
+    image = serializers.CharField(max_length=255, required=False, allow_blank=True, default='')
+    is_available = serializers.BooleanField(required=False, default=True)
+
+    def to_internal_value(self, data):
+        # CSV cells are strings; an empty one means "not provided"
+        data = {key: value for key, value in data.items() if key is not None and value != ''}
+        return super().to_internal_value(data)
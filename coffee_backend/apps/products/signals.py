@@ -0,0 +1,158 @@
+from collections import Counter
+
+from django.core.cache import cache
+from django.db.models import Sum
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from ..accounts.models import VendorProfile
+from ..orders.models import Order, OrderItem
+
+from .cache import bump_catalog_version, bump_snapshot_version
+from .facets import (
+    KEY_FIELDS, adjust_facet_count, get_facet_key, get_row_facet_key, move_facet_count, rebuild_facet_counts
+)
+from .leaderboards import adjust_units_sold, schedule_leaderboard_refresh
+from .models import Category, Product, ProductReview, ProductTombstone
+from .search import SEARCHABLE_FIELDS, STATS_CACHE_KEY, index_product
+from .snapshot import SNAPSHOT_COLUMNS, SNAPSHOT_FIELDS
+
+
+@receiver(pre_save, sender=Product)
+def remember_stored_product(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    # The row as stored, to move its facet count and to tell whether the
+    # catalog snapshot has to be rebuilt. Kept as _stored_row for the other
+    # apps' post_save handlers too (the cart totals follow its price), so a
+    # save reads it once.
+    fields = {*KEY_FIELDS, *SNAPSHOT_COLUMNS}
+    stored = Product.objects.filter(pk=instance.pk).values(*fields).first() if instance.pk else None
+    instance._stored_row = stored
+    instance._stored_facet_key = get_row_facet_key(stored)
+    instance._stored_snapshot_row = tuple(stored[field] for field in SNAPSHOT_COLUMNS) if stored else None
+
+
+def snapshot_changed(instance, update_fields):
+    if update_fields and not SNAPSHOT_FIELDS & set(update_fields):
+        return False
+    # A rebuild costs seconds on a large catalog; skip it for creates, which
+    # get_product_record finds with a one-row query, and for saves that leave
+    # the mirrored columns as they were, e.g. description edits
+    stored = getattr(instance, '_stored_snapshot_row', None)
+    return stored is not None and stored != tuple(getattr(instance, field) for field in SNAPSHOT_COLUMNS)
+
+
+@receiver(post_save, sender=Product)
+def product_saved(sender, instance, raw=False, update_fields=None, **kwargs):
+    if raw:
+        return
+    bump_catalog_version(instance.vendor_id)
+    if snapshot_changed(instance, update_fields):
+        bump_snapshot_version()
+    move_facet_count(getattr(instance, '_stored_facet_key', None), get_facet_key(instance))
+    schedule_leaderboard_refresh([instance.pk])
+    if update_fields and not SEARCHABLE_FIELDS & set(update_fields):
+        return
+    index_product(instance)
+    cache.delete(STATS_CACHE_KEY)
+
+
+@receiver(post_delete, sender=Product)
+def product_deleted(sender, instance, **kwargs):
+    # Postings and the document row go with the product through CASCADE
+    ProductTombstone.objects.create(product_id=instance.pk)
+    cache.delete(STATS_CACHE_KEY)
+    bump_catalog_version(instance.vendor_id)
+    bump_snapshot_version()
+    adjust_facet_count(get_facet_key(instance), -1)
+
+
+@receiver(pre_delete, sender=Category)
+def category_deleting(sender, instance, **kwargs):
+    # SET_NULL clears the category with an UPDATE that leaves updated_at
+    # alone; touch the products first so the change feed reports them
+    Product.objects.filter(category=instance).update(updated_at=timezone.now())
+
+
+@receiver(post_delete, sender=Category)
+def category_deleted(sender, instance, **kwargs):
+    # Its products were moved to no category by a bulk UPDATE without signals
+    rebuild_facet_counts()
+    bump_catalog_version()
+
+
+@receiver(post_save, sender=VendorProfile)
+def vendor_profile_saved(sender, instance, raw=False, **kwargs):
+    # Storefronts show the profile; facets and product bodies its names
+    if not raw:
+        bump_catalog_version(instance.pk)
+
+
+@receiver(post_save, sender=ProductReview)
+@receiver(post_delete, sender=ProductReview)
+def invalidate_reviewed_product(sender, instance, raw=False, **kwargs):
+    # Reviews show up in product bodies and move the rating counters
+    if raw:
+        return
+    vendor_id = Product.objects.filter(pk=instance.product_id).values_list('vendor_id', flat=True).first()
+    bump_catalog_version(vendor_id)
+    schedule_leaderboard_refresh([instance.product_id], boards=('top_rated',))
+
+
+def counts_as_sold(order_id):
+    return not Order.objects.filter(pk=order_id, status='CANCELLED').exists()
+
+
+@receiver(pre_save, sender=OrderItem)
+def remember_order_item(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    # The item as stored, to move its units if the save changes it
+    stored = OrderItem.objects.filter(pk=instance.pk).values('product_id', 'quantity').first() if instance.pk else None
+    instance._stored_units = (stored['product_id'], stored['quantity']) if stored else None
+
+
+@receiver(post_save, sender=OrderItem)
+def order_item_saved(sender, instance, raw=False, **kwargs):
+    if raw or not counts_as_sold(instance.order_id):
+        return
+    deltas = Counter({instance.product_id: instance.quantity})
+    stored = getattr(instance, '_stored_units', None)
+    if stored:
+        deltas[stored[0]] -= stored[1]
+    adjust_units_sold(deltas)
+    schedule_leaderboard_refresh([product_id for product_id, delta in deltas.items() if delta], ('bestsellers',))
+
+
+@receiver(post_delete, sender=OrderItem)
+def order_item_deleted(sender, instance, **kwargs):
+    # Items of a deleted order go first, while the order row still exists
+    if not counts_as_sold(instance.order_id):
+        return
+    adjust_units_sold({instance.product_id: -instance.quantity})
+    schedule_leaderboard_refresh([instance.product_id], ('bestsellers',))
+
+
+@receiver(pre_save, sender=Order)
+def remember_order_status(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    instance._stored_status = Order.objects.filter(pk=instance.pk).values_list('status', flat=True).first() if instance.pk else None
+
+
+@receiver(post_save, sender=Order)
+def order_saved(sender, instance, raw=False, created=False, **kwargs):
+    stored = getattr(instance, '_stored_status', None)
+    if raw or created or stored is None:
+        return
+    was_cancelled, cancelled = stored == 'CANCELLED', instance.status == 'CANCELLED'
+    if was_cancelled == cancelled:
+        return
+    # Cancelling returns the order's units, reopening it counts them again
+    sign = -1 if cancelled else 1
+    units = instance.items.values('product_id').annotate(units=Sum('quantity')).order_by()
+    deltas = {row['product_id']: sign * row['units'] for row in units}
+    adjust_units_sold(deltas)
+    schedule_leaderboard_refresh(deltas, ('bestsellers',))
@@ -0,0 +1,122 @@
+import threading
+from array import array
+from bisect import bisect_left
+from decimal import Decimal
+
+from .cache import get_snapshot_version
+from .models import Product
+
+# Fields mirrored by the snapshot; saves touching none of them keep it valid
+SNAPSHOT_FIELDS = {'price', 'stock', 'vendor', 'vendor_id', 'is_available'}
+SNAPSHOT_COLUMNS = ('price', 'stock', 'vendor_id', 'is_available')
+
+_snapshot = None
+_lock = threading.Lock()
+
+
+class ProductRecord:
+    __slots__ = ('id', 'price', 'stock', 'vendor_id', 'is_available')
+
+    def __init__(self, id, price, stock, vendor_id, is_available):
+        self.id = id
+        self.price = price
+        self.stock = stock
+        self.vendor_id = vendor_id
+        self.is_available = is_available
+
+    def __repr__(self):
+        return f'<ProductRecord {self.id}: {self.price} x{self.stock}>'
+
+
+class CatalogSnapshot:
+    """
+    Read-only copy of id -> (price, stock, vendor_id, is_available) for
+    every product, held in parallel typed arrays sorted by id: about 29
+    bytes per product instead of a model instance or dict per row.
+    """
+    __slots__ = ('version', 'ids', 'prices', 'stocks', 'vendor_ids', 'available')
+
+    def __init__(self, version, rows=()):
+        self.version = version
+        self.ids = array('q')
+        self.prices = array('q')  # cents
+        self.stocks = array('i')
+        self.vendor_ids = array('q')
+        self.available = bytearray()
+        for pk, price, stock, vendor_id, is_available in rows:
+            self.ids.append(pk)
+            self.prices.append(int(price * 100))
+            self.stocks.append(stock)
+            self.vendor_ids.append(vendor_id)
+            self.available.append(is_available)
+
+    @classmethod
+    def build(cls, version):
+        rows = (
+            Product.objects.order_by('pk')
+            .values_list('pk', 'price', 'stock', 'vendor_id', 'is_available')
+            .iterator(chunk_size=10000)
+        )
+        return cls(version, rows)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def get(self, product_id):
+        index = bisect_left(self.ids, product_id)
+        if index == len(self.ids) or self.ids[index] != product_id:
+            return None
+        return ProductRecord(
+            product_id,
+            Decimal(self.prices[index]).scaleb(-2),
+            self.stocks[index],
+            self.vendor_ids[index],
+            bool(self.available[index]),
+        )
+
+    @property
+    def nbytes(self):
+        return sum(
+            len(values) * values.itemsize
+            for values in (self.ids, self.prices, self.stocks, self.vendor_ids)
+        ) + len(self.available)
+
+
+def get_catalog_snapshot():
+    """
+    This process's snapshot, rebuilt when the shared snapshot version has
+    moved since it was built. Costs one cache read while it is current.
+    """
+    global _snapshot
+    version = get_snapshot_version()
+    snapshot = _snapshot
+    if snapshot is not None and snapshot.version == version:
+        return snapshot
+    with _lock:
+        # Another thread may have rebuilt it while this one waited
+        if _snapshot is None or _snapshot.version != version:
+            _snapshot = CatalogSnapshot.build(version)
+        return _snapshot
+
+
+def get_product_record(product_id):
+    """
+    Price, stock, vendor and availability of a product, or None if it does
+    not exist. Served from the snapshot, with a single-row query for ids it
+    does not hold: creates do not rebuild it, so those may belong to
+    products created since, including ones that committed late under a
+    lower id.
+    """
+    try:
+        product_id = int(product_id)
+    except (TypeError, ValueError):
+        return None
+    record = get_catalog_snapshot().get(product_id)
+    if record is not None:
+        return record
+    row = (
+        Product.objects.filter(pk=product_id)
+        .values_list('pk', 'price', 'stock', 'vendor_id', 'is_available')
+        .first()
+    )
+    return ProductRecord(*row) if row else None
@@ -1,2 +1,5 @@
 from .test_models import CategoryModelTest, ProductModelTest, ProductReviewModelTest
-from .test_views import ProductViewsTestCase, ProductReviewViewsTestCase
\ No newline at end of file
+from .test_views import ProductViewsTestCase, ProductPaginationTestCase, ProductBatchTestCase, ProductSearchTestCase, ProductResponseCacheTestCase, ProductConditionalGetTestCase, ProductFacetsTestCase, ProductBulkImportTestCase, ProductImageUploadTestCase, ProductLeaderboardTestCase, ProductChangesTestCase, VendorStorefrontTestCase, ProductReviewViewsTestCase
+from .test_commands import RebuildProductRatingsCommandTest, RebuildSearchIndexCommandTest, BuildRelatedProductsCommandTest
+from .test_query_plans import CatalogQueryPlanTest
+from .test_snapshot import CatalogSnapshotTest
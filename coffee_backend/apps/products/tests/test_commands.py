@@ -0,0 +1,177 @@
+from io import StringIO
+from decimal import Decimal
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from ...accounts.models import User, VendorProfile
+from ...orders.models import Order, OrderItem
+from ..models import (
+    Category, Product, ProductPairCount, ProductReview, ProductSearchPosting, RelatedProductsRun
+)
+
+
+class RebuildProductRatingsCommandTest(TestCase):
+    def setUp(self):
+        vendor_user = User.objects.create_user(username='vendor', password='testpass')
+        vendor = VendorProfile.objects.create(user=vendor_user)
+        category = Category.objects.create(name='Test Category')
+        self.reviewed, self.unreviewed = [
+            Product.objects.create(
+                vendor=vendor,
+                category=category,
+                name=name,
+                description='Test Description',
+                price=Decimal('10.00'),
+                stock=10,
+                roast_type='MEDIUM',
+                origin='Test Origin',
+                image='test_image.jpg'
+            )
+            for name in ('Reviewed', 'Unreviewed')
+        ]
+        for i, rating in enumerate([5, 4, 3]):
+            user = User.objects.create_user(username=f'reviewer{i}', password='testpass')
+            ProductReview.objects.create(product=self.reviewed, user=user, rating=rating, comment='Ok')
+        # Simulate drifted counters
+        Product.objects.filter(pk=self.unreviewed.pk).update(review_count=7, rating_sum=20, average_rating=2.9, rating_1_count=2)
+
+    def test_rebuild(self):
+        out = StringIO()
+        call_command('rebuild_product_ratings', batch_size=1, stdout=out)
+        self.assertIn('Rebuilt ratings for 1 reviewed products', out.getvalue())
+
+        self.reviewed.refresh_from_db()
+        self.unreviewed.refresh_from_db()
+        self.assertEqual((self.reviewed.review_count, self.reviewed.rating_sum), (3, 12))
+        self.assertEqual(self.reviewed.average_rating, 4)
+        self.assertEqual((self.unreviewed.review_count, self.unreviewed.rating_sum), (0, 0))
+        self.assertEqual(self.unreviewed.average_rating, 0)
+        self.assertEqual(
+            [getattr(self.reviewed, f'rating_{rating}_count') for rating in range(1, 6)], [0, 0, 1, 1, 1]
+        )
+        self.assertEqual(self.unreviewed.rating_1_count, 0)
+
+
+
+class RebuildSearchIndexCommandTest(TestCase):
+    def test_rebuild(self):
+        vendor_user = User.objects.create_user(username='vendor', password='testpass')
+        vendor = VendorProfile.objects.create(user=vendor_user)
+        product = Product.objects.create(
+            vendor=vendor,
+            name='Kenya Peaberry',
+            description='Bright and juicy',
+            price=Decimal('10.00'),
+            stock=10,
+            roast_type='LIGHT',
+            origin='Kenya',
+            image='test_image.jpg'
+        )
+        # Simulate a stale index, e.g. after a bulk update
+        Product.objects.filter(pk=product.pk).update(description='Winey blackcurrant')
+
+        out = StringIO()
+        call_command('rebuild_search_index', batch_size=1, stdout=out)
+        self.assertIn('Indexed 1 products', out.getvalue())
+        terms = dict(ProductSearchPosting.objects.values_list('term', 'frequency'))
+        self.assertEqual(terms, {'kenya': 3, 'peaberry': 2, 'winey': 1, 'blackcurrant': 1})
+
+
+@override_settings(RELATED_PRODUCTS_LAG=0)
+class BuildRelatedProductsCommandTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        vendor_user = User.objects.create_user(username='vendor', password='testpass')
+        vendor = VendorProfile.objects.create(user=vendor_user)
+        self.customer = User.objects.create_user(username='customer', password='testpass')
+        self.beans, self.grinder, self.filters, self.mug = [
+            Product.objects.create(
+                vendor=vendor,
+                name=name,
+                description='Test Description',
+                price=Decimal('10.00'),
+                stock=10,
+                roast_type='MEDIUM',
+                origin='Test Origin',
+                image='test_image.jpg'
+            )
+            for name in ('Beans', 'Grinder', 'Filters', 'Mug')
+        ]
+
+    def order(self, *products, status='PENDING'):
+        order = Order.objects.create(
+            customer=self.customer,
+            status=status,
+            total_amount=Decimal('10.00'),
+            shipping_address='123 Test St',
+            phone_number='1234567890'
+        )
+        for product in products:
+            OrderItem.objects.create(order=order, product=product, quantity=1, price=product.price)
+        return order
+
+    def related(self, product):
+        url = reverse('product-related', args=[product.id])
+        return [row['id'] for row in self.client.get(url).data['results']]
+
+    def test_incremental_build(self):
+        self.order(self.beans, self.grinder, self.filters)
+        self.order(self.beans, self.filters)
+        self.order(self.beans, self.mug, status='CANCELLED')
+        out = StringIO()
+        call_command('build_related_products', batch_size=2, stdout=out)
+        self.assertIn('Processed 3 orders', out.getvalue())
+        self.assertEqual(self.related(self.beans), [self.filters.id, self.grinder.id])
+        self.assertEqual(self.related(self.mug), [])
+
+        # Only the new orders are read; counts add up across runs
+        self.order(self.beans, self.grinder)
+        self.order(self.beans, self.grinder)
+        out = StringIO()
+        call_command('build_related_products', limit=1, stdout=out)
+        self.assertIn('Processed 2 orders', out.getvalue())
+        self.assertEqual(ProductPairCount.objects.get(product=self.beans, related=self.grinder).count, 3)
+        self.assertEqual(self.related(self.beans), [self.grinder.id])
+
+        call_command('build_related_products', full=True, stdout=StringIO())
+        self.assertEqual(ProductPairCount.objects.get(product=self.grinder, related=self.beans).count, 3)
+
+    def test_cancelled_orders_are_subtracted(self):
+        order = self.order(self.beans, self.grinder)
+        self.order(self.beans, self.filters)
+        call_command('build_related_products', stdout=StringIO())
+        self.assertEqual(self.related(self.beans), [self.grinder.id, self.filters.id])
+
+        order.status = 'CANCELLED'
+        order.save()
+        out = StringIO()
+        call_command('build_related_products', stdout=out)
+        self.assertIn('Processed 0 orders up to order', out.getvalue())
+        self.assertIn('1 cancellations', out.getvalue())
+        self.assertFalse(ProductPairCount.objects.filter(product=self.beans, related=self.grinder).exists())
+        self.assertEqual(self.related(self.beans), [self.filters.id])
+        self.assertEqual(self.related(self.grinder), [])
+
+        # Counted once, subtracted once
+        out = StringIO()
+        call_command('build_related_products', stdout=out)
+        self.assertIn('No new or cancelled orders', out.getvalue())
+        self.assertEqual(RelatedProductsRun.objects.count(), 2)
+
+    def test_recent_orders_are_held_back(self):
+        self.order(self.beans, self.grinder)
+        with override_settings(RELATED_PRODUCTS_LAG=60):
+            out = StringIO()
+            call_command('build_related_products', stdout=out)
+        self.assertIn('No new or cancelled orders', out.getvalue())
+        self.assertFalse(RelatedProductsRun.objects.exists())
+
+        call_command('build_related_products', stdout=StringIO())
+        self.assertEqual(self.related(self.beans), [self.grinder.id])
+
+    def test_unknown_product(self):
+        response = self.client.get(reverse('product-related', args=[self.mug.id + 100]))
+        self.assertEqual(response.status_code, 404)
+        response = self.client.get(reverse('product-related', args=[2 ** 64]))
+        self.assertEqual(response.status_code, 404)
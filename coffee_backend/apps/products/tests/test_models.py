@@ -1,5 +1,6 @@
 from django.test import TestCase
 from django.core.exceptions import ValidationError
+from django.db import connection
 from django.db.utils import IntegrityError
 from decimal import Decimal
 from django.utils import timezone
@@ -61,6 +62,27 @@ class ProductModelTest(TestCase):
         )
         self.assertEqual(str(product), "Colombian Supremo")
 
+    def test_adjust_rating_sends_int_deltas(self):
+        product = Product.objects.create(
+            vendor=self.vendor, name="Kenya AA", price=Decimal('12.00'), image='test_image.jpg'
+        )
+        params = []
+
+        def record(execute, sql, sql_params, many, context):
+            if sql.startswith('UPDATE'):
+                params.extend(sql_params)
+            return execute(sql, sql_params, many, context)
+
+        with connection.execute_wrapper(record):
+            Product.objects.filter(pk=product.pk).adjust_rating(added=4)
+            Product.objects.filter(pk=product.pk).adjust_rating(added=2, removed=4)
+            Product.objects.filter(pk=product.pk).adjust_rating(added=2, removed=2)
+        self.assertTrue(params)
+        self.assertFalse([param for param in params if isinstance(param, bool)])
+        product.refresh_from_db()
+        self.assertEqual((product.review_count, product.rating_sum, product.average_rating), (1, 2, 2))
+        self.assertEqual((product.rating_2_count, product.rating_4_count), (1, 0))
+
 class ProductReviewModelTest(TestCase):
     def setUp(self):
         # Create necessary related objects
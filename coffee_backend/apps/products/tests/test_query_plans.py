@@ -0,0 +1,111 @@
+import re
+from decimal import Decimal
+from urllib.parse import parse_qs, urlparse
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from ...accounts.models import User, VendorProfile
+from ..models import Category, Product, ProductReview
+
+# A plan line that reads a whole table instead of seeking an index
+FULL_SCAN_PATTERNS = {
+    'sqlite': re.compile(r'\bSCAN (\w+)(?! USING)(?:$| (?!USING))'),
+    'postgresql': re.compile(r'Seq Scan on (\w+)'),
+}
+
+
+def explain(sql):
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            cursor.execute('EXPLAIN QUERY PLAN ' + sql)
+            return [row[-1] for row in cursor.fetchall()]
+        # Tiny test tables make a sequential scan the cheapest plan; forbid
+        # it so the planner shows which index it would use
+        cursor.execute('SET LOCAL enable_seqscan = off')
+        cursor.execute('EXPLAIN ' + sql)
+        return [row[0] for row in cursor.fetchall()]
+
+
+class CatalogQueryPlanTest(TestCase):
+    """
+    Runs EXPLAIN on every query the public catalog and review listings
+    issue for their filter combinations and fails on a full table scan.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        vendor_user = User.objects.create_user(username='vendor', password='testpass')
+        self.vendor = VendorProfile.objects.create(user=vendor_user)
+        self.category = Category.objects.create(name='Test Category')
+        for i in range(3):
+            Product.objects.create(
+                vendor=self.vendor,
+                category=self.category,
+                name=f'Product {i}',
+                description='Test Description',
+                price=Decimal('10.00'),
+                stock=10,
+                roast_type='DARK',
+                origin='Kenya',
+                image='test_image.jpg'
+            )
+
+    def assertNoFullScans(self, params, url=None):
+        pattern = FULL_SCAN_PATTERNS.get(connection.vendor)
+        if pattern is None:
+            self.skipTest(f'No plan check for {connection.vendor}')
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url or reverse('product-list'), params)
+        self.assertEqual(response.status_code, 200)
+        for query in queries.captured_queries:
+            plan = explain(query['sql'])
+            scans = [line for line in plan if pattern.search(line)]
+            self.assertEqual(scans, [], f'Full scan for {params}:\n{query["sql"]}\n' + '\n'.join(plan))
+        return response
+
+    def test_listing(self):
+        response = self.assertNoFullScans({'page_size': 1})
+        self.assertNoFullScans(parse_qs(urlparse(response.data['next']).query))
+
+    def test_filters(self):
+        for params in [
+            {'category': self.category.id},
+            {'vendor': self.vendor.id},
+            {'roast': 'DARK'},
+            {'origin': 'Kenya'},
+            {'category': self.category.id, 'roast': 'DARK'},
+            {'vendor': self.vendor.id, 'roast': 'DARK', 'view': 'summary'},
+        ]:
+            with self.subTest(params=params):
+                self.assertNoFullScans(params)
+
+    def test_rating_order(self):
+        self.assertNoFullScans({'ordering': 'rating'})
+
+    def test_review_pages(self):
+        product = Product.objects.first()
+        for i in range(2):
+            user = User.objects.create_user(username=f'reviewer{i}', password='testpass')
+            ProductReview.objects.create(product=product, user=user, rating=5, comment='Nice')
+        url = reverse('review-list', args=[product.id])
+        response = self.assertNoFullScans({'page_size': 1}, url)
+        self.assertNoFullScans(parse_qs(urlparse(response.data['next']).query), url)
+        self.assertNoFullScans({'rating': 5}, url)
+
+    @override_settings(CHANGE_FEED_LAG=0)
+    def test_change_feed(self):
+        Product.objects.last().delete()
+        url = reverse('product-changes')
+        response = self.assertNoFullScans({'page_size': 1, 'view': 'summary'}, url)
+        self.assertNoFullScans({'cursor': response.data['cursor'], 'view': 'summary'}, url)
+
+    def test_storefront(self):
+        url = reverse('vendor-storefront', args=[self.vendor.id])
+        response = self.assertNoFullScans({'page_size': 1}, url)
+        self.assertNoFullScans(parse_qs(urlparse(response.data['products']['next']).query), url)
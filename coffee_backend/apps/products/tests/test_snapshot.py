@@ -0,0 +1,94 @@
+from decimal import Decimal
+
+from django.core.cache import cache, caches
+from django.test import TestCase, override_settings
+
+from ...accounts.models import User, VendorProfile
+from ..bulk import import_products
+from ..cache import SNAPSHOT_VERSION_KEY
+from ..checks import check_shared_cache, check_shared_cache_is_shared
+from ..models import Product
+from ..snapshot import get_catalog_snapshot, get_product_record
+
+
+class CatalogSnapshotTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        caches['shared'].clear()
+        vendor_user = User.objects.create_user(username='vendor', password='testpass')
+        self.vendor = VendorProfile.objects.create(user=vendor_user)
+        self.product = Product.objects.create(
+            vendor=self.vendor,
+            sku='KEN-1',
+            name='Kenya AA',
+            description='Blackcurrant',
+            price=Decimal('12.99'),
+            stock=3,
+            roast_type='LIGHT',
+            origin='Kenya',
+            image='test_image.jpg'
+        )
+
+    def test_lookup_without_queries(self):
+        get_catalog_snapshot()
+        with self.assertNumQueries(0):
+            record = get_product_record(self.product.id)
+        # Ids the snapshot lacks may be newer than it
+        with self.assertNumQueries(1):
+            self.assertIsNone(get_product_record(self.product.id + 1))
+        self.assertEqual(
+            (record.price, record.stock, record.vendor_id, record.is_available),
+            (Decimal('12.99'), 3, self.vendor.id, True)
+        )
+        self.assertIsNone(get_product_record('not-an-id'))
+
+    def test_writes_invalidate(self):
+        snapshot = get_catalog_snapshot()
+        self.product.price = Decimal('14.50')
+        self.product.is_available = False
+        self.product.save()
+        record = get_product_record(self.product.id)
+        self.assertEqual((record.price, record.is_available), (Decimal('14.50'), False))
+        self.assertIsNot(get_catalog_snapshot(), snapshot)
+
+        # Saves of other fields keep the snapshot, also without update_fields
+        snapshot = get_catalog_snapshot()
+        self.product.save(update_fields=['name'])
+        self.assertIs(get_catalog_snapshot(), snapshot)
+        self.product.description = 'Edited'
+        self.product.save()
+        self.assertIs(get_catalog_snapshot(), snapshot)
+
+        import_products(self.vendor, [{'sku': 'KEN-1', 'stock': 9}])
+        self.assertEqual(get_product_record(self.product.id).stock, 9)
+
+        self.product.delete()
+        self.assertIsNone(get_product_record(self.product.id))
+
+    def test_creates_keep_the_snapshot(self):
+        snapshot = get_catalog_snapshot()
+        created = Product.objects.create(vendor=self.vendor, name='Brazil Santos', price=Decimal('9.00'), stock=4)
+        import_products(self.vendor, [
+            {'sku': 'BRA-2', 'name': 'Brazil Cerrado', 'price': '8.00', 'roast_type': 'DARK', 'origin': 'Brazil'}
+        ])
+        self.assertIs(get_catalog_snapshot(), snapshot)
+        self.assertEqual(get_product_record(created.id).price, Decimal('9.00'))
+        imported = Product.objects.get(sku='BRA-2')
+        self.assertEqual(get_product_record(imported.id).vendor_id, self.vendor.id)
+
+    def test_version_is_shared(self):
+        # Another worker's bump reaches this process through the shared alias
+        snapshot = get_catalog_snapshot()
+        caches['shared'].incr(SNAPSHOT_VERSION_KEY)
+        self.assertIsNot(get_catalog_snapshot(), snapshot)
+
+    def test_shared_cache_check(self):
+        local = {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}
+        shared = {'BACKEND': 'django.core.cache.backends.redis.RedisCache', 'LOCATION': 'redis://cache:6379'}
+        with override_settings(CACHES={'default': local}):
+            self.assertEqual([error.id for error in check_shared_cache(None)], ['products.E001'])
+        with override_settings(CACHES={'default': local, 'shared': local}):
+            self.assertEqual(check_shared_cache(None), [])
+            self.assertEqual([error.id for error in check_shared_cache_is_shared(None)], ['products.W001'])
+        with override_settings(CACHES={'default': local, 'shared': shared}):
+            self.assertEqual(check_shared_cache_is_shared(None), [])
@@ -1,14 +1,33 @@
-from django.test import TestCase
+import base64
+import json
+import os
+import shutil
+import tempfile
+from importlib import import_module
+from io import BytesIO
+from urllib.parse import parse_qs, urlparse
+
+from django.apps import apps as django_apps
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from PIL import Image
 from django.urls import reverse
 from rest_framework.test import APIClient
 from rest_framework import status
 from ...accounts.models import User
 from ..models import Product, ProductReview, Category
+from ..cache import VERSION_KEY, get_response_cache_stats
+from ..images import get_image_name
 from ...accounts.models import VendorProfile
+from ...orders.models import Order, OrderItem
 from decimal import Decimal
+from io import StringIO
+from django.core.management import call_command
+from django.core.cache import cache, caches
 
 class ProductViewsTestCase(TestCase):
     def setUp(self):
+        cache.clear()
         self.client = APIClient()
         
         # Create users
@@ -38,11 +57,901 @@ class ProductViewsTestCase(TestCase):
         url = reverse('product-list')
         response = self.client.get(url)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 1)
+        self.assertEqual(len(response.data['results']), 1)
+
+
+class ProductPaginationTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        vendor_user = User.objects.create_user(email='vendor@test.com', username='vendor', password='testpass')
+        self.vendor_profile = VendorProfile.objects.create(user=vendor_user)
+        self.category = Category.objects.create(name='Test Category')
+        self.products = [
+            Product.objects.create(
+                vendor=self.vendor_profile,
+                category=self.category,
+                name=f'Product {i}',
+                description='Test Description',
+                price=Decimal('10.00'),
+                stock=10,
+                roast_type='DARK' if i % 2 else 'LIGHT',
+                origin='Test Origin',
+                image='test_image.jpg'
+            )
+            for i in range(5)
+        ]
+
+    def test_first_page_is_newest_first(self):
+        response = self.client.get(reverse('product-list'), {'page_size': 2})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [p['id'] for p in response.data['results']],
+            [self.products[4].id, self.products[3].id]
+        )
+        self.assertIsNotNone(response.data['next'])
+        self.assertIsNone(response.data['previous'])
+
+    def test_walk_forward_and_back(self):
+        seen = []
+        url = reverse('product-list') + '?page_size=2'
+        while url:
+            response = self.client.get(url)
+            seen.extend(p['id'] for p in response.data['results'])
+            last = response
+            url = response.data['next']
+        self.assertEqual(seen, [p.id for p in reversed(self.products)])
+
+        response = self.client.get(last.data['previous'])
+        self.assertEqual(
+            [p['id'] for p in response.data['results']],
+            [self.products[2].id, self.products[1].id]
+        )
+
+    def test_filters_apply_to_pages(self):
+        response = self.client.get(reverse('product-list'), {'roast': 'DARK', 'page_size': 1})
+        self.assertEqual([p['id'] for p in response.data['results']], [self.products[3].id])
+        response = self.client.get(response.data['next'])
+        self.assertEqual([p['id'] for p in response.data['results']], [self.products[1].id])
+        self.assertIsNone(response.data['next'])
+
+    def test_listing_query_count_is_constant(self):
+        for i, product in enumerate(self.products):
+            reviewer = User.objects.create_user(username=f'reviewer{i}', password='testpass')
+            ProductReview.objects.create(product=product, user=reviewer, rating=i % 5 + 1, comment='Nice')
+        call_command('rebuild_product_ratings', stdout=StringIO())
+
+        # One query for the page with aggregates, one for the prefetched reviews
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse('product-list'))
+        self.assertEqual(len(response.data['results']), 5)
+        newest = response.data['results'][0]
+        self.assertEqual(newest['vendor'], 'vendor')
+        self.assertEqual(newest['review_count'], 1)
+        self.assertEqual(newest['average_rating'], 5)
+
+    def test_order_by_rating(self):
+        Product.objects.filter(pk=self.products[1].pk).adjust_rating(added=5)
+        Product.objects.filter(pk=self.products[3].pk).adjust_rating(added=3)
+
+        response = self.client.get(reverse('product-list'), {'ordering': 'rating', 'page_size': 2})
+        self.assertEqual(
+            [p['id'] for p in response.data['results']],
+            [self.products[1].id, self.products[3].id]
+        )
+        response = self.client.get(response.data['next'])
+        self.assertEqual(response.data['results'][0]['id'], self.products[4].id)
+
+    def test_summary_view(self):
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('product-list'), {'view': 'summary'})
+        self.assertEqual(set(response.data['results'][0]), {
+            'id', 'name', 'price', 'image_url', 'image_srcset', 'roast_type', 'origin',
+            'average_rating', 'review_count', 'stock', 'is_available'
+        })
+
+        response = self.client.get(
+            reverse('product-detail', args=[self.products[0].id]), {'view': 'summary'}
+        )
+        self.assertNotIn('reviews', response.data)
+
+    def test_sparse_fieldset_skips_reviews(self):
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('product-list'), {'fields': 'id,name,vendor'})
+        self.assertEqual(response.data['results'][0], {
+            'id': self.products[4].id, 'name': 'Product 4', 'vendor': 'vendor'
+        })
+
+    def test_invalid_cursor(self):
+        response = self.client.get(reverse('product-list'), {'cursor': 'not-a-cursor'})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_wrong_typed_cursor(self):
+        def cursor(position):
+            payload = json.dumps({'r': 0, 'p': position}).encode('utf-8')
+            return base64.urlsafe_b64encode(payload).decode('ascii')
+
+        newest = self.client.get(reverse('product-list'), {'page_size': 2})
+        for params in [
+            {'cursor': cursor(['garbage', 1])},
+            {'cursor': cursor([{'a': 1}, 1])},
+            {'cursor': cursor([None, 1])},
+            {'cursor': cursor(['2026-01-01T00:00:00+00:00', 'x'])},
+            {'cursor': cursor(['high', 1]), 'ordering': 'rating'},
+            {'cursor': cursor(['high', 1]), 'q': 'product'},
+            # A valid cursor reused under another ordering
+            {'cursor': parse_qs(urlparse(newest.data['next']).query)['cursor'][0], 'ordering': 'rating'},
+        ]:
+            with self.subTest(params=params):
+                response = self.client.get(reverse('product-list'), params)
+                self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class ProductBatchTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        vendor_profile = VendorProfile.objects.create(
+            user=User.objects.create_user(username='vendor', password='testpass')
+        )
+        self.products = [
+            Product.objects.create(
+                vendor=vendor_profile,
+                name=f'Product {i}',
+                description='Test Description',
+                price=Decimal('10.00'),
+                stock=10,
+                roast_type='MEDIUM',
+                origin='Test Origin',
+                image='test_image.jpg'
+            )
+            for i in range(4)
+        ]
+
+    def test_batch_lookup(self):
+        wanted = [self.products[3].id, 9999, self.products[0].id, self.products[3].id]
+        url = reverse('product-batch')
+        with self.assertNumQueries(1):
+            response = self.client.get(url, {'ids': ','.join(map(str, wanted)), 'view': 'summary'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([p['id'] for p in response.data['results']], [self.products[3].id, self.products[0].id])
+        self.assertEqual(response.data['missing'], [9999])
+
+    def test_invalid_ids(self):
+        url = reverse('product-batch')
+        self.assertEqual(self.client.get(url, {'ids': '1,x'}).status_code, status.HTTP_400_BAD_REQUEST)
+        for too_large in (2 ** 63, 999999999999999999999, -2 ** 63 - 1):
+            response = self.client.get(url, {'ids': f'1,{too_large}'})
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertIn('ids', response.data)
+        self.assertEqual(self.client.get(url, {'ids': str(2 ** 63 - 1)}).data['missing'], [2 ** 63 - 1])
+        too_many = ','.join(str(i) for i in range(101))
+        self.assertEqual(self.client.get(url, {'ids': too_many}).status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class ProductSearchTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        vendor_user = User.objects.create_user(email='vendor@test.com', username='vendor', password='testpass')
+        vendor_profile = VendorProfile.objects.create(user=vendor_user)
+        self.products = {
+            name: Product.objects.create(
+                vendor=vendor_profile,
+                name=name,
+                description=description,
+                price=Decimal('10.00'),
+                stock=10,
+                roast_type='MEDIUM',
+                origin=origin,
+                image='test_image.jpg'
+            )
+            for name, description, origin in [
+                ('Kenya Peaberry', 'Bright coffee with blackcurrant notes', 'Kenya'),
+                ('House Espresso', 'Chocolatey blend, great with milk', 'Brazil'),
+                ('Yirgacheffe', 'Floral and citrus, washed process', 'Ethiopia'),
+                ('Espresso Reserve', 'Our darkest espresso roast', 'Colombia'),
+            ]
+        }
+
+    def search(self, **params):
+        response = self.client.get(reverse('product-list'), params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response
+
+    def test_matches_name_description_and_origin(self):
+        response = self.search(q='kenya')
+        self.assertEqual([p['name'] for p in response.data['results']], ['Kenya Peaberry'])
+        response = self.search(q='floral')
+        self.assertEqual([p['name'] for p in response.data['results']], ['Yirgacheffe'])
+        response = self.search(q='ethiopia')
+        self.assertEqual([p['name'] for p in response.data['results']], ['Yirgacheffe'])
+
+    def test_stemming_and_ranking(self):
+        # Two espresso mentions outrank one; "blends" stems to "blend"
+        response = self.search(q='espressos')
+        self.assertEqual(
+            [p['name'] for p in response.data['results']],
+            ['Espresso Reserve', 'House Espresso']
+        )
+        response = self.search(q='chocolatey blends')
+        self.assertEqual(response.data['results'][0]['name'], 'House Espresso')
+
+    def test_paginates_by_score(self):
+        response = self.search(q='espresso', page_size=1)
+        self.assertEqual(response.data['results'][0]['name'], 'Espresso Reserve')
+        response = self.client.get(response.data['next'])
+        self.assertEqual([p['name'] for p in response.data['results']], ['House Espresso'])
+        self.assertIsNone(response.data['next'])
+
+    def test_index_follows_updates_and_deletes(self):
+        product = self.products['Yirgacheffe']
+        product.description = 'Jasmine and bergamot'
+        product.save()
+        self.assertEqual(self.search(q='floral').data['results'], [])
+        self.assertEqual(len(self.search(q='jasmine').data['results']), 1)
+
+        product.delete()
+        self.assertEqual(self.search(q='jasmine').data['results'], [])
+
+    def test_no_terms(self):
+        self.assertEqual(self.search(q='the and').data['results'], [])
+        self.assertEqual(self.search(q='decaf').data['results'], [])
+
+
+class ProductResponseCacheTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.vendors = [
+            VendorProfile.objects.create(
+                user=User.objects.create_user(username=f'vendor{i}', password='testpass')
+            )
+            for i in range(2)
+        ]
+        self.product = self.create_product(self.vendors[0], 'Kenya AA')
+
+    def create_product(self, vendor, name):
+        return Product.objects.create(
+            vendor=vendor,
+            name=name,
+            description='Test Description',
+            price=Decimal('10.00'),
+            stock=10,
+            roast_type='LIGHT',
+            origin='Kenya',
+            image='test_image.jpg'
+        )
+
+    def test_anonymous_reads_are_cached(self):
+        url = reverse('product-list')
+        response = self.client.get(url, {'page_size': 5, 'view': 'summary'})
+        self.assertEqual(response['X-Cache'], 'MISS')
+        # Parameter order does not matter
+        with self.assertNumQueries(0):
+            response = self.client.get(url + '?view=summary&page_size=5')
+        self.assertEqual(response['X-Cache'], 'HIT')
+        self.assertEqual(response.data['results'][0]['name'], 'Kenya AA')
+
+        detail_url = reverse('product-detail', args=[self.product.id])
+        self.client.get(detail_url)
+        # Only the ETag lookup reaches the database
+        with self.assertNumQueries(1):
+            self.assertEqual(self.client.get(detail_url)['X-Cache'], 'HIT')
+
+        self.assertEqual(get_response_cache_stats(), {'hits': 2, 'misses': 2})
+
+    def test_versions_are_shared(self):
+        url = reverse('product-list')
+        self.client.get(url)
+        self.assertEqual(self.client.get(url)['X-Cache'], 'HIT')
+        # Another process's write only reaches this one through the shared alias
+        caches['shared'].incr(VERSION_KEY)
+        self.assertEqual(self.client.get(url)['X-Cache'], 'MISS')
+
+    def test_writes_bump_the_version(self):
+        url = reverse('product-list')
+        self.client.get(url)
+        self.product.name = 'Kenya AB'
+        self.product.save()
+        response = self.client.get(url)
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.data['results'][0]['name'], 'Kenya AB')
+
+        reviewer = User.objects.create_user(username='reviewer', password='testpass')
+        ProductReview.objects.create(product=self.product, user=reviewer, rating=5, comment='Nice')
+        self.assertEqual(self.client.get(url)['X-Cache'], 'MISS')
+
+    def test_vendor_listing_ignores_other_vendors(self):
+        url = reverse('product-list')
+        self.client.get(url, {'vendor': self.vendors[0].id})
+        self.create_product(self.vendors[1], 'Other')
+        response = self.client.get(url, {'vendor': self.vendors[0].id})
+        self.assertEqual(response['X-Cache'], 'HIT')
+        self.assertEqual(self.client.get(url)['X-Cache'], 'MISS')
+
+        self.create_product(self.vendors[0], 'Second')
+        response = self.client.get(url, {'vendor': self.vendors[0].id})
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(len(response.data['results']), 2)
+
+    def test_authenticated_reads_skip_the_cache(self):
+        self.client.force_authenticate(user=self.vendors[0].user)
+        response = self.client.get(reverse('product-list'))
+        self.assertNotIn('X-Cache', response)
+
+
+class ProductConditionalGetTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        vendor_user = User.objects.create_user(username='vendor', password='testpass')
+        self.vendor_profile = VendorProfile.objects.create(user=vendor_user)
+        self.product = Product.objects.create(
+            vendor=self.vendor_profile,
+            name='Test Product',
+            description='Test Description',
+            price=Decimal('19.99'),
+            stock=10,
+            roast_type='LIGHT',
+            origin='Test Origin',
+            image='test_image.jpg'
+        )
+        self.url = reverse('product-detail', args=[self.product.id])
+
+    def test_not_modified(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn('no-cache', response['Cache-Control'])
+
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        response = self.client.get(self.url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_representation_and_writes_change_the_etag(self):
+        etag = self.client.get(self.url)['ETag']
+        self.assertNotEqual(self.client.get(self.url, {'view': 'summary'})['ETag'], etag)
+
+        reviewer = User.objects.create_user(username='reviewer', password='testpass')
+        self.client.force_authenticate(user=reviewer)
+        self.client.post(reverse('review-list', args=[self.product.id]), {'rating': 5, 'comment': 'Nice'})
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['review_count'], 1)
+        self.assertEqual(response.data['rating_histogram'], {'1': 0, '2': 0, '3': 0, '4': 0, '5': 1})
+
+    def test_missing_product(self):
+        response = self.client.get(reverse('product-detail', args=[self.product.id + 1]))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertNotIn('ETag', response)
+
+
+class ProductFacetsTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.vendor = VendorProfile.objects.create(
+            user=User.objects.create_user(username='vendor', password='testpass'),
+            business_name='Zuko Roasters'
+        )
+        self.beans, self.pods = Category.objects.create(name='Beans'), Category.objects.create(name='Pods')
+        self.products = [
+            Product.objects.create(
+                vendor=self.vendor,
+                category=category,
+                name=f'Product {i}',
+                description='Test Description',
+                price=Decimal('10.00'),
+                stock=stock,
+                roast_type=roast,
+                origin=origin,
+                image='test_image.jpg'
+            )
+            for i, (category, roast, origin, stock) in enumerate([
+                (self.beans, 'LIGHT', 'Kenya', 5),
+                (self.beans, 'DARK', 'Kenya', 5),
+                (self.pods, 'DARK', 'Brazil', 5),
+                (self.pods, 'DARK', 'Brazil', 0),
+            ])
+        ]
+
+    def facets(self, **params):
+        response = self.client.get(reverse('product-facets'), params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return {
+            name: {row['label']: row['count'] for row in rows}
+            for name, rows in response.data.items()
+        }
+
+    def test_counts_in_stock_products(self):
+        self.assertEqual(self.facets(), {
+            'category': {'Beans': 2, 'Pods': 1},
+            'roast_type': {'Dark': 2, 'Light': 1},
+            'origin': {'Kenya': 2, 'Brazil': 1},
+            'vendor': {'Zuko Roasters': 3},
+        })
+
+    def test_filters_skip_their_own_facet(self):
+        facets = self.facets(roast='DARK')
+        self.assertEqual(facets['roast_type'], {'Dark': 2, 'Light': 1})
+        self.assertEqual(facets['category'], {'Beans': 1, 'Pods': 1})
+        self.assertEqual(facets['origin'], {'Kenya': 1, 'Brazil': 1})
+
+        facets = self.facets(q='kenya')
+        self.assertEqual(facets['category'], {'Beans': 2})
+
+    def test_invalid_id_filters(self):
+        for params in ({'category': 'abc'}, {'vendor': '1.5'}, {'vendor': '9' * 21}):
+            for url in (reverse('product-facets'), reverse('product-list')):
+                response = self.client.get(url, params)
+                self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+                self.assertIn(next(iter(params)), response.data)
+        self.assertEqual(self.facets(category=self.beans.id)['origin'], {'Kenya': 2})
+
+    def test_counts_follow_writes(self):
+        self.facets()
+        with self.assertNumQueries(0):
+            self.facets()
+        product = self.products[0]
+        product.roast_type = 'DARK'
+        product.save()
+        self.products[3].stock = 2
+        self.products[3].save()
+        self.assertEqual(self.facets()['roast_type'], {'Dark': 4})
+
+        self.products[1].delete()
+        self.pods.delete()
+        facets = self.facets()
+        self.assertEqual(facets['roast_type'], {'Dark': 3})
+        self.assertEqual(facets['category'], {'Beans': 1})
+
+
+class ProductBulkImportTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        vendor_user = User.objects.create_user(username='vendor', password='testpass')
+        self.vendor = VendorProfile.objects.create(user=vendor_user, business_name='Zuko Roasters')
+        self.category = Category.objects.create(name='Beans')
+        self.existing = Product.objects.create(
+            vendor=self.vendor,
+            sku='KEN-1',
+            name='Kenya AA',
+            description='Blackcurrant',
+            price=Decimal('12.00'),
+            stock=3,
+            roast_type='LIGHT',
+            origin='Kenya',
+            image='test_image.jpg'
+        )
+        self.client.force_authenticate(user=vendor_user)
+
+    def post(self, body, content_type):
+        return self.client.generic('POST', reverse('product-bulk'), body, content_type=content_type)
+
+    def test_csv_upsert_with_error_report(self):
+        body = '\n'.join([
+            'sku,name,description,price,stock,roast_type,origin,category',
+            f'KEN-1,,,13.50,7,,,{self.category.id}',
+            'BRA-1,Brazil Santos,Nutty,9.00,10,DARK,Brazil,',
+            'BRA-2,Brazil Cerrado,,not-a-price,1,DARK,Brazil,',
+            'COL-1,Colombia,,8.00,1,BURNT,Colombia,',
+            'ETH-1,Ethiopia,,8.00,1,LIGHT,Ethiopia,999',
+        ])
+        response = self.post(body, 'text/csv')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            {key: response.data[key] for key in ('rows', 'created', 'updated', 'error_count')},
+            {'rows': 5, 'created': 1, 'updated': 1, 'error_count': 3}
+        )
+        self.assertEqual([error['row'] for error in response.data['errors']], [3, 4, 5])
+        self.assertIn('price', response.data['errors'][0]['errors'])
+        self.assertIn('roast_type', response.data['errors'][1]['errors'])
+        self.assertIn('category', response.data['errors'][2]['errors'])
+
+        self.existing.refresh_from_db()
+        self.assertEqual((self.existing.price, self.existing.stock), (Decimal('13.50'), 7))
+        self.assertEqual((self.existing.name, self.existing.category), ('Kenya AA', self.category))
+        created = Product.objects.get(vendor=self.vendor, sku='BRA-1')
+        self.assertEqual((created.name, created.roast_type), ('Brazil Santos', 'DARK'))
+
+        # The search index and facet counts follow the bulk writes
+        response = self.client.get(reverse('product-list'), {'q': 'santos'})
+        self.assertEqual([p['id'] for p in response.data['results']], [created.id])
+        response = self.client.get(reverse('product-facets'))
+        self.assertEqual({row['value']: row['count'] for row in response.data['origin']}, {'Kenya': 1, 'Brazil': 1})
+
+    def test_ndjson_in_chunks(self):
+        lines = [
+            '{"sku": "SKU-%d", "name": "Blend %d", "price": "5.00", "roast_type": "MEDIUM", "origin": "Peru"}' % (i, i)
+            for i in range(1200)
+        ]
+        lines[10] = 'not json'
+        lines.append('{"sku": "SKU-0", "stock": 4}')
+        response = self.post('\n'.join(lines), 'application/x-ndjson')
+        self.assertEqual(response.data['rows'], 1201)
+        self.assertEqual(response.data['created'], 1199)
+        self.assertEqual(response.data['updated'], 1)
+        self.assertEqual(response.data['errors'], [
+            {'row': 11, 'sku': None, 'errors': {'non_field_errors': ['Expected a JSON object.']}}
+        ])
+        self.assertEqual(Product.objects.get(sku='SKU-0').stock, 4)
+
+    def test_out_of_range_values_are_row_errors(self):
+        body = '\n'.join([
+            'sku,name,price,stock,roast_type,origin,category',
+            f'BIG-1,Big Stock,5.00,{2 ** 31},DARK,Peru,',
+            f'BIG-2,Big Category,5.00,1,DARK,Peru,{2 ** 64}',
+            'OK-1,Fine,5.00,1,DARK,Peru,',
+        ])
+        response = self.post(body, 'text/csv')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual((response.data['created'], response.data['error_count']), (1, 2))
+        self.assertIn('stock', response.data['errors'][0]['errors'])
+        self.assertIn('category', response.data['errors'][1]['errors'])
+
+    def test_requires_vendor_and_known_format(self):
+        self.assertEqual(self.post('{}', 'application/json').status_code, status.HTTP_415_UNSUPPORTED_MEDIA_TYPE)
+        self.client.force_authenticate(user=User.objects.create_user(username='customer', password='testpass'))
+        self.assertEqual(self.post('sku\n', 'text/csv').status_code, status.HTTP_403_FORBIDDEN)
+
+
+class ProductImageUploadTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        settings = override_settings(
+            MEDIA_ROOT=media_root,
+            PRODUCT_IMAGE_STAGING_ROOT=os.path.join(media_root, 'image_staging'),
+            PRODUCT_IMAGE_STORAGE='apps.products.images.LocalImageStorage',
+            PRODUCT_IMAGE_WORKERS=0,
+            PRODUCT_IMAGE_MAX_SIZE=100,
+            PRODUCT_IMAGE_VARIANTS={'thumbnail': 20, 'medium': 50},
+            PRODUCT_IMAGE_LISTING_VARIANT='medium',
+        )
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.media_root = media_root
+        self.client = APIClient()
+        vendor_user = User.objects.create_user(username='vendor', password='testpass')
+        self.vendor = VendorProfile.objects.create(user=vendor_user)
+        self.category = Category.objects.create(name='Beans')
+        self.client.force_authenticate(user=vendor_user)
+
+    def make_upload(self, name='bag.png', size=(400, 200)):
+        buffer = BytesIO()
+        Image.new('RGBA', size, (120, 80, 40, 128)).save(buffer, 'PNG')
+        return SimpleUploadedFile(name, buffer.getvalue(), content_type='image/png')
+
+    def product_data(self, **extra):
+        return dict({
+            'category': self.category.id,
+            'name': 'Kenya AA',
+            'description': 'Blackcurrant',
+            'price': '12.00',
+            'stock': 3,
+            'roast_type': 'LIGHT',
+            'origin': 'Kenya',
+            'is_available': True,
+        }, **extra)
+
+    def test_upload_is_processed_after_commit(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            response = self.client.post(
+                reverse('product-list'), self.product_data(image=self.make_upload()), format='multipart'
+            )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['image_status'], Product.IMAGE_PROCESSING)
+        self.assertIsNone(response.data['image_url'])
+
+        for callback in callbacks:
+            callback()
+        product = Product.objects.get(pk=response.data['id'])
+        self.assertEqual(product.image_status, Product.IMAGE_READY)
+        self.assertEqual(product.pending_image, '')
+        with Image.open(os.path.join(self.media_root, get_image_name(product.image))) as image:
+            self.assertEqual((image.format, image.size), ('JPEG', (100, 50)))
+        self.assertEqual(os.listdir(os.path.join(self.media_root, 'image_staging')), [])
+
+        # Every variant is stored and its URL kept on the product
+        name = get_image_name(product.image)
+        self.assertEqual(product.image_variants['original'], {'url': '/media/' + name, 'width': 100, 'height': 50})
+        self.assertEqual(
+            {variant: (data['width'], data['height']) for variant, data in product.image_variants.items()},
+            {'original': (100, 50), 'medium': (50, 25), 'thumbnail': (20, 10)}
+        )
+        self.assertEqual(len(os.listdir(os.path.join(self.media_root, 'product_images'))), 3)
+
+        response = self.client.get(reverse('product-detail', args=[product.id]))
+        self.assertEqual(response.data['image_url'], '/media/' + name)
+        thumbnail, medium = product.image_variants['thumbnail']['url'], product.image_variants['medium']['url']
+        self.assertEqual(response.data['image_srcset'], f'{thumbnail} 20w, {medium} 50w')
+        response = self.client.get(reverse('product-list'), {'view': 'summary'})
+        self.assertEqual(response.data['results'][0]['image_url'], medium)
+
+    def test_image_change_drops_variants(self):
+        product = Product.objects.create(
+            vendor=self.vendor, image='old.jpg',
+            image_variants={'original': {'url': '/media/old.jpg', 'width': 100, 'height': 100}},
+            **{key: value for key, value in self.product_data().items() if key != 'category'}
+        )
+        response = self.client.put(
+            reverse('product-detail', args=[product.id]), self.product_data(image='new.jpg'), format='json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['image_variants'], {})
+        self.assertEqual(response.data['image_url'], '/media/new.jpg')
+
+    def test_replacement_keeps_current_image_until_ready(self):
+        product = Product.objects.create(vendor=self.vendor, image='old.jpg', **{
+            key: value for key, value in self.product_data().items() if key != 'category'
+        })
+        url = reverse('product-detail', args=[product.id])
+        with self.captureOnCommitCallbacks() as callbacks:
+            first = self.product_data(image=self.make_upload())
+            self.client.put(url, first, format='multipart')
+            response = self.client.put(url, self.product_data(image=self.make_upload()), format='multipart')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['image_status'], Product.IMAGE_PROCESSING)
+        self.assertEqual(response.data['image_url'], '/media/old.jpg')
+
+        # Only the latest upload is published; the superseded job is a no-op
+        product.refresh_from_db()
+        for callback in callbacks:
+            callback()
+        latest = product.pending_image
+        self.assertEqual(Product.objects.get(pk=product.pk).image_status, Product.IMAGE_READY)
+        self.assertEqual(len(os.listdir(os.path.join(self.media_root, 'product_images'))), 3)
+        self.assertFalse(os.path.exists(os.path.join(self.media_root, 'image_staging', latest)))
+
+    def test_invalid_image(self):
+        upload = SimpleUploadedFile('bag.png', b'not an image', content_type='image/png')
+        response = self.client.post(reverse('product-list'), self.product_data(image=upload), format='multipart')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('image', response.data)
+        self.assertFalse(Product.objects.exists())
+
+    def test_process_pending_images_command(self):
+        product = Product.objects.create(
+            vendor=self.vendor, image='', image_status=Product.IMAGE_PROCESSING, pending_image='lost.png',
+            **{key: value for key, value in self.product_data().items() if key != 'category'}
+        )
+        out = StringIO()
+        with self.assertLogs('apps.products.images', 'ERROR'):
+            call_command('process_pending_images', stdout=out)
+        self.assertIn('Processed 1 pending product images', out.getvalue())
+        product.refresh_from_db()
+        self.assertEqual((product.image_status, product.pending_image), (Product.IMAGE_FAILED, ''))
+
+
+class ProductLeaderboardTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        vendor_user = User.objects.create_user(username='vendor', password='testpass')
+        self.vendor = VendorProfile.objects.create(user=vendor_user)
+        self.customer = User.objects.create_user(username='customer', password='testpass')
+        self.beans, self.tools = Category.objects.create(name='Beans'), Category.objects.create(name='Tools')
+        self.kenya, self.brazil, self.grinder = [
+            Product.objects.create(
+                vendor=self.vendor,
+                category=category,
+                name=name,
+                description='Test Description',
+                price=Decimal('10.00'),
+                stock=10,
+                roast_type='MEDIUM',
+                origin='Test Origin',
+                image='test_image.jpg'
+            )
+            for name, category in (('Kenya', self.beans), ('Brazil', self.beans), ('Grinder', self.tools))
+        ]
+
+    def order(self, *lines):
+        with self.captureOnCommitCallbacks(execute=True):
+            order = Order.objects.create(
+                customer=self.customer,
+                total_amount=Decimal('10.00'),
+                shipping_address='123 Test St',
+                phone_number='1234567890'
+            )
+            for product, quantity in lines:
+                OrderItem.objects.create(order=order, product=product, quantity=quantity, price=product.price)
+        return order
+
+    def board(self, board, **params):
+        response = self.client.get(reverse('product-leaderboard', args=[board]), dict(params, fields='id,name'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [row['id'] for row in response.data['results']]
+
+    def test_bestsellers_follow_orders(self):
+        self.order((self.kenya, 1), (self.grinder, 2))
+        order = self.order((self.brazil, 5))
+        self.assertEqual(self.board('bestsellers'), [self.brazil.id, self.grinder.id, self.kenya.id])
+        self.assertEqual(self.board('bestsellers', category=self.beans.id), [self.brazil.id, self.kenya.id])
+        self.assertEqual(self.board('bestsellers', vendor=self.vendor.id)[0], self.brazil.id)
+
+        # Cancelling takes the units back off the board
+        with self.captureOnCommitCallbacks(execute=True):
+            order.status = 'CANCELLED'
+            order.save()
+        self.brazil.refresh_from_db()
+        self.assertEqual(self.brazil.units_sold, 0)
+        self.assertEqual(self.board('bestsellers'), [self.grinder.id, self.kenya.id])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.grinder.is_available = False
+            self.grinder.save()
+        self.assertEqual(self.board('bestsellers'), [self.kenya.id])
+
+        with self.assertNumQueries(1):
+            self.client.get(reverse('product-leaderboard', args=['bestsellers']), {'fields': 'id,name'})
+
+    @override_settings(LEADERBOARD_MIN_REVIEWS=2)
+    def test_top_rated_follow_reviews(self):
+        for i, (product, rating) in enumerate([(self.kenya, 5), (self.kenya, 4), (self.brazil, 5), (self.brazil, 5)]):
+            self.client.force_authenticate(user=User.objects.create_user(username=f'reviewer{i}', password='testpass'))
+            with self.captureOnCommitCallbacks(execute=True):
+                self.client.post(
+                    reverse('review-list', args=[product.id]), {'rating': rating, 'comment': 'Nice'}, format='json'
+                )
+        self.client.force_authenticate(user=None)
+        self.assertEqual(self.board('top_rated'), [self.brazil.id, self.kenya.id])
+
+        call_command('refresh_leaderboards', counters=True, stdout=StringIO())
+        self.assertEqual(self.board('top_rated', category=self.beans.id), [self.brazil.id, self.kenya.id])
+        self.assertEqual(self.board('top_rated', category=self.tools.id), [])
+
+    def test_unknown_board(self):
+        self.assertEqual(self.client.get(reverse('product-leaderboard', args=['newest'])).status_code, 404)
+        response = self.client.get(reverse('product-leaderboard', args=['top_rated']), {'vendor': 'x'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+@override_settings(CHANGE_FEED_LAG=0)
+class ProductChangesTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        vendor_user = User.objects.create_user(username='vendor', password='testpass')
+        self.vendor = VendorProfile.objects.create(user=vendor_user)
+        self.products = [
+            Product.objects.create(
+                vendor=self.vendor,
+                name=f'Product {i}',
+                description='Test Description',
+                price=Decimal('10.00'),
+                stock=10,
+                roast_type='DARK',
+                origin='Kenya',
+                image='test_image.jpg'
+            )
+            for i in range(3)
+        ]
+        self.url = reverse('product-changes')
+
+    def changes(self, cursor=None, **params):
+        if cursor:
+            params['cursor'] = cursor
+        response = self.client.get(self.url, dict(params, view='summary'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data
+
+    def test_sync(self):
+        first = self.changes(page_size=2)
+        self.assertEqual([(c['type'], c['id']) for c in first['results']], [
+            ('created', self.products[0].id), ('created', self.products[1].id)
+        ])
+        self.assertEqual(first['results'][0]['product']['name'], 'Product 0')
+        self.assertTrue(first['has_more'])
+        second = self.changes(first['cursor'], page_size=2)
+        self.assertEqual([c['id'] for c in second['results']], [self.products[2].id])
+        self.assertFalse(second['has_more'])
+
+        # Nothing new: the same cursor comes back
+        self.assertEqual(self.changes(second['cursor'])['cursor'], second['cursor'])
+
+        kept, deleted = self.products[0], self.products[1]
+        kept.price = Decimal('12.00')
+        kept.save()
+        deleted_id = deleted.id
+        deleted.delete()
+        created = Product.objects.create(
+            vendor=self.vendor, name='Product 3', description='', price=Decimal('9.00'),
+            stock=1, roast_type='LIGHT', origin='Peru', image='test_image.jpg'
+        )
+        delta = self.changes(second['cursor'])
+        self.assertEqual([(c['type'], c['id']) for c in delta['results']], [
+            ('updated', kept.id), ('deleted', deleted_id), ('created', created.id)
+        ])
+        self.assertEqual(delta['results'][0]['product']['price'], '12.00')
+        self.assertIsNone(delta['results'][1]['product'])
+
+    def test_lag_and_bad_cursors(self):
+        with override_settings(CHANGE_FEED_LAG=60):
+            self.assertEqual(self.changes()['results'], [])
+
+        response = self.client.get(self.url, {'cursor': 'not-a-cursor'})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        with override_settings(CHANGE_FEED_RETENTION_DAYS=0):
+            cursor = self.changes()['cursor']
+            response = self.client.get(self.url, {'cursor': cursor})
+        self.assertEqual(response.status_code, status.HTTP_410_GONE)
+
+
+class VendorStorefrontTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        vendor_user = User.objects.create_user(username='vendor', password='testpass')
+        self.vendor = VendorProfile.objects.create(
+            user=vendor_user, business_name='Zuko Roasters', business_description='Small batch'
+        )
+        other_user = User.objects.create_user(username='other', password='testpass')
+        other = VendorProfile.objects.create(user=other_user, business_name='Other')
+        self.products = [
+            Product.objects.create(
+                vendor=vendor,
+                name=f'Product {i}',
+                description='Test Description',
+                price=Decimal('10.00'),
+                stock=10,
+                roast_type='DARK',
+                origin='Kenya',
+                image='test_image.jpg',
+                is_available=i != 3
+            )
+            for i, vendor in enumerate([self.vendor, self.vendor, self.vendor, self.vendor, other])
+        ]
+        Product.objects.filter(pk=self.products[0].pk).adjust_rating(added=5)
+        Product.objects.filter(pk=self.products[0].pk).adjust_rating(added=4)
+        Product.objects.filter(pk=self.products[1].pk).adjust_rating(added=3)
+        self.url = reverse('vendor-storefront', args=[self.vendor.id])
+
+    def test_storefront(self):
+        with self.assertNumQueries(2):
+            response = self.client.get(self.url, {'page_size': 2})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.data['vendor']['business_name'], 'Zuko Roasters')
+        self.assertEqual(response.data['rating'], {'average': 4.0, 'review_count': 3})
+        self.assertEqual(response.data['product_count'], 3)
+        self.assertEqual(
+            [p['id'] for p in response.data['products']['results']], [self.products[2].id, self.products[1].id]
+        )
+        self.assertIsNotNone(response.data['products']['next'])
+
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(self.url, {'page_size': 2})['X-Cache'], 'HIT')
+
+    def test_invalidation(self):
+        self.client.get(self.url)
+        # Writes by another vendor keep the entry
+        self.products[4].save()
+        self.assertEqual(self.client.get(self.url)['X-Cache'], 'HIT')
+
+        self.vendor.business_name = 'Zuko Coffee'
+        self.vendor.save()
+        response = self.client.get(self.url)
+        self.assertEqual((response['X-Cache'], response.data['vendor']['business_name']), ('MISS', 'Zuko Coffee'))
+
+        self.products[0].is_available = False
+        self.products[0].save()
+        response = self.client.get(self.url)
+        self.assertEqual((response['X-Cache'], response.data['product_count']), ('MISS', 2))
+
+    def test_unknown_vendor(self):
+        response = self.client.get(reverse('vendor-storefront', args=[self.vendor.id + 100]))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
 
 
 class ProductReviewViewsTestCase(TestCase):
     def setUp(self):
+        cache.clear()
         self.client = APIClient()
         
         # Create users
@@ -98,3 +1007,74 @@ class ProductReviewViewsTestCase(TestCase):
         response = self.client.post(url, review_data)
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
 
+
+    def test_review_counters_follow_create_update_delete(self):
+        url = reverse('review-list', kwargs={'product_pk': self.product.id})
+        self.client.force_authenticate(user=self.review_user)
+        response = self.client.post(url, {'rating': 4, 'comment': 'Great product!'})
+        self.product.refresh_from_db()
+        self.assertEqual((self.product.review_count, self.product.rating_sum), (1, 4))
+        self.assertEqual(self.product.average_rating, 4)
+        self.assertEqual(self.product.rating_4_count, 1)
+
+        detail_url = reverse('review-detail', kwargs={
+            'product_pk': self.product.id, 'review_pk': response.data['id']
+        })
+        self.client.put(detail_url, {'rating': 2, 'comment': 'Changed my mind'})
+        self.product.refresh_from_db()
+        self.assertEqual((self.product.review_count, self.product.rating_sum), (1, 2))
+        self.assertEqual(self.product.average_rating, 2)
+        self.assertEqual((self.product.rating_2_count, self.product.rating_4_count), (1, 0))
+
+        self.client.delete(detail_url)
+        self.product.refresh_from_db()
+        self.assertEqual((self.product.review_count, self.product.rating_sum), (0, 0))
+        self.assertEqual(self.product.average_rating, 0)
+        self.assertEqual(self.product.rating_2_count, 0)
+
+    def test_legacy_rating_out_of_range_is_clamped(self):
+        migration = import_module('apps.products.migrations.0015_product_rating_histogram')
+        review = ProductReview.objects.create(product=self.product, user=self.review_user, rating=4)
+        ProductReview.objects.filter(pk=review.pk).update(rating=9)
+        migration.clamp_ratings(django_apps, None)
+        migration.backfill_histogram(django_apps, None)
+        self.product.refresh_from_db()
+        self.assertEqual((self.product.review_count, self.product.rating_sum), (1, 5))
+        self.assertEqual((self.product.average_rating, self.product.rating_5_count), (5, 1))
+
+        self.client.force_authenticate(user=self.review_user)
+        response = self.client.delete(reverse('review-detail', kwargs={
+            'product_pk': self.product.id, 'review_pk': review.id
+        }))
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.product.refresh_from_db()
+        self.assertEqual((self.product.review_count, self.product.rating_5_count), (0, 0))
+
+    def test_review_rating_out_of_range(self):
+        url = reverse('review-list', kwargs={'product_pk': self.product.id})
+        self.client.force_authenticate(user=self.review_user)
+        response = self.client.post(url, {'rating': 6, 'comment': 'Off the scale'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('rating', response.data)
+
+    def test_review_list_pages_newest_first(self):
+        reviews = [
+            ProductReview.objects.create(
+                product=self.product,
+                user=User.objects.create_user(username=f'user{i}', password='testpass'),
+                rating=i % 2 + 4,
+                comment=f'Review {i}'
+            )
+            for i in range(5)
+        ]
+        url = reverse('review-list', kwargs={'product_pk': self.product.id})
+        with self.assertNumQueries(1):
+            response = self.client.get(url, {'page_size': 2})
+        self.assertEqual([r['id'] for r in response.data['results']], [reviews[4].id, reviews[3].id])
+        self.assertEqual(response.data['results'][0]['user'], 'user4')
+        response = self.client.get(response.data['next'])
+        self.assertEqual([r['id'] for r in response.data['results']], [reviews[2].id, reviews[1].id])
+
+        response = self.client.get(url, {'rating': 5})
+        self.assertEqual([r['id'] for r in response.data['results']], [reviews[3].id, reviews[1].id])
+        self.assertEqual(self.client.get(url, {'rating': 'five'}).status_code, status.HTTP_400_BAD_REQUEST)
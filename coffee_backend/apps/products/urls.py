@@ -4,8 +4,16 @@ from . import views
 urlpatterns = [
     # Product URLs
     path('products/', views.ProductListCreateView.as_view(), name='product-list'),
+    path('products/batch/', views.ProductBatchView.as_view(), name='product-batch'),
+    path('products/bulk/', views.ProductBulkImportView.as_view(), name='product-bulk'),
+    path('products/facets/', views.ProductFacetsView.as_view(), name='product-facets'),
+    path('products/changes/', views.ProductChangesView.as_view(), name='product-changes'),
+    path('products/leaderboards/<str:board>/', views.ProductLeaderboardView.as_view(), name='product-leaderboard'),
     path('products/<int:pk>/', views.ProductDetailView.as_view(), name='product-detail'),
+    path('products/<int:pk>/related/', views.RelatedProductsView.as_view(), name='product-related'),
     
+    path('vendors/<int:pk>/', views.VendorStorefrontView.as_view(), name='vendor-storefront'),
+
     # Review URLs
     path('products/<int:product_pk>/reviews/', views.ReviewListCreateView.as_view(), name='review-list'),
     path('products/<int:product_pk>/reviews/<int:review_pk>/', views.ReviewDetailView.as_view(), name='review-detail'),
@@ -1,9 +1,31 @@
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status, permissions
+from django.http import Http404
 from django.shortcuts import get_object_or_404
-from .models import Product, ProductReview
-from .serializers import ProductSerializer, ProductReviewSerializer
+from django.db import transaction
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import Coalesce
+from ..accounts.models import VendorProfile
+from ..accounts.serializers import VendorStorefrontSerializer
+from .models import Product, ProductReview, parse_id
+from .serializers import (
+    ProductSerializer, ProductSummarySerializer, ProductReviewSerializer, get_requested_fields
+)
+from .pagination import KeysetPagination
+from .search import search_products
+from .cache import cache_catalog_response
+from .conditional import conditional_get
+from .facets import get_facets
+from .bulk import get_row_parser, import_products
+from .images import enqueue_image, is_valid_image, stage_upload
+from .recommendations import get_related_product_ids
+from .leaderboards import BOARDS, get_leaderboard
+from .changes import (
+    DELETE, UPSERT, decode_change_cursor, encode_change_cursor, get_changes, get_cursor_horizon
+)
+
+INVALID_IMAGE_MESSAGE = 'Upload a valid image. The file you uploaded was either not an image or a corrupted image.'
 
 class IsVendorOrReadOnly(permissions.BasePermission):
     def has_permission(self, request, view):
@@ -22,56 +44,245 @@ class IsReviewOwnerOrReadOnly(permissions.BasePermission):
             return True
         return obj.user == request.user
 
+def get_product_read_path(request):
+    # ?view=summary and ?fields= let catalog pages skip reviews and vendor joins
+    if request.query_params.get('view') == 'summary':
+        return Product.objects.all(), ProductSummarySerializer
+    fields = get_requested_fields(request)
+    include_reviews = fields is None or 'reviews' in fields
+    return Product.objects.for_listing(include_reviews=include_reviews), ProductSerializer
+
+def get_product_validators(request, pk):
+    # One indexed lookup instead of loading and serializing the product
+    updated_at = Product.objects.filter(pk=pk).values_list('updated_at', flat=True).first()
+    if updated_at is None:
+        return None
+    return updated_at.isoformat(), updated_at
+
 # Product Views
 class ProductListCreateView(APIView):
     permission_classes = [permissions.IsAuthenticatedOrReadOnly, IsVendorOrReadOnly]
+    # ?q= searches rank by relevance unless another ordering is requested
+    orderings = {
+        'newest': ('-created_at', '-id'),
+        'rating': ('-average_rating', '-id'),
+    }
 
+    @cache_catalog_response
     def get(self, request):
-        queryset = Product.objects.all()
+        queryset, serializer_class = get_product_read_path(request)
         if not request.user.is_staff:
             queryset = queryset.filter(is_available=True)
         
         # Apply filters
-        category = request.query_params.get('category')
-        if category:
-            queryset = queryset.filter(category__id=category)
-            
-        vendor = request.query_params.get('vendor')
-        if vendor:
-            queryset = queryset.filter(vendor__id=vendor)
-            
-        roast = request.query_params.get('roast')
-        if roast:
-            queryset = queryset.filter(roast_type=roast)
-        
-        serializer = ProductSerializer(queryset, many=True, context={'request': request})
-        return Response(serializer.data)
+        queryset = queryset.filter_catalog(request.query_params)
+
+        paginator = KeysetPagination()
+        query = request.query_params.get('q', '').strip()
+        if query:
+            queryset = search_products(queryset, query)
+            paginator.ordering = ('-search_score', '-id')
+
+        ordering = request.query_params.get('ordering')
+        if ordering in self.orderings:
+            paginator.ordering = self.orderings[ordering]
+
+        page = paginator.paginate_queryset(queryset, request, view=self)
+        serializer = serializer_class(page, many=True, context={'request': request})
+        return paginator.get_paginated_response(serializer.data)
 
     def post(self, request):
         # Create a mutable copy of the data
         data = request.data.copy()
 
-        # Handle image upload
-        if 'image' in request.FILES:
-            # The cloudinary field will handle the upload automatically
-            # No need for manual upload as the CloudinaryField handles it
-            pass
+        # Handle image upload: the file is only checked and staged here, the
+        # resize and upload to storage run in the image workers
+        upload = request.FILES.get('image')
+        if upload is not None:
+            if not is_valid_image(upload):
+                return Response({'image': [INVALID_IMAGE_MESSAGE]}, status=status.HTTP_400_BAD_REQUEST)
+            data.pop('image', None)
 
-        serializer = ProductSerializer(data=data, context={'request': request})
+        serializer = ProductSerializer(data=data, context={'request': request, 'image_upload': upload is not None})
         if serializer.is_valid():
-            serializer.save(vendor=request.user.vendor_profile)
+            if upload is None:
+                serializer.save(vendor=request.user.vendor_profile)
+            else:
+                staged_name = stage_upload(upload)
+                product = serializer.save(
+                    vendor=request.user.vendor_profile,
+                    image='',
+                    image_status=Product.IMAGE_PROCESSING,
+                    pending_image=staged_name,
+                )
+                enqueue_image(product, staged_name)
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+class ProductBatchView(APIView):
+    permission_classes = [permissions.AllowAny]
+    max_ids = 100
+
+    @cache_catalog_response
+    def get(self, request):
+        # ?ids=1,2,3 in one IN query, returned in request order
+        try:
+            ids = [parse_id(value) for value in request.query_params.get('ids', '').split(',') if value.strip()]
+        except ValueError:
+            return Response({'ids': ['Expected a comma separated list of ids.']}, status=status.HTTP_400_BAD_REQUEST)
+        ids = list(dict.fromkeys(ids))
+        if len(ids) > self.max_ids:
+            return Response(
+                {'ids': [f'At most {self.max_ids} ids per request.']}, status=status.HTTP_400_BAD_REQUEST
+            )
+        queryset, serializer_class = get_product_read_path(request)
+        products = queryset.in_bulk(ids)
+        found = [products[pk] for pk in ids if pk in products]
+        serializer = serializer_class(found, many=True, context={'request': request})
+        return Response({
+            'results': serializer.data,
+            'missing': [pk for pk in ids if pk not in products],
+        })
+
+class ProductBulkImportView(APIView):
+    permission_classes = [permissions.IsAuthenticated, IsVendorOrReadOnly]
+
+    def post(self, request):
+        # CSV or NDJSON upsert keyed on SKU. The body is read line by line from
+        # the raw stream instead of through request.data, so it is never held
+        # in memory as a whole.
+        parse_rows = get_row_parser(request.content_type)
+        stream = request.stream
+        lines = iter(stream.readline, b'') if stream is not None else iter(())
+        report = import_products(request.user.vendor_profile, parse_rows(lines))
+        return Response(report.as_dict())
+
+class ProductFacetsView(APIView):
+    permission_classes = [permissions.AllowAny]
+
+    def get(self, request):
+        # Counts per category, roast, origin and vendor for the listing filters
+        return Response(get_facets(request.query_params))
+
+class VendorStorefrontView(APIView):
+    permission_classes = [permissions.AllowAny]
+    cache_vendor_kwarg = 'pk'
+
+    @cache_catalog_response
+    def get(self, request, pk):
+        # Profile with its review totals in one query, then one product page
+        vendor = get_object_or_404(
+            VendorProfile.objects.annotate(
+                review_count=Coalesce(Sum('products__review_count'), 0),
+                rating_sum=Coalesce(Sum('products__rating_sum'), 0),
+                product_count=Count('products', filter=Q(products__is_available=True)),
+            ),
+            pk=pk,
+        )
+        paginator = KeysetPagination()
+        ordering = request.query_params.get('ordering')
+        if ordering in ProductListCreateView.orderings:
+            paginator.ordering = ProductListCreateView.orderings[ordering]
+        page = paginator.paginate_queryset(
+            Product.objects.filter(vendor=vendor, is_available=True), request, view=self
+        )
+        products = ProductSummarySerializer(page, many=True, context={'request': request})
+        return Response({
+            'vendor': VendorStorefrontSerializer(vendor, context={'request': request}).data,
+            'rating': {
+                'average': round(vendor.rating_sum / vendor.review_count, 2) if vendor.review_count else None,
+                'review_count': vendor.review_count,
+            },
+            'product_count': vendor.product_count,
+            'products': paginator.get_paginated_response(products.data).data,
+        })
+
+class ProductChangesView(APIView):
+    permission_classes = [permissions.AllowAny]
+
+    def get(self, request):
+        # Products created, updated or deleted since ?cursor=, oldest first
+        token = request.query_params.get('cursor')
+        position = decode_change_cursor(token) if token else None
+        if position is not None and position[0] < get_cursor_horizon():
+            return Response(
+                {'detail': 'Cursor expired, sync again from the start.'}, status=status.HTTP_410_GONE
+            )
+        limit = KeysetPagination().get_page_size(request)
+        queryset, serializer_class = get_product_read_path(request)
+        changes, has_more = get_changes(position, limit, queryset)
+
+        products = [item for kind, _, item in changes if kind == UPSERT]
+        data = iter(serializer_class(products, many=True, context={'request': request}).data)
+        results = []
+        for kind, (changed_at, _, pk), item in changes:
+            if kind == DELETE:
+                results.append({'type': 'deleted', 'id': pk, 'changed_at': changed_at, 'product': None})
+                continue
+            # Relative to the cursor: new to this client or changed since
+            created = position is None or item.created_at > position[0]
+            results.append({
+                'type': 'created' if created else 'updated',
+                'id': pk,
+                'changed_at': changed_at,
+                'product': next(data),
+            })
+        return Response({
+            'results': results,
+            'cursor': encode_change_cursor(changes[-1][1]) if changes else token,
+            'has_more': has_more,
+        })
+
+class ProductLeaderboardView(APIView):
+    permission_classes = [permissions.AllowAny]
+
+    def get(self, request, board):
+        # Materialized by leaderboards.py; ?category= or ?vendor= picks a scope
+        if board not in BOARDS:
+            raise Http404('Unknown leaderboard.')
+        scope, scope_id = 'all', 0
+        for name in ('category', 'vendor'):
+            value = request.query_params.get(name, '')
+            if value:
+                if not value.isdigit():
+                    return Response({name: ['A valid integer is required.']}, status=status.HTTP_400_BAD_REQUEST)
+                scope, scope_id = name, int(value)
+                break
+        fields = get_requested_fields(request)
+        products = get_leaderboard(board, scope, scope_id, include_reviews=fields is None or 'reviews' in fields)
+        serializer = ProductSerializer(products, many=True, context={'request': request})
+        return Response({'board': board, 'scope': scope, 'results': serializer.data})
+
+class RelatedProductsView(APIView):
+    permission_classes = [permissions.AllowAny]
+
+    @cache_catalog_response
+    def get(self, request, pk):
+        # Frequently bought together, precomputed by build_related_products
+        try:
+            pk = parse_id(pk)
+        except ValueError:
+            raise Http404('No Product matches the given query.')
+        related_ids = get_related_product_ids(pk)
+        if not related_ids:
+            get_object_or_404(Product.objects.values('pk'), pk=pk)
+        products = Product.objects.filter(is_available=True).in_bulk(related_ids)
+        related = [products[related_id] for related_id in related_ids if related_id in products]
+        serializer = ProductSummarySerializer(related, many=True, context={'request': request})
+        return Response({'results': serializer.data})
+
 class ProductDetailView(APIView):
     permission_classes = [permissions.IsAuthenticatedOrReadOnly, IsVendorOrReadOnly]
 
     def get_object(self, pk):
         return get_object_or_404(Product, pk=pk)
 
+    @conditional_get(get_product_validators)
+    @cache_catalog_response
     def get(self, request, pk):
-        product = self.get_object(pk)
-        serializer = ProductSerializer(product, context={'request': request})
+        queryset, serializer_class = get_product_read_path(request)
+        product = get_object_or_404(queryset, pk=pk)
+        serializer = serializer_class(product, context={'request': request})
         return Response(serializer.data)
 
     def put(self, request, pk):
@@ -81,15 +292,24 @@ class ProductDetailView(APIView):
         # Create a mutable copy of the data
         data = request.data.copy()
 
-        # Handle image update
-        if 'image' in request.FILES:
-            # The CloudinaryField will handle the update automatically
-            # If there's an existing image, it will be replaced
-            pass
-            
-        serializer = ProductSerializer(product, data=data, context={'request': request})
+        # Handle image update: the current image stays published until the
+        # workers have processed the new one
+        upload = request.FILES.get('image')
+        if upload is not None:
+            if not is_valid_image(upload):
+                return Response({'image': [INVALID_IMAGE_MESSAGE]}, status=status.HTTP_400_BAD_REQUEST)
+            data.pop('image', None)
+
+        serializer = ProductSerializer(
+            product, data=data, context={'request': request, 'image_upload': upload is not None}
+        )
         if serializer.is_valid():
-            serializer.save()
+            if upload is None:
+                serializer.save()
+            else:
+                staged_name = stage_upload(upload)
+                product = serializer.save(image_status=Product.IMAGE_PROCESSING, pending_image=staged_name)
+                enqueue_image(product, staged_name)
             return Response(serializer.data)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
@@ -106,9 +326,17 @@ class ReviewListCreateView(APIView):
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
 
     def get(self, request, product_pk):
-        reviews = ProductReview.objects.filter(product_id=product_pk)
-        serializer = ProductReviewSerializer(reviews, many=True)
-        return Response(serializer.data)
+        # Newest first, one query per page with the reviewer joined in
+        reviews = ProductReview.objects.filter(product_id=product_pk).select_related('user')
+        rating = request.query_params.get('rating')
+        if rating:
+            if not rating.isdigit():
+                return Response({'rating': ['A whole number is required.']}, status=status.HTTP_400_BAD_REQUEST)
+            reviews = reviews.filter(rating=rating)
+        paginator = KeysetPagination()
+        page = paginator.paginate_queryset(reviews, request, view=self)
+        serializer = ProductReviewSerializer(page, many=True)
+        return paginator.get_paginated_response(serializer.data)
 
     def post(self, request, product_pk):
         product = get_object_or_404(Product, pk=product_pk)
@@ -122,15 +350,18 @@ class ReviewListCreateView(APIView):
             
         serializer = ProductReviewSerializer(data=request.data)
         if serializer.is_valid():
-            serializer.save(user=request.user, product=product)
+            with transaction.atomic():
+                review = serializer.save(user=request.user, product=product)
+                Product.objects.filter(pk=product.pk).adjust_rating(added=review.rating)
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 class ReviewDetailView(APIView):
     permission_classes = [permissions.IsAuthenticatedOrReadOnly, IsReviewOwnerOrReadOnly]
 
-    def get_object(self, product_pk, review_pk):
-        return get_object_or_404(ProductReview, product_id=product_pk, pk=review_pk)
+    def get_object(self, product_pk, review_pk, for_update=False):
+        reviews = ProductReview.objects.select_for_update() if for_update else ProductReview.objects
+        return get_object_or_404(reviews, product_id=product_pk, pk=review_pk)
 
     def get(self, request, product_pk, review_pk):
         review = self.get_object(product_pk, review_pk)
@@ -138,16 +369,23 @@ class ReviewDetailView(APIView):
         return Response(serializer.data)
 
     def put(self, request, product_pk, review_pk):
-        review = self.get_object(product_pk, review_pk)
-        self.check_object_permissions(request, review)
-        serializer = ProductReviewSerializer(review, data=request.data)
-        if serializer.is_valid():
-            serializer.save()
-            return Response(serializer.data)
-        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        # The review is locked before its rating is read, so a concurrent edit
+        # or delete cannot take the same rating out of the histogram twice
+        with transaction.atomic():
+            review = self.get_object(product_pk, review_pk, for_update=True)
+            self.check_object_permissions(request, review)
+            previous_rating = review.rating
+            serializer = ProductReviewSerializer(review, data=request.data)
+            if not serializer.is_valid():
+                return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+            review = serializer.save()
+            Product.objects.filter(pk=product_pk).adjust_rating(added=review.rating, removed=previous_rating)
+        return Response(serializer.data)
 
     def delete(self, request, product_pk, review_pk):
-        review = self.get_object(product_pk, review_pk)
-        self.check_object_permissions(request, review)
-        review.delete()
+        with transaction.atomic():
+            review = self.get_object(product_pk, review_pk, for_update=True)
+            self.check_object_permissions(request, review)
+            review.delete()
+            Product.objects.filter(pk=product_pk).adjust_rating(removed=review.rating)
         return Response(status=status.HTTP_204_NO_CONTENT)
\ No newline at end of file
@@ -100,6 +100,17 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        'OPTIONS': {
+            # Writers take the lock when their transaction starts and queue
+            # for it, instead of failing with "database is locked" on upgrade
+            'transaction_mode': 'IMMEDIATE',
+            'timeout': 20,
+        },
+        'TEST': {
+            # On disk, so concurrent connections in tests lock like they do
+            # in production rather than through SQLite's shared cache
+            'NAME': BASE_DIR / 'test_db.sqlite3',
+        },
     }
 }
 
@@ -153,6 +164,53 @@ REST_FRAMEWORK = {
     )
 }
 
+# Default number of rows per page for cursor-paginated catalog endpoints
+CATALOG_PAGE_SIZE = 20
+# Neighbours kept per product by build_related_products
+RELATED_PRODUCTS_LIMIT = 10
+# Seconds recent orders are held back from it, like CHANGE_FEED_LAG
+RELATED_PRODUCTS_LAG = 60
+# Products per materialized leaderboard, and the reviews a product needs
+# before it can appear on the top rated boards
+LEADERBOARD_SIZE = 10
+LEADERBOARD_MIN_REVIEWS = 3
+# Product change feed: seconds recent changes are held back so that late
+# commits are not skipped, and days deletes stay visible to old cursors
+CHANGE_FEED_LAG = 5
+CHANGE_FEED_RETENTION_DAYS = 30
+# Seconds an anonymous catalog response stays cached; writes bump the
+# catalog version, so this only bounds memory for unused entries
+CATALOG_CACHE_TIMEOUT = 300
+# Guest carts live in the 'carts' cache under a signed cookie until login
+# merges them into the user's carts: cookie name, seconds an untouched
+# guest cart is kept, and distinct products it may hold
+GUEST_CART_COOKIE = 'guest_cart'
+GUEST_CART_TIMEOUT = 60 * 60 * 24 * 14
+GUEST_CART_MAX_ITEMS = 100
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    # Required, and must be one store every process reaches (e.g. Redis)
+    # whenever more than one process serves the site: it holds the catalog
+    # version counters that invalidate the catalog responses each worker
+    # caches in 'default' and its in-process snapshot. Local memory only
+    # works for a single process, such as runserver; `manage.py check
+    # --deploy` warns about it (products.W001)
+    'shared': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'shared',
+    },
+    # Local memory is a per-process stand-in; point this at a shared store
+    # such as Redis (django.core.cache.backends.redis.RedisCache) in production
+    'carts': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'guest-carts',
+        'TIMEOUT': GUEST_CART_TIMEOUT,
+    },
+}
+
 from datetime import timedelta
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(minutes=60),
@@ -179,5 +237,22 @@ cloudinary.config(
     api_secret = CLOUDINARY_STORAGE['API_SECRET']
 )
 
+# Product image pipeline: uploads are resized by a background worker pool
+# and pushed to PRODUCT_IMAGE_STORAGE. LocalImageStorage keeps them under
+# MEDIA_ROOT for offline use; 0 workers processes uploads inline.
+PRODUCT_IMAGE_STORAGE = 'apps.products.images.CloudinaryImageStorage'
+PRODUCT_IMAGE_STAGING_ROOT = os.path.join(MEDIA_ROOT, 'image_staging')
+PRODUCT_IMAGE_WORKERS = 2
+PRODUCT_IMAGE_MAX_SIZE = 1600
+PRODUCT_IMAGE_QUALITY = 85
+# Responsive variants rendered next to the full image, by longest side in
+# pixels. Catalog listings serve PRODUCT_IMAGE_LISTING_VARIANT.
+PRODUCT_IMAGE_VARIANTS = {
+    'thumbnail': 160,
+    'medium': 480,
+    'large': 1024,
+}
+PRODUCT_IMAGE_LISTING_VARIANT = 'medium'
+
 # Default file storage
 DEFAULT_FILE_STORAGE = 'cloudinary_storage.storage.MediaCloudinaryStorage'
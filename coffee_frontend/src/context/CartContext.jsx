@@ -70,57 +70,31 @@ export const CartProvider = ({ children }) => {
 
         if (isAuthenticated) {
             try {
+                // One batch request; the server answers with the final carts
                 const newItemsSet = new Set(newItems.map(item => item.id));
-                const updatePromises = newItems
-                    .filter(item => item.cartItemId)
-                    .map(async (item) => {
-                        return fetch(`/api/cart/items/${item.cartItemId}/`, {
-                            method: 'PUT',
-                            headers: {
-                                'Content-Type': 'application/json',
-                                'Authorization': `Bearer ${user.access}`
-                            },
-                            body: JSON.stringify({
-                                product: item.id,
-                                quantity: item.quantity
-                            })
-                        });
-                    });
-
-                const addPromises = newItems
-                    .filter(item => !item.cartItemId)
-                    .map(async (item) => {
-                        const response = await fetch('/api/cart/cart/', {
-                            method: 'POST',
-                            headers: {
-                                'Content-Type': 'application/json',
-                                'Authorization': `Bearer ${user.access}`
-                            },
-                            body: JSON.stringify({
-                                product: item.id,
-                                quantity: item.quantity
-                            })
-                        });
-                        
-                        if (response.ok) {
-                            const newCartItem = await response.json();
-                            item.cartItemId = newCartItem.id;
-                        }
-                        return response;
+                const operations = [
+                    ...newItems.map(item => ({ op: 'set', product_id: item.id, quantity: item.quantity })),
+                    ...items
+                        .filter(item => !newItemsSet.has(item.id) && item.cartItemId)
+                        .map(item => ({ op: 'remove', product_id: item.id })),
+                ];
+                if (operations.length > 0) {
+                    const response = await fetch('/api/cart/batch/', {
+                        method: 'POST',
+                        headers: {
+                            'Content-Type': 'application/json',
+                            'Authorization': `Bearer ${user.access}`
+                        },
+                        body: JSON.stringify({ operations })
                     });
-
-                const deletePromises = items
-                    .filter(item => !newItemsSet.has(item.id) && item.cartItemId)
-                    .map(item => 
-                        fetch(`/api/cart/items/${item.cartItemId}/`, {
-                            method: 'DELETE',
-                            headers: {
-                                'Authorization': `Bearer ${user.access}`
-                            }
-                        })
-                    );
-
-                await Promise.all([...updatePromises, ...addPromises, ...deletePromises]);
+                    if (response.ok) {
+                        const carts = await response.json();
+                        const cartItemIds = new Map(
+                            carts.flatMap(cart => cart.items.map(item => [item.product.id, item.id]))
+                        );
+                        newItems = newItems.map(item => ({ ...item, cartItemId: cartItemIds.get(item.id) }));
+                    }
+                }
             } catch (error) {
                 console.error('Error saving cart:', error);
                 return false;
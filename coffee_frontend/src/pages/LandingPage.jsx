@@ -157,12 +157,22 @@ const LandingPage = () => {
   useEffect(() => {
     const fetchProducts = async () => {
       try {
-        const response = await fetch('/api/products/products/');
+        const fields = 'fields=id,name,description,price,image_url,roast_type,origin,stock';
+        // Featured coffees come from the precomputed best seller board; a new
+        // shop without sales falls back to the first catalog page
+        let response = await fetch(`/api/products/products/leaderboards/bestsellers/?${fields}`);
         if (!response.ok) {
           throw new Error(`HTTP error! status: ${response.status}`);
         }
-        const data = await response.json();
-        setProducts(data);
+        let data = await response.json();
+        if (data.results.length === 0) {
+          response = await fetch(`/api/products/products/?${fields}`);
+          if (!response.ok) {
+            throw new Error(`HTTP error! status: ${response.status}`);
+          }
+          data = await response.json();
+        }
+        setProducts(data.results);
       } catch (error) {
         console.error('Error fetching products:', error);
       } finally {
@@ -1,44 +1,76 @@
 import { useState, useEffect } from 'react';
 import { Search } from 'lucide-react';
 
+const PRODUCT_FIELDS = 'id,name,description,price,image_url,roast_type,origin,stock';
+// Milliseconds of typing pause before the search is sent to the server
+const SEARCH_DELAY = 300;
+
 const ProductsPage = () => {
   const [products, setProducts] = useState([]);
+  const [nextUrl, setNextUrl] = useState(null);
   const [loading, setLoading] = useState(true);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [filters, setFilters] = useState({
     category: '',
     vendor: '',
     roast: '',
     search: ''
   });
+  const [query, setQuery] = useState('');
+
+  useEffect(() => {
+    const timer = setTimeout(() => setQuery(filters.search.trim()), SEARCH_DELAY);
+    return () => clearTimeout(timer);
+  }, [filters.search]);
+
+  const fetchPage = async (url) => {
+    const response = await fetch(url);
+    if (!response.ok) throw new Error(`HTTP error! status: ${response.status}`);
+    return response.json();
+  };
 
   useEffect(() => {
+    // First keyset page for the filters; "Load more" follows its next link.
+    // Responses for filters that have since changed are dropped.
+    let ignore = false;
     const fetchProducts = async () => {
       try {
-        let url = '/api/products/products/?';
         const params = new URLSearchParams();
-        
+        params.append('fields', PRODUCT_FIELDS);
+
         if (filters.category) params.append('category', filters.category);
         if (filters.vendor) params.append('vendor', filters.vendor);
         if (filters.roast) params.append('roast', filters.roast);
-        
-        const response = await fetch(url + params.toString());
-        if (!response.ok) throw new Error(`HTTP error! status: ${response.status}`);
-        const data = await response.json();
-        setProducts(data);
+        if (query) params.append('q', query);
+
+        const data = await fetchPage('/api/products/products/?' + params.toString());
+        if (!ignore) {
+          setProducts(data.results);
+          setNextUrl(data.next);
+        }
       } catch (error) {
         console.error('Error fetching products:', error);
       } finally {
-        setLoading(false);
+        if (!ignore) setLoading(false);
       }
     };
 
     fetchProducts();
-  }, [filters]);
+    return () => { ignore = true; };
+  }, [filters.category, filters.vendor, filters.roast, query]);
 
-  const filteredProducts = products.filter(product =>
-    product.name.toLowerCase().includes(filters.search.toLowerCase()) ||
-    product.description.toLowerCase().includes(filters.search.toLowerCase())
-  );
+  const loadMore = async () => {
+    setLoadingMore(true);
+    try {
+      const data = await fetchPage(nextUrl);
+      setProducts(prev => [...prev, ...data.results]);
+      setNextUrl(data.next);
+    } catch (error) {
+      console.error('Error fetching products:', error);
+    } finally {
+      setLoadingMore(false);
+    }
+  };
 
   return (
     <div className="min-h-screen bg-black">
@@ -70,7 +102,7 @@ const ProductsPage = () => {
               value={filters.roast}
               onChange={(e) => setFilters(prev => ({ ...prev, roast: e.target.value }))}
             >
-              <option value="*">Roast Types</option>
+              <option value="">Roast Types</option>
               <option value="LIGHT">Light</option>
               <option value="MEDIUM">Medium</option>
               <option value="DARK">Dark</option>
@@ -82,7 +114,7 @@ const ProductsPage = () => {
               value={filters.category}
               onChange={(e) => setFilters(prev => ({ ...prev, category: e.target.value }))}
             >
-              <option value="*">Categories</option>
+              <option value="">Categories</option>
               <option value="4">Single Origin</option>
               <option value="3">Blend</option>
               <option value="2">Espresso</option>
@@ -108,7 +140,7 @@ const ProductsPage = () => {
           <div className="text-white text-center text-xl">Loading products...</div>
         ) : (
           <div className="grid grid-cols-1 sm:grid-cols-2 lg:grid-cols-3 xl:grid-cols-4 gap-6">
-            {filteredProducts.map((product) => (
+            {products.map((product) => (
               <div key={product.id} className="bg-gray-900 rounded-xl shadow-xl hover:shadow-2xl transition-shadow">
                 <div className="relative mb-4">
                   <img
@@ -145,8 +177,21 @@ const ProductsPage = () => {
           </div>
         )}
 
+        {/* Further pages */}
+        {!loading && nextUrl && (
+          <div className="text-center mt-8">
+            <button
+              className="bg-amber-600 text-white px-6 py-2 rounded-lg hover:bg-amber-500 transition-colors disabled:opacity-50"
+              onClick={loadMore}
+              disabled={loadingMore}
+            >
+              {loadingMore ? 'Loading...' : 'Load more'}
+            </button>
+          </div>
+        )}
+
         {/* No Results Message */}
-        {!loading && filteredProducts.length === 0 && (
+        {!loading && products.length === 0 && (
           <div className="text-white text-center mt-8">
             <p className="text-xl">No products found matching your criteria</p>
             <button
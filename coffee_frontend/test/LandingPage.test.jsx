@@ -84,6 +84,15 @@ Object.defineProperty(window, 'localStorage', { value: localStorageMock });
 // Mock fetch
 global.fetch = vi.fn();
 
+const FIELDS = 'fields=id,name,description,price,image_url,roast_type,origin,stock';
+const BESTSELLERS_URL = `/api/products/products/leaderboards/bestsellers/?${FIELDS}`;
+const PRODUCTS_URL = `/api/products/products/?${FIELDS}`;
+
+const productPage = (results) => Promise.resolve({
+  ok: true,
+  json: () => Promise.resolve({ results, next: null, previous: null })
+});
+
 // Helper function to render with all providers
 const renderWithProviders = (component, { isAuthenticated = false, userData = null } = {}) => {
   if (isAuthenticated) {
@@ -110,13 +119,14 @@ describe('LandingPage', () => {
     vi.clearAllMocks();
     fetch.mockReset();
     
-    // Default product fetch mock
+    // Default product fetch mock: no sales yet, so the page falls back to
+    // the catalog listing
     fetch.mockImplementation((url) => {
-      if (url === '/api/products/products/') {
-        return Promise.resolve({
-          ok: true,
-          json: () => Promise.resolve(mockProducts)
-        });
+      if (url === BESTSELLERS_URL) {
+        return productPage([]);
+      }
+      if (url === PRODUCTS_URL) {
+        return productPage(mockProducts);
       }
       if (url === '/api/cart/cart/') {
         return Promise.resolve({
@@ -150,7 +160,35 @@ describe('LandingPage', () => {
     });
 
     // Verify that the products were fetched
-    expect(fetch).toHaveBeenCalledWith('/api/products/products/');
+    expect(fetch).toHaveBeenCalledWith(BESTSELLERS_URL);
+    expect(fetch).toHaveBeenCalledWith(PRODUCTS_URL);
+  });
+
+  it('features the best sellers when there are any', async () => {
+    fetch.mockImplementation((url) => {
+      if (url === BESTSELLERS_URL) {
+        return productPage([mockProducts[1]]);
+      }
+      return Promise.reject(new Error('Not found'));
+    });
+
+    renderWithProviders(<LandingPage />);
+
+    await waitFor(() => {
+      expect(screen.getByText('Colombian Supremo')).toBeInTheDocument();
+    });
+    expect(screen.queryByText('Ethiopian Yirgacheffe')).not.toBeInTheDocument();
+    expect(fetch).not.toHaveBeenCalledWith(PRODUCTS_URL);
+  });
+
+  it('falls back to the catalog listing without best sellers', async () => {
+    renderWithProviders(<LandingPage />);
+
+    await waitFor(() => {
+      expect(screen.getByText('Ethiopian Yirgacheffe')).toBeInTheDocument();
+    });
+    expect(fetch).toHaveBeenNthCalledWith(1, BESTSELLERS_URL);
+    expect(fetch).toHaveBeenNthCalledWith(2, PRODUCTS_URL);
   });
 
   it('handles navigation properly', async () => {
@@ -185,14 +223,26 @@ describe('LandingPage', () => {
   it('adds items to cart as authenticated user', async () => {
     // Mock successful cart addition
     fetch.mockImplementation((url, options) => {
-      if (url === '/api/cart/cart/' && options?.method === 'POST') {
+      if (url === '/api/cart/batch/' && options?.method === 'POST') {
         return Promise.resolve({
           ok: true,
-          json: () => Promise.resolve({ 
+          json: () => Promise.resolve([{
             id: 1,
-            product: mockProducts[0],
-            quantity: 1
-          })
+            vendor: 1,
+            items: [{ id: 1, product: mockProducts[0], quantity: 1 }]
+          }])
+        });
+      }
+      if (url === BESTSELLERS_URL) {
+        return productPage([]);
+      }
+      if (url === PRODUCTS_URL) {
+        return productPage(mockProducts);
+      }
+      if (url === '/api/cart/cart/') {
+        return Promise.resolve({
+          ok: true,
+          json: () => Promise.resolve([{ items: [] }])
         });
       }
       return Promise.resolve({
@@ -215,7 +265,7 @@ describe('LandingPage', () => {
 
     await waitFor(() => {
       expect(fetch).toHaveBeenCalledWith(
-        '/api/cart/cart/',
+        '/api/cart/batch/',
         expect.objectContaining({
           method: 'POST',
           headers: expect.objectContaining({
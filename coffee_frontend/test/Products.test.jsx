@@ -28,7 +28,7 @@ describe('ProductsPage', () => {
 
         global.fetch.mockResolvedValueOnce({
             ok: true,
-            json: async () => mockProducts
+            json: async () => ({ results: mockProducts, next: null, previous: null })
         })
 
         render(<ProductsPage />)
@@ -40,44 +40,84 @@ describe('ProductsPage', () => {
         })
     })
 
-    it('filters products based on search input', async () => {
-        const mockProducts = [
-            {
-                id: 1,
-                name: 'Arabica Coffee',
-                description: 'Test Description',
-                image_url: 'test.jpg',
-                roast_type: 'MEDIUM',
-                origin: 'Kenya',
-                price: '1000',
-                stock: 10
-            },
-            {
-                id: 2, 
-                name: 'Robusta Coffee',
-                description: 'Another Description',
-                image_url: 'test2.jpg',
-                roast_type: 'DARK',
-                origin: 'Ethiopia',
-                price: '1200',
-                stock: 5
-            }
-        ]
-
-        global.fetch.mockResolvedValueOnce({
+    it('sends the search text to the server', async () => {
+        const arabica = {
+            id: 1,
+            name: 'Arabica Coffee',
+            description: 'Test Description',
+            image_url: 'test.jpg',
+            roast_type: 'MEDIUM',
+            origin: 'Kenya',
+            price: '1000',
+            stock: 10
+        }
+        const robusta = {
+            id: 2,
+            name: 'Robusta Coffee',
+            description: 'Another Description',
+            image_url: 'test2.jpg',
+            roast_type: 'DARK',
+            origin: 'Ethiopia',
+            price: '1200',
+            stock: 5
+        }
+
+        global.fetch.mockImplementation(async (url) => ({
             ok: true,
-            json: async () => mockProducts
-        })
+            json: async () => ({
+                results: url.includes('q=arabica') ? [arabica] : [arabica, robusta],
+                next: null,
+                previous: null
+            })
+        }))
 
         render(<ProductsPage />)
 
         await waitFor(() => {
-            const searchInput = screen.getByPlaceholderText(/search coffee/i)
-            fireEvent.change(searchInput, { target: { value: 'arabica' } })
+            expect(screen.getByText('Robusta Coffee')).toBeInTheDocument()
         })
+        fireEvent.change(screen.getByPlaceholderText(/search coffee/i), { target: { value: 'arabica' } })
 
+        await waitFor(() => {
+            expect(global.fetch).toHaveBeenCalledWith(expect.stringContaining('q=arabica'))
+            expect(screen.queryByText('Robusta Coffee')).not.toBeInTheDocument()
+        })
         expect(screen.getByText('Arabica Coffee')).toBeInTheDocument()
-        expect(screen.queryByText('Robusta Coffee')).not.toBeInTheDocument()
+    })
+
+    it('loads the next page on demand', async () => {
+        const product = (id) => ({
+            id,
+            name: `Coffee ${id}`,
+            description: 'Test Description',
+            image_url: 'test.jpg',
+            roast_type: 'MEDIUM',
+            origin: 'Test Origin',
+            price: '1000',
+            stock: 10
+        })
+        const nextUrl = 'http://testserver/api/products/products/?cursor=abc'
+
+        global.fetch
+            .mockResolvedValueOnce({
+                ok: true,
+                json: async () => ({ results: [product(1)], next: nextUrl, previous: null })
+            })
+            .mockResolvedValueOnce({
+                ok: true,
+                json: async () => ({ results: [product(2)], next: null, previous: nextUrl })
+            })
+
+        render(<ProductsPage />)
+
+        fireEvent.click(await screen.findByRole('button', { name: /load more/i }))
+
+        await waitFor(() => {
+            expect(screen.getByText('Coffee 2')).toBeInTheDocument()
+        })
+        expect(screen.getByText('Coffee 1')).toBeInTheDocument()
+        expect(global.fetch).toHaveBeenLastCalledWith(nextUrl)
+        expect(screen.queryByRole('button', { name: /load more/i })).not.toBeInTheDocument()
     })
 
     it('shows error message when no products match filters', async () => {
@@ -85,7 +125,7 @@ describe('ProductsPage', () => {
         
         global.fetch.mockResolvedValueOnce({
             ok: true,
-            json: async () => mockProducts
+            json: async () => ({ results: mockProducts, next: null, previous: null })
         })
 
         render(<ProductsPage />)
@@ -109,7 +149,7 @@ describe('ProductsPage', () => {
 
         global.fetch.mockResolvedValueOnce({
             ok: true,
-            json: async () => mockProducts
+            json: async () => ({ results: mockProducts, next: null, previous: null })
         })
 
         render(<ProductsPage />)